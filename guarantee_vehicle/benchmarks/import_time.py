@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+
+# heavy optional-path dependencies the CLI must only import when a run needs them
+LAZY_MODULES = ("matplotlib", "openpyxl", "pyarrow", "scipy", "tabulate")
+DEFAULT_BUDGET_MS = 800.0
+
+
+def import_profile(module: str) -> tuple[float, list[tuple[str, float]]]:
+    # (total ms, [(module, cumulative ms)]) from `python -X importtime` in a fresh interpreter
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((name.strip(), int(cumulative) / 1000))
+    total = next(ms for name, ms in reversed(rows) if name == module)
+    return total, rows
+
+
+def loaded_lazy_modules(module: str) -> list[str]:
+    code = f"import sys, {module}; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return out.stdout.split()
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Check the CLI import time against a budget")
+    p.add_argument("--module", default="guarantee_vehicle.cli")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Fail when the best import time exceeds this")
+    p.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list")
+    args = p.parse_args()
+
+    runs = [import_profile(args.module) for _ in range(args.repeat)]
+    best, rows = min(runs, key=lambda r: r[0])
+    # third-party top-level packages only: nested entries are already inside their parents' cumulative time
+    own = args.module.split(".")[0]
+    roots: dict[str, float] = {}
+    for name, ms in rows:
+        root = name.split(".")[0]
+        if root == own:
+            continue
+        roots[root] = max(roots.get(root, 0.0), ms)
+    for name, ms in sorted(roots.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"{name:<24} {ms:8.1f} ms")
+    print(f"import {args.module}: best {best:.1f} ms of {args.repeat} (budget {args.budget_ms:.0f} ms)")
+
+    failures = []
+    if best > args.budget_ms:
+        failures.append(f"import time {best:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    eager = loaded_lazy_modules(args.module)
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+    if failures:
+        sys.exit("FAIL: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.synthetic_workbook import synthetic_config, write_synthetic_trade_book, write_synthetic_workbook
+from guarantee_vehicle.capital.aggregation import weighted_portfolio_samples
+from guarantee_vehicle.capital.rating_capital import severity_capital, var_or_es
+from guarantee_vehicle.io import load_data
+from guarantee_vehicle.market.fx import phase0_mtm_positive
+from guarantee_vehicle.market.rates import build_rate_curves
+from guarantee_vehicle.portfolio import load_trade_book
+from guarantee_vehicle.reporting.charts import plot_leverage_vs_roe, plot_loss_exceedance
+from guarantee_vehicle.simulation import build_spot_panel, run_book_simulation, run_loss_simulation, run_scenario_grid
+from guarantee_vehicle.stats.risk_metrics import RiskMetrics
+
+DEFAULT_HISTORY = Path(__file__).resolve().parent / "history.json"
+
+# (currencies, periods, frequency, phase-2 paths)
+PRESETS: dict[str, tuple[int, int, str, int]] = {
+    "small": (9, 168, "MS", 20_000),
+    "medium": (30, 600, "MS", 200_000),
+    "large": (100, 2_400, "MS", 1_000_000),
+    "daily": (30, 5_000, "B", 50_000),
+}
+
+# synthetic trade book: (trades, counterparties, phase-2 paths)
+BOOK_SIZE = (100_000, 5_000, 2_000)
+
+
+def measure(fn: Callable[[], object], repeat: int = 3) -> dict[str, float]:
+    # Wall times over `repeat` runs, then one extra run under tracemalloc for the Python-heap peak
+    # (kept separate so tracing overhead does not distort the timings).
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "wall_s_min": min(times),
+        "wall_s_median": float(np.median(times)),
+        "peak_mem_mb": peak / 1e6,
+    }
+
+
+def run_preset(name: str, repeat: int, workdir: Path, seed: int = 0) -> list[dict]:
+    n_ccy, n_periods, freq, n_paths = PRESETS[name]
+    cfg = synthetic_config(n_ccy, n_paths)
+    workbook = write_synthetic_workbook(workdir / f"{name}.xlsx", cfg, n_periods, freq=freq, seed=seed)
+    weights = {c: 1 / n_ccy for c in cfg.universe.currencies}
+    tenor_months = cfg.portfolio.tenor_years * 12
+
+    data = load_data(workbook, cfg)
+    samples_by_ccy = {c: phase0_mtm_positive(data.fx[c], tenor_months) for c in cfg.universe.currencies}
+    portfolio = weighted_portfolio_samples(samples_by_ccy, weights)
+    curves = build_rate_curves(data.rates, cfg.data.rates)
+    panel = build_spot_panel(data.fx, cfg.universe.currencies, curves)
+    pd_annual = cfg.credit.pd_scenarios_annual[1]
+    sim = run_loss_simulation(cfg, panel, weights, n_paths, cfg.run.seed, pd_annual, keep_paths=False)
+    confidence = cfg.capital_target.confidence
+    cfg_streaming = cfg.model_copy(update={"data": cfg.data.model_copy(update={"backend": "streaming"})})
+    lev_axis = np.arange(5, 31)
+    n_trades, n_counterparties, book_paths = BOOK_SIZE
+    book_csv = write_synthetic_trade_book(workdir / f"{name}_book.csv", cfg, n_trades, n_counterparties, seed=seed)
+    book = load_trade_book(book_csv, cfg.universe.currencies)
+
+    cases: list[tuple[str, Callable[[], object]]] = [
+        ("load_data[pandas]", lambda: load_data(workbook, cfg)),
+        ("load_data[streaming]", lambda: load_data(workbook, cfg_streaming)),
+        ("phase0_mtm_positive[all]", lambda: [phase0_mtm_positive(data.fx[c], tenor_months) for c in cfg.universe.currencies]),
+        ("weighted_portfolio_samples", lambda: weighted_portfolio_samples(samples_by_ccy, weights)),
+        ("build_rate_curves", lambda: build_rate_curves(data.rates, cfg.data.rates)),
+        ("build_spot_panel", lambda: build_spot_panel(data.fx, cfg.universe.currencies, curves)),
+        (
+            "run_loss_simulation",
+            lambda: run_loss_simulation(cfg, panel, weights, n_paths, cfg.run.seed, pd_annual, keep_paths=False),
+        ),
+        ("run_scenario_grid", lambda: run_scenario_grid(cfg, panel, weights, min(n_paths, 50_000), cfg.run.seed)),
+        ("load_trade_book[csv]", lambda: load_trade_book(book_csv, cfg.universe.currencies)),
+        ("run_book_simulation", lambda: run_book_simulation(cfg, panel, book, book_paths, cfg.run.seed)),
+        ("severity_capital[phase0]", lambda: severity_capital(portfolio, confidence, cfg.capital_target.addon_pct)),
+        ("var_or_es[ES]", lambda: var_or_es(sim.losses, confidence, "ES")),
+        ("RiskMetrics[build+VaR+ES]", lambda: RiskMetrics(sim.losses).es(confidence)),
+        ("plot_leverage_vs_roe", lambda: plot_leverage_vs_roe(workdir / "lev.png", lev_axis, {"roe": lev_axis * 0.01})),
+        ("plot_loss_exceedance", lambda: plot_loss_exceedance(workdir / "loss.png", RiskMetrics(sim.losses))),
+    ]
+    params = {"currencies": n_ccy, "periods": n_periods, "freq": freq, "paths": n_paths}
+    results = []
+    for case, fn in cases:
+        stats = measure(fn, repeat)
+        results.append({"preset": name, "case": case, **params, **stats})
+        print(f"{name:>7} {case:<28} {stats['wall_s_median']:9.4f}s  {stats['peak_mem_mb']:9.1f} MB", flush=True)
+    return results
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def load_history(path: Path) -> list[dict]:
+    return json.loads(path.read_text()) if path.exists() else []
+
+
+def compare(previous: dict, current: dict) -> list[str]:
+    # median wall-time and peak-memory ratios (current / previous) for cases present in both runs
+    before = {(r["preset"], r["case"]): r for r in previous["results"]}
+    lines = [f"vs {previous.get('label') or previous['timestamp']} ({previous.get('git_revision')})"]
+    for r in current["results"]:
+        old = before.get((r["preset"], r["case"]))
+        if old is None:
+            continue
+        t = r["wall_s_median"] / old["wall_s_median"] if old["wall_s_median"] > 0 else float("nan")
+        m = r["peak_mem_mb"] / old["peak_mem_mb"] if old["peak_mem_mb"] > 0 else float("nan")
+        lines.append(f"{r['preset']:>7} {r['case']:<28} time x{t:5.2f}  memory x{m:5.2f}")
+    return lines
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark the guarantee vehicle hot paths on synthetic workbooks")
+    p.add_argument("--preset", action="append", choices=sorted(PRESETS), help="Repeatable; default: small")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--history", type=Path, default=DEFAULT_HISTORY, help="JSON file the run is appended to")
+    p.add_argument("--label", default=None, help="Free-text label stored with the run")
+    p.add_argument("--no-save", action="store_true", help="Print results without appending to the history")
+    args = p.parse_args()
+
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "label": args.label,
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.preset or ["small"]:
+            run["results"].extend(run_preset(name, args.repeat, Path(tmp)))
+
+    history = load_history(args.history)
+    if history:
+        print("\n".join(compare(history[-1], run)))
+    if not args.no_save:
+        history.append(run)
+        args.history.write_text(json.dumps(history, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+from openpyxl import Workbook
+
+from guarantee_vehicle.config import AppConfig
+
+EXAMPLE_CONFIG = Path(__file__).resolve().parents[1] / "examples" / "config_example.yaml"
+EXCEL_MAX_COLUMNS = 16_384
+
+
+def synthetic_currencies(n: int) -> list[str]:
+    return [f"C{i:03d}" for i in range(n)]
+
+
+def synthetic_config(n_currencies: int, n_paths: int | None = None, base: str | Path = EXAMPLE_CONFIG) -> AppConfig:
+    # the example config with a synthetic universe, rates keys "<CCY>_curve_key" and equal weights
+    raw = yaml.safe_load(Path(base).read_text())
+    currencies = synthetic_currencies(n_currencies)
+    raw["universe"]["currencies"] = currencies
+    raw["data"]["rates"]["mapping"] = {c: f"{c}_curve_key" for c in ["USD", *currencies]}
+    raw["portfolio"]["weighting"] = "equal"
+    raw["portfolio"]["custom_weights"] = {}
+    raw.setdefault("simulation", {})["n_paths"] = n_paths
+    return AppConfig.model_validate(raw)
+
+
+def write_synthetic_workbook(
+    path: str | Path,
+    cfg: AppConfig,
+    n_periods: int,
+    freq: str = "MS",
+    seed: int = 0,
+    n_rate_points: int = 12,
+    missing_share: float = 0.05,
+) -> Path:
+    # FX sheet laid out as cfg.data.excel describes (dates newest first, like the bundled workbook),
+    # GBM spot histories with a leading share of missing observations per currency, and a rates sheet
+    # with a newest-first history of n_rate_points observations per mapping key.
+    excel = cfg.data.excel
+    if excel.values_start_col_index + n_periods > EXCEL_MAX_COLUMNS:
+        raise ValueError(f"{n_periods} periods do not fit in one sheet ({EXCEL_MAX_COLUMNS} columns)")
+    rng = np.random.default_rng(seed)
+    currencies = cfg.universe.currencies
+    dates = pd.date_range(end=pd.Timestamp("2025-12-01"), periods=n_periods, freq=freq)[::-1]
+    dt = 1 / 12 if freq in ("MS", "ME", "M") else 1 / 252
+    vol = rng.uniform(0.03, 0.25, len(currencies))
+    drift = rng.uniform(0.0, 0.08, len(currencies))
+    z = rng.standard_normal((len(currencies), n_periods))
+    log_paths = np.cumsum((drift - 0.5 * vol**2)[:, None] * dt + vol[:, None] * np.sqrt(dt) * z, axis=1)
+    levels = rng.uniform(1, 20_000, len(currencies))[:, None] * np.exp(log_paths)[:, ::-1]
+    n_missing = (rng.uniform(0, missing_share, len(currencies)) * n_periods).astype(int)
+
+    wb = Workbook(write_only=True)
+    fx_ws = wb.create_sheet(excel.fx_sheet)
+    blank = [None] * excel.values_start_col_index
+    for r in range(excel.values_start_row_index):
+        fx_ws.append(blank + [d.to_pydatetime() for d in dates] if r == excel.dates_row_index else [])
+    for i, ccy in enumerate(currencies):
+        row = [None] * excel.values_start_col_index
+        row[excel.fx_row_key_column] = ccy
+        values = [round(float(v), 4) for v in levels[i]]
+        if n_missing[i]:
+            values[-n_missing[i] :] = [None] * n_missing[i]
+        fx_ws.append(row + values)
+
+    rates_ws = wb.create_sheet(cfg.data.rates.sheet)
+    for key in cfg.data.rates.mapping.values():
+        rates_ws.append([key, *np.round(rng.uniform(0.01, 0.15) + rng.normal(0, 0.002, n_rate_points), 5).tolist()])
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(path)
+    return path
+
+
+def write_synthetic_trade_book(
+    path: str | Path, cfg: AppConfig, n_trades: int, n_counterparties: int, seed: int = 0
+) -> Path:
+    # CSV in portfolio.book.BOOK_COLUMNS: counterparties with 1-3 currencies each, lognormal notionals,
+    # whole-year tenors up to portfolio.tenor_years, a CCS/NDF split per portfolio.mix and ATM strikes
+    rng = np.random.default_rng(seed)
+    currencies = np.array(cfg.universe.currencies)
+    cp_ccys = rng.integers(0, len(currencies), (n_counterparties, 3))
+    cp_pd = np.round(rng.uniform(0.01, 0.08, n_counterparties), 4)
+    cp = rng.integers(0, n_counterparties, n_trades)
+    book = pd.DataFrame(
+        {
+            "counterparty": np.char.add("CP", np.char.zfill(cp.astype(str), 5)),
+            "currency": currencies[cp_ccys[cp, rng.integers(0, 3, n_trades)]],
+            "instrument": np.where(rng.random(n_trades) < cfg.portfolio.mix.CCS, "CCS", "NDF"),
+            "notional_usd": np.round(rng.lognormal(7, 1, n_trades), 2),
+            "strike": np.nan,
+            "tenor_years": rng.integers(1, cfg.portfolio.tenor_years + 1, n_trades),
+            "pd_annual": cp_pd[cp],
+        }
+    )
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    book.to_csv(path, index=False)
+    return path
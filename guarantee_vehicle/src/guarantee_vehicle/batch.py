@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+import yaml
+from pydantic import ValidationError
+
+from guarantee_vehicle.cli import run_model
+from guarantee_vehicle.config import AppConfig, load_config, resolve_config_paths
+from guarantee_vehicle.io import LoadedData, load_data_cached
+from guarantee_vehicle.io.cache import DEFAULT_CACHE_DIR, DataCache, data_cache_key
+from guarantee_vehicle.market.fx import phase0_mtm_positive
+from guarantee_vehicle.market.rates import build_rate_curves
+from guarantee_vehicle.pipeline import StageCache
+from guarantee_vehicle.reporting.report_md import write_report
+from guarantee_vehicle.reporting.tables import to_markdown_table
+from guarantee_vehicle.simulation.loss_engine import SpotPanel, build_spot_panel
+from guarantee_vehicle.simulation.parallel import worker_pool, worker_state
+
+
+@dataclass(frozen=True)
+class BatchRun:
+    # cfg is None when the file failed validation; error then says why and the run becomes an error row
+    name: str
+    source: Path
+    cfg: AppConfig | None
+    error: str | None = None
+
+
+def expand_config_paths(patterns: list[str]) -> list[Path]:
+    # each entry is a YAML file, a directory of YAML files or a glob; order is kept, duplicates dropped
+    paths: list[Path] = []
+    for pattern in patterns:
+        p = Path(pattern)
+        if p.is_dir():
+            found = sorted([*p.glob("*.yaml"), *p.glob("*.yml")])
+        elif glob.has_magic(pattern):
+            found = sorted(Path(m) for m in glob.glob(pattern, recursive=True))
+        else:
+            found = [p]
+        if not found:
+            raise ValueError(f"No config files match {pattern!r}")
+        paths.extend(f for f in found if f not in paths)
+    return paths
+
+
+def deep_merge(base: dict, override: dict) -> dict:
+    # mappings merge key by key; anything else (including lists) in override replaces the base value
+    out = dict(base)
+    for key, value in override.items():
+        out[key] = deep_merge(out[key], value) if isinstance(value, dict) and isinstance(out.get(key), dict) else value
+    return out
+
+
+def _validation_message(exc: ValidationError) -> str:
+    # one line per comparison row: "ValidationError: <field>: <message>; ..."
+    errors = "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in exc.errors())
+    return f"ValidationError: {errors}"
+
+
+def load_batch_runs(patterns: list[str], base: str | Path | None = None) -> list[BatchRun]:
+    # Full configs, or (with base) partial override files merged onto the base config. Runs are named
+    # after the file stem, which must be unique as it names the output directory. A file that fails
+    # validation becomes a run without a cfg, reported as an error row by run_batch.
+    paths = expand_config_paths(patterns)
+    stems = [p.stem for p in paths]
+    clashes = sorted({s for s in stems if stems.count(s) > 1})
+    if clashes:
+        raise ValueError(f"Config file names must be unique within a batch, repeated: {', '.join(clashes)}")
+    base_raw = None
+    if base is not None:
+        with open(base, "r", encoding="utf-8") as f:
+            base_raw = resolve_config_paths(yaml.safe_load(f), Path(base).parent)
+    runs = []
+    for p in paths:
+        try:
+            if base_raw is None:
+                cfg = load_config(p)
+            else:
+                with open(p, "r", encoding="utf-8") as f:
+                    override = resolve_config_paths(yaml.safe_load(f) or {}, p.parent)
+                cfg = AppConfig.model_validate(deep_merge(base_raw, override))
+        except ValidationError as exc:  # an invalid variant is reported, not fatal, like a failed run
+            runs.append(BatchRun(p.stem, p, None, _validation_message(exc)))
+        else:
+            runs.append(BatchRun(p.stem, p, cfg))
+    return runs
+
+
+
+def _data_key(cfg: AppConfig) -> str:
+    # what load_data depends on besides the workbook
+    return json.dumps([cfg.data.model_dump(mode="json"), cfg.universe.currencies], sort_keys=True)
+
+
+def shared_inputs(runs: list[BatchRun], excel: str | Path, cache: DataCache | None = None) -> dict[str, dict]:
+    # Workbook data (and its data_cache_key) once per distinct data config, phase-0 samples once per
+    # (data, tenor) and spot panels once per (data, FX shrinkage), keyed by _data_key
+    data: dict[str, LoadedData] = {}
+    data_keys: dict[str, str] = {}
+    samples: dict[tuple[str, int], dict[str, np.ndarray]] = {}
+    panels: dict[tuple[str, float], SpotPanel] = {}
+    for run in runs:
+        cfg = run.cfg
+        if cfg is None:
+            continue
+        key = _data_key(cfg)
+        if key not in data:
+            data_keys[key] = data_cache_key(excel, cfg)
+            data[key] = load_data_cached(excel, cfg, cache, key=data_keys[key])
+        tenor_months = cfg.portfolio.tenor_years * 12
+        if (key, tenor_months) not in samples:
+            samples[key, tenor_months] = {
+                ccy: phase0_mtm_positive(data[key].fx[ccy], tenor_months=tenor_months) for ccy in cfg.universe.currencies
+            }
+        if cfg.run.phase >= 2 and (key, cfg.simulation.fx_shrinkage) not in panels:
+            panels[key, cfg.simulation.fx_shrinkage] = build_spot_panel(
+                data[key].fx,
+                cfg.universe.currencies,
+                build_rate_curves(data[key].rates, cfg.data.rates),
+                cfg.simulation.fx_shrinkage,
+            )
+    return {"data": data, "data_keys": data_keys, "samples": samples, "panels": panels}
+
+
+COMPARISON_COLUMNS = [
+    "run",
+    "status",
+    "el_bps",
+    "severity_capital_pct",
+    "implied_max_leverage",
+    "simulated_capital_pct",
+    "paths",
+    "equity_roe",
+    "guarantor_roe",
+    "break_even_fee_bps",
+    "error",
+]
+
+
+def comparison_row(run: BatchRun, summary: dict) -> dict:
+    notional = run.cfg.portfolio.notional_usd_total
+    returns = summary["capital_stack_returns"]
+    sim = summary["simulation"] or {}
+    return {
+        "run": run.name,
+        "status": "ok",
+        "el_bps": summary["expected_loss_amount"] / notional * 10000,
+        "severity_capital_pct": summary["capital"]["severity_capital_pct"],
+        "implied_max_leverage": summary["capital"]["implied_max_leverage"],
+        "simulated_capital_pct": sim.get("capital_pct"),
+        "paths": sim.get("paths"),
+        "equity_roe": returns["equity_roe"],
+        "guarantor_roe": returns["guarantor_roe"],
+        "break_even_fee_bps": returns["break_even_fee_bps_for_15pct_target_roe"],
+        "error": None,
+    }
+
+
+def _run_one(run: BatchRun) -> dict:
+    if run.cfg is None:
+        return {"run": run.name, "status": "error", "error": run.error}
+    s = worker_state()
+    cfg = run.cfg
+    key = _data_key(cfg)
+    try:
+        summary = run_model(
+            cfg,
+            s["shared"]["data"][key],
+            s["out_dir"] / run.name,
+            charts=s["charts"],
+            output_format=s["output_format"],
+            samples_by_ccy=s["shared"]["samples"][key, cfg.portfolio.tenor_years * 12],
+            panel=s["shared"]["panels"].get((key, cfg.simulation.fx_shrinkage)),
+            stage_cache=s["stage_cache"],
+            data_key=s["shared"]["data_keys"][key],
+        )
+    except Exception as exc:  # one bad variant must not sink the rest of the batch
+        return {"run": run.name, "status": "error", "error": f"{type(exc).__name__}: {exc}"}
+    return comparison_row(run, summary)
+
+
+def run_batch(
+    runs: list[BatchRun],
+    excel: str | Path,
+    out_dir: Path,
+    workers: int = 1,
+    cache: DataCache | None = None,
+    charts: bool = True,
+    output_format: Literal["markdown", "json"] = "markdown",
+    stage_cache: StageCache | None = None,
+) -> pd.DataFrame:
+    # Per-run outputs go to out_dir/<run name>/ as for the CLI; the comparison table (one row per run,
+    # in input order) is written to out_dir/comparison.csv and comparison.md and returned.
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    shared = shared_inputs(runs, excel, cache)
+    state = dict(shared=shared, out_dir=out_dir, charts=charts, output_format=output_format, stage_cache=stage_cache)
+    with worker_pool(max(min(workers, len(runs)), 1), state) as pool:
+        rows = list(pool.map(_run_one, runs))
+
+    table = pd.DataFrame(rows, columns=COMPARISON_COLUMNS)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    table.to_csv(out_dir / "comparison.csv", index=False)
+    write_report(out_dir / "comparison.md", "# Batch Comparison\n\n" + to_markdown_table(table.to_dict("records")))
+    return table
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Run many guarantee vehicle configs against one workbook")
+    p.add_argument("configs", nargs="+", help="YAML files, directories or globs")
+    p.add_argument("--excel", required=True)
+    p.add_argument("--base", default=None, help="Base config; the configs are then partial overrides of it")
+    p.add_argument("--out-dir", default="outputs/batch")
+    p.add_argument("--workers", type=int, default=1, help="Processes running configs in parallel")
+    p.add_argument("--no-cache", action="store_true", help="Always re-parse the workbook and recompute every stage")
+    p.add_argument("--cache-dir", default=None, help="Directory for cached workbook data and stage results")
+    p.add_argument("--no-charts", action="store_true", help="Skip the per-run figures")
+    p.add_argument("--format", choices=["markdown", "json"], default="markdown", help="Per-run report format")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    runs = load_batch_runs(args.configs, args.base)
+    cache_dir = Path(args.cache_dir or DEFAULT_CACHE_DIR)
+    cache = None if args.no_cache else DataCache(cache_dir)
+    out_dir = Path(args.out_dir)
+    table = run_batch(
+        runs,
+        args.excel,
+        out_dir,
+        workers=args.workers,
+        cache=cache,
+        charts=not args.no_charts,
+        output_format=args.format,
+        stage_cache=None if args.no_cache else StageCache(cache_dir / "stages"),
+    )
+    failed = table[table["status"] != "ok"]
+    print(f"{len(table) - len(failed)}/{len(table)} runs ok; comparison in {out_dir / 'comparison.csv'}")
+    for row in failed.itertuples():
+        print(f"  {row.run}: {row.error}", file=sys.stderr)
+    if len(failed):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,18 @@
 from guarantee_vehicle.capital.rating_capital import severity_capital, var_or_es
-from guarantee_vehicle.capital.returns import break_even_fee_bps, stack_returns
+from guarantee_vehicle.capital.returns import (
+    CompiledStack,
+    break_even_fee_bps,
+    compile_stack,
+    returns_for_leverage,
+    stack_returns,
+)
 
-__all__ = ["severity_capital", "var_or_es", "break_even_fee_bps", "stack_returns"]
+__all__ = [
+    "CompiledStack",
+    "break_even_fee_bps",
+    "compile_stack",
+    "returns_for_leverage",
+    "severity_capital",
+    "stack_returns",
+    "var_or_es",
+]
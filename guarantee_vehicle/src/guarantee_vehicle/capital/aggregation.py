@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+
 import numpy as np
 
+from guarantee_vehicle.stats.sketch import LogHistogramSketch
+
 
 def weighted_portfolio_samples(samples_by_ccy: dict[str, np.ndarray], weights: dict[str, float]) -> np.ndarray:
     n = min(len(v) for v in samples_by_ccy.values())
@@ -9,3 +13,21 @@ def weighted_portfolio_samples(samples_by_ccy: dict[str, np.ndarray], weights: d
     for ccy, s in samples_by_ccy.items():
         acc += weights[ccy] * s[:n]
     return acc
+
+
+def weighted_portfolio_sketch(
+    chunks_by_ccy: dict[str, Iterator[np.ndarray]], weights: dict[str, float], sketch: LogHistogramSketch | None = None
+) -> LogHistogramSketch:
+    # streaming weighted_portfolio_samples: iterators must yield equally sized, aligned chunks
+    sketch = sketch if sketch is not None else LogHistogramSketch()
+    while True:
+        chunks = {ccy: next(it, None) for ccy, it in chunks_by_ccy.items()}
+        if any(c is None or len(c) == 0 for c in chunks.values()):
+            return sketch
+        n = min(len(c) for c in chunks.values())
+        acc = np.zeros(n)
+        for ccy, c in chunks.items():
+            acc += weights[ccy] * c[:n]
+        sketch.update(acc)
+        if any(len(c) > n for c in chunks.values()):
+            return sketch
@@ -2,13 +2,35 @@ from __future__ import annotations
 
 import numpy as np
 
+from guarantee_vehicle.stats.risk_metrics import RiskMetrics
+from guarantee_vehicle.stats.sketch import LogHistogramSketch
 
-def severity_capital(samples: np.ndarray, quantile: float, addon_pct: float) -> float:
-    sev = float(np.quantile(samples, quantile))
+
+def severity_capital(
+    samples: np.ndarray | RiskMetrics | LogHistogramSketch,
+    quantile: float,
+    addon_pct: float,
+    weights: np.ndarray | None = None,
+) -> float:
+    if weights is not None:
+        samples = RiskMetrics(samples, weights)
+    if isinstance(samples, (RiskMetrics, LogHistogramSketch)):
+        sev = float(samples.quantile(quantile))
+    else:
+        sev = float(np.quantile(samples, quantile))
     return sev * (1 + addon_pct)
 
 
-def var_or_es(losses: np.ndarray, confidence: float, method: str) -> float:
+def var_or_es(
+    losses: np.ndarray | RiskMetrics | LogHistogramSketch,
+    confidence: float,
+    method: str,
+    weights: np.ndarray | None = None,
+) -> float:
+    if weights is not None:
+        losses = RiskMetrics(losses, weights)
+    if isinstance(losses, (RiskMetrics, LogHistogramSketch)):
+        return losses.var_or_es(confidence, method)
     v = float(np.quantile(losses, confidence))
     if method == "VaR":
         return v
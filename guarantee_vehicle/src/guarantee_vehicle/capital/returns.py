@@ -1,41 +1,103 @@
 from __future__ import annotations
 
-from guarantee_vehicle.config import AppConfig
+from dataclasses import dataclass
+
+import numpy as np
+
+from guarantee_vehicle.config import AppConfig, StackLayer
 
 
 def bps_to_amount(bps: float, notional: float) -> float:
     return bps / 10000.0 * notional
 
 
-def stack_returns(cfg: AppConfig, notional: float, expected_loss_amount: float) -> dict[str, float]:
+@dataclass(frozen=True)
+class CompiledStack:
+    # per-layer arrays, all as fractions of notional
+    kind: np.ndarray
+    attach: np.ndarray
+    detach: np.ndarray
+    coupon: np.ndarray
+    fee_rate: np.ndarray
+    capital_factor: np.ndarray
+
+    @property
+    def thickness(self) -> np.ndarray:
+        return self.detach - self.attach
+
+    def _total(self, kind: str, values: np.ndarray | None = None) -> float:
+        mask = self.kind == kind
+        return float((self.thickness[mask] * (1.0 if values is None else values[mask])).sum())
+
+    @property
+    def equity_pct(self) -> float:
+        return self._total("equity")
+
+    @property
+    def mezz_pct(self) -> float:
+        return self._total("mezz")
+
+    @property
+    def guaranteed_pct(self) -> float:
+        return self._total("counter_guarantee")
+
+    @property
+    def mezz_coupon_rate(self) -> float:
+        return self._total("mezz", self.coupon)
+
+    @property
+    def guarantee_fee_rate(self) -> float:
+        return self._total("counter_guarantee", self.fee_rate)
+
+    @property
+    def guarantor_capital_pct(self) -> float:
+        return self._total("counter_guarantee", self.capital_factor)
+
+    @property
+    def mezz_return(self) -> float:
+        return self.mezz_coupon_rate / self.mezz_pct if self.mezz_pct > 0 else 0.0
+
+    @property
+    def guarantor_return(self) -> float:
+        return self.guarantee_fee_rate / self.guaranteed_pct if self.guaranteed_pct > 0 else 0.0
+
+    @property
+    def guarantor_roe(self) -> float:
+        return self.guarantee_fee_rate / self.guarantor_capital_pct if self.guarantor_capital_pct > 0 else 0.0
+
+    @property
+    def min_leverage(self) -> float:
+        # equity is re-sized to 1 / leverage under the other layers, which keep their thickness
+        headroom = 1.0 - (self.thickness.sum() - self.equity_pct)
+        return 1.0 / headroom if headroom > 0 else np.inf
+
+
+def compile_stack(layers: list[StackLayer]) -> CompiledStack:
+    return CompiledStack(
+        kind=np.array([layer.type for layer in layers]),
+        attach=np.array([layer.attach_pct for layer in layers], dtype=float),
+        detach=np.array([layer.detach_pct for layer in layers], dtype=float),
+        coupon=np.array([layer.coupon_pct or 0.0 for layer in layers], dtype=float),
+        fee_rate=np.array([(layer.fee_bps_on_guaranteed_amount or 0.0) / 10000.0 for layer in layers], dtype=float),
+        capital_factor=np.array([layer.guarantor_capital_factor or 0.0 for layer in layers], dtype=float),
+    )
+
+
+def stack_returns(
+    cfg: AppConfig, notional: float, expected_loss_amount: float | np.ndarray, stack: CompiledStack | None = None
+) -> dict[str, float | np.ndarray]:
+    stack = stack or compile_stack(cfg.capital_stack)
     gross = bps_to_amount(cfg.economics.client_fee_bps_pa, notional)
     opex = bps_to_amount(cfg.economics.opex_bps_pa, notional)
     ndf_addon = bps_to_amount(cfg.economics.ndf_cost_addon_bps_pa, notional)
     reserve = bps_to_amount(cfg.economics.reserve_build_bps_pa, notional)
 
-    mezz_coupon = 0.0
-    cg_fee = 0.0
-    equity_amt = 0.0
-    mezz_amt = 0.0
-    cg_amt = 0.0
-    cg_cap_factor = None
-
-    for layer in cfg.capital_stack:
-        layer_amt = (layer.detach_pct - layer.attach_pct) * notional
-        if layer.type == "equity":
-            equity_amt += layer_amt
-        elif layer.type == "mezz":
-            mezz_amt += layer_amt
-            mezz_coupon += (layer.coupon_pct or 0.0) * layer_amt
-        elif layer.type == "counter_guarantee":
-            cg_amt += layer_amt
-            cg_fee += (layer.fee_bps_on_guaranteed_amount or 0.0) / 10000.0 * layer_amt
-            cg_cap_factor = layer.guarantor_capital_factor
+    mezz_coupon = stack.mezz_coupon_rate * notional
+    cg_fee = stack.guarantee_fee_rate * notional
+    equity_amt = stack.equity_pct * notional
 
     residual_to_equity = gross - opex - ndf_addon - reserve - expected_loss_amount - mezz_coupon - cg_fee
-    equity_roe = residual_to_equity / equity_amt if equity_amt > 0 else 0.0
-    guarantor_return = cg_fee / cg_amt if cg_amt > 0 else 0.0
-    guarantor_roe = guarantor_return / cg_cap_factor if cg_cap_factor else 0.0
+    equity_roe = residual_to_equity / equity_amt if equity_amt > 0 else 0.0 * residual_to_equity
 
     return {
         "gross_premium": gross,
@@ -48,9 +110,48 @@ def stack_returns(cfg: AppConfig, notional: float, expected_loss_amount: float)
         "equity_residual": residual_to_equity,
         "equity_amount": equity_amt,
         "equity_roe": equity_roe,
-        "mezz_return": cfg.capital_stack[1].coupon_pct if len(cfg.capital_stack) > 1 and cfg.capital_stack[1].coupon_pct else 0.0,
-        "guarantor_return_on_guaranteed_amount": guarantor_return,
-        "guarantor_roe": guarantor_roe,
+        "mezz_return": stack.mezz_return,
+        "guarantor_return_on_guaranteed_amount": stack.guarantor_return,
+        "guarantor_roe": stack.guarantor_roe,
+    }
+
+
+def returns_for_leverage(
+    cfg: AppConfig,
+    leverage: float | np.ndarray,
+    expected_loss_rate: float | np.ndarray,
+    client_fee_bps: float | np.ndarray | None = None,
+    stack: CompiledStack | None = None,
+) -> dict[str, float | np.ndarray]:
+    # Per unit of notional; leverage, expected_loss_rate and client_fee_bps broadcast against each other.
+    stack = stack or compile_stack(cfg.capital_stack)
+    lev = np.asarray(leverage, dtype=float)
+    if np.any(lev < stack.min_leverage):
+        raise ValueError(
+            f"Leverage must be at least {stack.min_leverage:.4g}x for the configured capital stack, got {leverage}"
+        )
+    fee_bps = cfg.economics.client_fee_bps_pa if client_fee_bps is None else np.asarray(client_fee_bps, dtype=float)
+    fixed_costs_rate = (
+        (cfg.economics.opex_bps_pa + cfg.economics.ndf_cost_addon_bps_pa + cfg.economics.reserve_build_bps_pa) / 10000.0
+        + np.asarray(expected_loss_rate, dtype=float)
+        + stack.mezz_coupon_rate
+        + stack.guarantee_fee_rate
+    )
+    residual_rate = fee_bps / 10000.0 - fixed_costs_rate
+    equity_roe = residual_rate * lev
+
+    def _out(x: float | np.ndarray) -> float | np.ndarray:
+        return float(x) if np.ndim(x) == 0 else x
+
+    return {
+        "leverage": _out(lev),
+        "equity_pct": _out(1.0 / lev),
+        "fixed_costs_rate": _out(fixed_costs_rate),
+        "net_margin_bps": _out(residual_rate * 10000.0),
+        "equity_roe": _out(equity_roe),
+        "mezz_return": stack.mezz_return,
+        "guarantor_return_on_guaranteed_amount": stack.guarantor_return,
+        "guarantor_roe": stack.guarantor_roe,
     }
 
 
@@ -1,180 +1,288 @@
 from __future__ import annotations
 
 import argparse
+from dataclasses import asdict
 from pathlib import Path
+from typing import Literal
 
 import numpy as np
+import pandas as pd
 
-from guarantee_vehicle.capital.aggregation import weighted_portfolio_samples
-from guarantee_vehicle.capital.rating_capital import severity_capital
-from guarantee_vehicle.capital.returns import break_even_fee_bps, stack_returns
-from guarantee_vehicle.config import load_config
-from guarantee_vehicle.credit.default_model import draw_default_times
-from guarantee_vehicle.guarantee.payout import payout_default_only
-from guarantee_vehicle.instruments.ccs import CCSParams, mtm_ccs_lender
-from guarantee_vehicle.instruments.ndf import NDFParams, mtm_ndf_lender
-from guarantee_vehicle.io import load_data, validate_loaded_data
-from guarantee_vehicle.market.fx import phase0_mtm_positive, summarize_mtm_distribution
+from guarantee_vehicle.config import AppConfig, load_config
+from guarantee_vehicle.io import LoadedData, load_data_cached
+from guarantee_vehicle.io.cache import DEFAULT_CACHE_DIR, DataCache, data_cache_key
+from guarantee_vehicle.pipeline import MODEL_STAGES, StageCache, StageContext, apply_trade_book, run_stages
+from guarantee_vehicle.portfolio.book import load_trade_book
+from guarantee_vehicle.profiling import Profiler
 from guarantee_vehicle.reporting.charts import plot_leverage_vs_roe, plot_loss_exceedance
 from guarantee_vehicle.reporting.tables import to_markdown_table
+from guarantee_vehicle.reporting.report_json import write_json_report
 from guarantee_vehicle.reporting.report_md import write_report
+from guarantee_vehicle.simulation.loss_engine import SpotPanel
 
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Guarantee vehicle model")
     p.add_argument("--config", required=True)
     p.add_argument("--excel", required=True)
+    p.add_argument("--no-cache", action="store_true", help="Always re-parse the workbook and recompute every stage")
+    p.add_argument("--cache-dir", default=None, help="Directory for cached workbook data and stage results")
+    p.add_argument("--workers", type=int, default=1, help="Processes for the phase-2 simulation")
+    p.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record per-stage time and memory to outputs/profile.json and the report",
+    )
+    p.add_argument(
+        "--sketch",
+        action="store_true",
+        help="Summarise phase-0 and phase-2 samples in log-histogram sketches (sets sketch.enabled)",
+    )
+    p.add_argument("--no-charts", action="store_true", help="Skip the figures (matplotlib is never imported)")
+    p.add_argument(
+        "--format",
+        choices=["markdown", "json"],
+        default="markdown",
+        help="outputs/report.md, or outputs/report.json without charts",
+    )
     return p.parse_args()
 
 
 def run() -> None:
     args = parse_args()
-    cfg = load_config(args.config)
-    data = load_data(args.excel, cfg)
-    checks = validate_loaded_data(data, cfg)
-
-    weights = (
-        {c: 1 / len(cfg.universe.currencies) for c in cfg.universe.currencies}
-        if cfg.portfolio.weighting == "equal"
-        else cfg.portfolio.custom_weights
-    )
+    with Profiler(enabled=args.profile) as prof:
+        with prof.stage("load_data") as st:
+            cfg = load_config(args.config)
+            if args.sketch:
+                # validated again, so options the sketch cannot serve are still rejected
+                sketch = cfg.sketch.model_dump() | {"enabled": True}
+                cfg = AppConfig.model_validate(cfg.model_dump() | {"sketch": sketch})
+            cache_dir = Path(args.cache_dir or DEFAULT_CACHE_DIR)
+            cache = None if args.no_cache else DataCache(cache_dir)
+            data_key = None if args.no_cache else data_cache_key(args.excel, cfg)
+            data = load_data_cached(args.excel, cfg, cache, key=data_key)
+            st.add_arrays(fx=data.fx, rates=data.rates)
+        run_model(
+            cfg,
+            data,
+            Path("outputs"),
+            prof=prof,
+            workers=args.workers,
+            charts=not args.no_charts,
+            output_format=args.format,
+            stage_cache=None if args.no_cache else StageCache(cache_dir / "stages"),
+            data_key=data_key,
+        )
+
+
+def run_model(
+    cfg: AppConfig,
+    data: LoadedData,
+    out_dir: Path,
+    prof: Profiler | None = None,
+    workers: int = 1,
+    charts: bool = True,
+    output_format: Literal["markdown", "json"] = "markdown",
+    samples_by_ccy: dict[str, np.ndarray] | None = None,
+    panel: SpotPanel | None = None,
+    stage_cache: StageCache | None = None,
+    data_key: str | None = None,
+) -> dict:
+    # Everything after the data load; writes the report, charts and grid to out_dir and returns the
+    # report.json content. samples_by_ccy / panel may be passed in when several runs share the data
+    # (phase-0 samples for cfg.portfolio.tenor_years, spot panel for cfg.simulation.fx_shrinkage).
+    # With stage_cache (and data_key), unchanged stages are read back instead of recomputed. A
+    # portfolio.trade_book is loaded here and replaces the configured weights and notional.
+    prof = prof or Profiler()
+    book = None
+    if cfg.portfolio.trade_book is not None:
+        with prof.stage("load_trade_book") as st:
+            book = load_trade_book(cfg.portfolio.trade_book, cfg.universe.currencies)
+            st.add_arrays(notional=book.notional, obligor_offsets=book.obligor_offsets)
+            st.annotate(trades=book.n_trades, counterparties=book.n_obligors)
+        cfg = apply_trade_book(cfg, book)
+        data_key = None if data_key is None else f"{data_key}-{book.digest()}"
+    ctx = StageContext(data, data_key, workers, samples_by_ccy, panel, book)
+    results, _ = run_stages(MODEL_STAGES, cfg, ctx, stage_cache, prof)
+    exposure, simulation, capital, economics = (results[k] for k in ("exposure", "simulation", "capital", "returns"))
+    ccy_stats = exposure["ccy_stats"]
+    capital_pct, leverage, loss_metrics = capital["capital_pct"], capital["leverage"], capital["loss_metrics"]
+    el_estimate, conv, el_lines = simulation["el_estimate"], simulation["conv"], simulation["el_lines"]
+    pd_rows, returns, be_fee = economics["pd_rows"], economics["returns"], economics["break_even_fee_bps"]
+    expected_loss_amount, scenario_grid = economics["expected_loss_amount"], economics["scenario_grid"]
+    lev_axis, curves = economics["lev_axis"], economics["curves"]
+    checks = [*results["validate"]["checks"], *economics["checks"]]
+    profiles = results["exposure_profile"]["profiles"]
 
-    ccy_stats = []
-    samples_by_ccy = {}
-    for ccy in cfg.universe.currencies:
-        samples = phase0_mtm_positive(data.fx[ccy], tenor_months=cfg.portfolio.tenor_years * 12)
-        samples_by_ccy[ccy] = samples
-        stats = summarize_mtm_distribution(samples)
-        ccy_stats.append({"currency": ccy, **stats})
-
-    portfolio_samples = weighted_portfolio_samples(samples_by_ccy, weights)
-
-    pd_rows = []
-    for pd_annual in cfg.credit.pd_scenarios_annual:
-        el_bps = pd_annual * float(np.mean(portfolio_samples)) * 10000
-        net_margin = (
-            cfg.economics.client_fee_bps_pa
-            - cfg.economics.opex_bps_pa
-            - cfg.economics.ndf_cost_addon_bps_pa
-            - cfg.economics.reserve_build_bps_pa
-            - el_bps
+    charts = charts and output_format == "markdown"
+    if charts:
+        with prof.stage("charts"):
+            fig1 = out_dir / "figures" / "leverage_vs_roe.png"
+            fig2 = out_dir / "figures" / "loss_exceedance.png"
+            plot_leverage_vs_roe(fig1, lev_axis, curves)
+            if loss_metrics is not None:
+                plot_loss_exceedance(fig2, loss_metrics)
+    if scenario_grid is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        scenario_grid.to_csv(out_dir / "scenario_grid.csv", index=False)
+    if profiles is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        profile_rows = [row for p in profiles.values() for row in p.rows()]
+        peak_rows = [p.peak_summary() for p in profiles.values()]
+        pd.DataFrame(profile_rows).to_csv(out_dir / "exposure_profile.csv", index=False)
+
+    with prof.stage("report"):
+        tilt = cfg.simulation.importance_sampling
+        sampling_note = (
+            f"importance sampling: hazard x{tilt.hazard_multiplier:g}, FX shift {tilt.fx_shift_sd:g} sd"
+            if tilt.enabled
+            else "plain Monte Carlo"
         )
-        pd_rows.append({"pd": pd_annual, "el_bps": el_bps, "net_margin_bps": net_margin})
-
-    el_values = [r["el_bps"] for r in pd_rows]
-    checks.append(f"EL monotonic with PD: {all(el_values[i] <= el_values[i+1] for i in range(len(el_values)-1))}")
-
-    capital_pct = severity_capital(portfolio_samples, 0.995, cfg.capital_target.addon_pct)
-    leverage = 1 / capital_pct if capital_pct > 0 else 0.0
-
-    phase2_losses = None
-    if cfg.run.phase >= 2:
-        n_sim = min(5000, len(portfolio_samples))
-        rng = np.random.default_rng(cfg.run.seed)
-        losses = []
-        for _ in range(n_sim):
-            loss = 0.0
-            for ccy in cfg.universe.currencies:
-                spot_series = data.fx[ccy].dropna().values
-                if len(spot_series) < 3:
-                    continue
-                idx0 = int(rng.integers(0, len(spot_series) - 2))
-                s0 = float(spot_series[idx0])
-                t_default = draw_default_times(cfg.credit.pd_scenarios_annual[1], cfg.portfolio.tenor_years, 1, int(rng.integers(1e9)))[0]
-                if np.isinf(t_default):
-                    continue
-                t_idx = min(idx0 + max(1, int(round(t_default * 12))), len(spot_series) - 1)
-                st = float(spot_series[t_idx])
-
-                notional = cfg.portfolio.notional_usd_total * weights[ccy]
-                usd_rate = 0.03
-                lcy_rate = 0.06
-
-                ccs = CCSParams(notional, s0, 0.03, 0.06, cfg.portfolio.tenor_years)
-                ndf = NDFParams(notional, s0, cfg.portfolio.tenor_years)
-                mtm = (
-                    cfg.portfolio.mix.CCS * mtm_ccs_lender(ccs, st, t_default, usd_rate, lcy_rate)
-                    + cfg.portfolio.mix.NDF * mtm_ndf_lender(ndf, st, t_default, usd_rate, lcy_rate)
-                )
-                payout = payout_default_only(
-                    mtm,
-                    cfg.guarantee.coverage_pct,
-                    cfg.guarantee.attachment_pct_notional,
-                    cfg.guarantee.detachment_pct_notional,
-                    notional,
-                )
-                loss += payout
-            losses.append(loss)
-        phase2_losses = np.array(losses)
-
-    expected_loss_amount = np.mean(phase2_losses) if phase2_losses is not None else np.mean(portfolio_samples) * cfg.credit.pd_scenarios_annual[1] * cfg.portfolio.notional_usd_total
-    returns = stack_returns(cfg, cfg.portfolio.notional_usd_total, float(expected_loss_amount))
-    fixed_costs_amount = (
-        returns["opex"]
-        + returns["ndf_addon"]
-        + returns["reserve"]
-        + returns["expected_loss"]
-        + returns["mezz_coupon_amount"]
-        + returns["counter_guarantee_fee_amount"]
-    )
-    be_fee = break_even_fee_bps(0.15, returns["equity_amount"], fixed_costs_amount, cfg.portfolio.notional_usd_total)
-
-    lev_axis = np.arange(5, 31)
-    curves = {}
-    for pdv in cfg.credit.pd_scenarios_annual:
-        el_per_notional = pdv * float(np.mean(portfolio_samples))
-        curves[f"All-equity PD {int(pdv*100)}%"] = lev_axis * (
-            cfg.economics.client_fee_bps_pa - cfg.economics.opex_bps_pa - el_per_notional * 10000
-        ) / 10000
-    curves["Equity ROE after stack costs (PD 4%)"] = np.full_like(lev_axis, returns["equity_roe"], dtype=float)
-
-    out_dir = Path("outputs")
-    fig1 = out_dir / "figures" / "leverage_vs_roe.png"
-    fig2 = out_dir / "figures" / "loss_exceedance.png"
-    plot_leverage_vs_roe(fig1, lev_axis, curves)
-    if phase2_losses is not None and len(phase2_losses) > 0:
-        plot_loss_exceedance(fig2, phase2_losses)
-
-    roe_line = curves["All-equity PD 4%"] if "All-equity PD 4%" in curves else next(iter(curves.values()))
-    checks.append(f"ROE monotonic with leverage: {bool(np.all(np.diff(roe_line) >= -1e-12))}")
-    checks.append(
-        "Counter-guarantee return matches configured fee: "
-        f"{abs(returns['guarantor_return_on_guaranteed_amount'] - ((cfg.capital_stack[2].fee_bps_on_guaranteed_amount or 0)/10000.0)) < 1e-12}"
-    )
-    checks.append("Report and charts generated")
-
-    report = [
-        "# Guarantee Vehicle Report",
-        "",
-        "## Input Summary",
-        f"- Phase: {cfg.run.phase}",
-        f"- Currencies: {', '.join(cfg.universe.currencies)}",
-        f"- Portfolio notional USD: {cfg.portfolio.notional_usd_total:,.0f}",
-        "",
-        "## Currency MTM+ Statistics",
-        to_markdown_table(ccy_stats),
-        "",
-        "## EL and Net Margin by PD Scenario",
-        to_markdown_table(pd_rows),
-        "",
-        "## Capital and Leverage",
-        f"- Severity capital (% notional): {capital_pct:.4%}",
-        f"- Implied max leverage: {leverage:.2f}x",
-        "",
-        "## Capital Stack Returns",
-        to_markdown_table([returns | {"break_even_fee_bps_for_15pct_target_roe": be_fee}]),
-        "",
-        "## Acceptance Checks",
-    ]
-    report.extend([f"- {c}" for c in checks])
-    report.extend([
-        "",
-        "## Figures",
-        f"![Leverage vs ROE](figures/leverage_vs_roe.png)",
-        f"![Loss exceedance](figures/loss_exceedance.png)",
-    ])
-
-    write_report(out_dir / "report.md", "\n".join(report))
+
+        checks.append("Report and charts generated" if charts else "Report generated")
+
+        dependence = cfg.credit.fx_default_dependence
+        summary = {
+            "inputs": {
+                "phase": cfg.run.phase,
+                "currencies": cfg.universe.currencies,
+                "notional_usd_total": cfg.portfolio.notional_usd_total,
+                "trade_book": None
+                if book is None
+                else {"path": cfg.portfolio.trade_book, "trades": book.n_trades, "counterparties": book.n_obligors},
+                "fx_model": cfg.simulation.fx_model,
+                "fx_default_dependence": (
+                    {"method": dependence.method, "strength": dependence.strength} if dependence.enabled else None
+                ),
+            },
+            "currency_mtm_stats": ccy_stats,
+            "exposure_profile": None
+            if profiles is None
+            else {
+                "bucket_months": cfg.exposure_profile.bucket_months,
+                "portfolio": profiles["portfolio"].rows(),
+                "peak_mtm_positive": peak_rows,
+                "csv": "exposure_profile.csv",
+            },
+            "pd_scenarios": pd_rows,
+            "capital": {"severity_capital_pct": capital_pct, "implied_max_leverage": leverage},
+            "expected_loss_amount": float(expected_loss_amount),
+            "simulation": None,
+            "capital_stack_returns": returns | {"break_even_fee_bps_for_15pct_target_roe": be_fee},
+            "checks": checks,
+        }
+        if scenario_grid is not None:
+            summary["simulation"] = {
+                "paths": loss_metrics.n,
+                "sampling": sampling_note,
+                "effective_sample_size": loss_metrics.effective_sample_size,
+                "capital_pct": loss_metrics.var_or_es(cfg.capital_target.confidence, cfg.capital_target.method)
+                / cfg.portfolio.notional_usd_total,
+                "expected_loss": asdict(el_estimate) | {"confidence_interval": el_estimate.confidence_interval()},
+                "convergence": None if conv is None else asdict(conv),
+                "scenarios": scenario_grid.drop_duplicates(["pd", "coverage_pct"])[
+                    ["pd", "coverage_pct", "el_bps", "capital_pct", "max_leverage"]
+                ].to_dict("records"),
+                "scenario_grid_csv": "scenario_grid.csv",
+            }
+        if prof.enabled:
+            summary["run_diagnostics"] = prof.table_rows()
+        if output_format == "json":
+            write_json_report(out_dir / "report.json", summary)
+        else:
+            report = [
+                "# Guarantee Vehicle Report",
+                "",
+                "## Input Summary",
+                f"- Phase: {cfg.run.phase}",
+                f"- Currencies: {', '.join(cfg.universe.currencies)}",
+                f"- Portfolio notional USD: {cfg.portfolio.notional_usd_total:,.0f}",
+                *(
+                    [f"- Trade book: `{cfg.portfolio.trade_book}` ({book.n_trades:,} trades, {book.n_obligors:,} counterparties)"]
+                    if book is not None
+                    else []
+                ),
+                f"- FX model: {cfg.simulation.fx_model}",
+                f"- FX/default dependence: "
+                + (
+                    f"{cfg.credit.fx_default_dependence.method} (strength {cfg.credit.fx_default_dependence.strength:+.2f})"
+                    + (
+                        "; each path's historical window is picked by ranking the windows' "
+                        f"{cfg.portfolio.tenor_years}-year FX moves against the copula FX factor"
+                        if cfg.simulation.fx_model == "historical"
+                        else ""
+                    )
+                    if cfg.credit.fx_default_dependence.enabled
+                    else "independent"
+                ),
+                "",
+                "## Currency MTM+ Statistics",
+                to_markdown_table(ccy_stats),
+                "",
+                *(
+                    [
+                        f"## Portfolio Exposure Profile ({cfg.exposure_profile.bucket_months}-month buckets)",
+                        to_markdown_table(profiles["portfolio"].rows()),
+                        "Per-currency profiles: `exposure_profile.csv`",
+                        "",
+                        "Peak MTM+ over the tenor by start date:",
+                        to_markdown_table(peak_rows),
+                        "",
+                    ]
+                    if profiles is not None
+                    else []
+                ),
+                "## EL and Net Margin by PD Scenario",
+                to_markdown_table(pd_rows),
+                "",
+                "## Capital and Leverage",
+                f"- Severity capital (% notional): {capital_pct:.4%}",
+                f"- Implied max leverage: {leverage:.2f}x",
+                "",
+                *(
+                    [
+                        "## Simulated EL and Capital by Scenario",
+                        to_markdown_table(
+                            scenario_grid.drop_duplicates(["pd", "coverage_pct"])[
+                                ["pd", "coverage_pct", "el_bps", "capital_pct", "max_leverage"]
+                            ].to_dict("records")
+                        ),
+                        f"Full PD x coverage x fee x leverage grid: `scenario_grid.csv` ({len(scenario_grid)} rows)",
+                        "",
+                        f"- Paths: {loss_metrics.n:,} ({sampling_note})",
+                        f"- Effective sample size: {loss_metrics.effective_sample_size:,.0f}",
+                        *el_lines,
+                        "",
+                    ]
+                    if scenario_grid is not None
+                    else []
+                ),
+                "## Capital Stack Returns",
+                to_markdown_table([returns | {"break_even_fee_bps_for_15pct_target_roe": be_fee}]),
+                "",
+                "## Acceptance Checks",
+            ]
+            report.extend([f"- {c}" for c in checks])
+            if charts:
+                report.extend([
+                    "",
+                    "## Figures",
+                    f"![Leverage vs ROE](figures/leverage_vs_roe.png)",
+                    f"![Loss exceedance](figures/loss_exceedance.png)",
+                ])
+            if prof.enabled:
+                report.extend([
+                    "",
+                    "## Run diagnostics",
+                    to_markdown_table(prof.report_rows()),
+                    f"Elapsed before report: {prof.total_wall_s:.2f}s; per-stage array sizes in `profile.json`",
+                ])
+
+            write_report(out_dir / "report.md", "\n".join(report))
+
+    if prof.enabled:
+        prof.write_json(out_dir / "profile.json")
+    return summary
 
 
 if __name__ == "__main__":
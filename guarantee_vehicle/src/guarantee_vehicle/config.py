@@ -30,11 +30,20 @@ class RatesConfig(BaseModel):
     enabled: bool = True
     sheet: str
     mapping: dict[str, str]
+    # None: each mapped row is a newest-first history and the latest value is used as a flat rate;
+    # otherwise each row holds zero rates at these pillars (years), one column each
+    pillar_years: list[float] | None = None
+    # mapping entry holding the USD curve; every other entry is a local-currency curve
+    usd_curve: str = "USD"
+    # flat rates for curves missing from the workbook (all of them when rates are disabled)
+    fallback_usd_rate: float = 0.03
+    fallback_lcy_rate: float = 0.06
 
 
 class DataConfig(BaseModel):
     excel: ExcelDataConfig
     rates: RatesConfig
+    backend: Literal["pandas", "streaming"] = "pandas"
 
 
 class MixConfig(BaseModel):
@@ -55,12 +64,16 @@ class PortfolioConfig(BaseModel):
     weighting: Literal["equal", "custom"]
     custom_weights: dict[str, float] = Field(default_factory=dict)
     notional_usd_total: float = Field(gt=0)
+    # CSV / Parquet of trades (portfolio.book.BOOK_COLUMNS); when set it replaces the currency weights
+    # and total notional, and phase 2 simulates each counterparty's trades. A relative path is relative
+    # to the config file that sets it
+    trade_book: str | None = None
 
 
 class FXDefaultDependenceConfig(BaseModel):
     enabled: bool = False
-    method: str = "copula"
-    strength: float = 0.0
+    method: Literal["copula"] = "copula"
+    strength: float = Field(default=0.0, gt=-1, lt=1)
 
 
 class CreditConfig(BaseModel):
@@ -116,6 +129,81 @@ class StackLayer(BaseModel):
     guarantor_capital_factor: float | None = None
 
 
+class ImportanceSamplingConfig(BaseModel):
+    enabled: bool = False
+    # sampling hazard = hazard_multiplier x the scenario hazard
+    hazard_multiplier: float = Field(default=1.0, gt=0)
+    # mean of each currency's standardised cumulative FX shock over the tenor (correlated_gbm only);
+    # positive values oversample LCY depreciation
+    fx_shift_sd: float = 0.0
+
+
+class ConvergenceConfig(BaseModel):
+    # adaptive phase-2 path count: run chunk_paths-sized batches until both relative standard errors
+    # are within tolerance (after min_paths and min_batches) or a budget runs out
+    enabled: bool = False
+    el_rel_tol: float = Field(default=0.01, gt=0)
+    capital_rel_tol: float = Field(default=0.02, gt=0)
+    min_paths: int = Field(default=20_000, gt=0)
+    min_batches: int = Field(default=5, ge=2)
+    max_paths: int = Field(default=2_000_000, gt=0)
+    max_seconds: float | None = Field(default=None, gt=0)
+
+
+class SimulationConfig(BaseModel):
+    n_paths: int | None = Field(default=None, gt=0)
+    chunk_paths: int = Field(default=65_536, gt=0)
+    fx_model: Literal["historical", "correlated_gbm", "block_bootstrap"] = "historical"
+    fx_shrinkage: float = Field(default=0.0, ge=0, le=1)
+    bootstrap_method: Literal["stationary", "block"] = "stationary"
+    bootstrap_block_months: int = Field(default=12, gt=0)
+    importance_sampling: ImportanceSamplingConfig = Field(default_factory=ImportanceSamplingConfig)
+    # pair every path with a mirrored one (1 - u default uniforms, -z FX innovations)
+    antithetic: bool = False
+    # report EL with the phase-0 EL as a control variate
+    control_variate: bool = False
+    convergence: ConvergenceConfig = Field(default_factory=ConvergenceConfig)
+
+    @model_validator(mode="after")
+    def whole_antithetic_pairs(self) -> "SimulationConfig":
+        # antithetic pairs are rows 2j, 2j + 1 of a chunk: chunks must be even, and path counts are
+        # rounded up to even so the last chunk has no unpaired row
+        if not self.antithetic:
+            return self
+        if self.chunk_paths % 2:
+            raise ValueError(f"simulation.chunk_paths must be even with simulation.antithetic, got {self.chunk_paths}")
+        if self.n_paths is not None:
+            self.n_paths += self.n_paths % 2
+        self.convergence.max_paths += self.convergence.max_paths % 2
+        return self
+
+
+class ExposureProfileConfig(BaseModel):
+    # EE / PFE per horizon bucket of bucket_months, per currency and for the portfolio
+    enabled: bool = True
+    bucket_months: int = Field(default=12, gt=0)
+    pfe_quantiles: list[float] = Field(default_factory=lambda: [0.95, 0.99])
+
+    @model_validator(mode="after")
+    def quantiles_in_range(self) -> "ExposureProfileConfig":
+        if any(not 0 < q < 1 for q in self.pfe_quantiles):
+            raise ValueError(f"exposure_profile.pfe_quantiles must be in (0, 1), got {self.pfe_quantiles}")
+        return self
+
+
+class SketchConfig(BaseModel):
+    # summarise the phase-0 MTM+ and phase-2 losses in log-histogram sketches instead of keeping every
+    # sample; quantiles are then within relative_accuracy of the exact ones
+    enabled: bool = False
+    relative_accuracy: float = Field(default=0.005, gt=0, lt=1)
+
+
+class SweepConfig(BaseModel):
+    client_fee_bps_pa: list[float] = Field(default_factory=list)
+    coverage_pct: list[float] = Field(default_factory=list)
+    leverage: list[float] = Field(default_factory=list)
+
+
 class AppConfig(BaseModel):
     run: RunConfig
     universe: UniverseConfig
@@ -126,6 +214,10 @@ class AppConfig(BaseModel):
     economics: EconomicsConfig
     capital_target: CapitalTargetConfig
     capital_stack: list[StackLayer]
+    simulation: SimulationConfig = Field(default_factory=SimulationConfig)
+    sweep: SweepConfig = Field(default_factory=SweepConfig)
+    exposure_profile: ExposureProfileConfig = Field(default_factory=ExposureProfileConfig)
+    sketch: SketchConfig = Field(default_factory=SketchConfig)
 
     @model_validator(mode="after")
     def validate_stack(self) -> "AppConfig":
@@ -133,8 +225,56 @@ class AppConfig(BaseModel):
             raise ValueError("capital_stack cannot be empty")
         return self
 
+    @model_validator(mode="after")
+    def validate_trade_book_options(self) -> "AppConfig":
+        if self.portfolio.trade_book is None:
+            return self
+        unsupported = [
+            name
+            for name, enabled in (
+                ("simulation.importance_sampling", self.simulation.importance_sampling.enabled),
+                ("simulation.convergence", self.simulation.convergence.enabled),
+                ("simulation.control_variate", self.simulation.control_variate),
+                ("credit.fx_default_dependence", self.credit.fx_default_dependence.enabled),
+            )
+            if enabled
+        ]
+        if unsupported:
+            raise ValueError(f"portfolio.trade_book does not support {', '.join(unsupported)}")
+        return self
+
+    @model_validator(mode="after")
+    def validate_sketch_options(self) -> "AppConfig":
+        # the sketch keeps neither the paths nor their order, which these estimators need
+        if not self.sketch.enabled:
+            return self
+        unsupported = [
+            name
+            for name, enabled in (
+                ("portfolio.trade_book", self.portfolio.trade_book is not None),
+                ("simulation.importance_sampling", self.simulation.importance_sampling.enabled),
+                ("simulation.convergence", self.simulation.convergence.enabled),
+                ("simulation.antithetic", self.simulation.antithetic),
+                ("simulation.control_variate", self.simulation.control_variate),
+            )
+            if enabled
+        ]
+        if unsupported:
+            raise ValueError(f"sketch does not support {', '.join(unsupported)}")
+        return self
+
+
+def resolve_config_paths(raw: dict, config_dir: str | Path) -> dict:
+    # raw config with a relative portfolio.trade_book made absolute against config_dir (the directory of
+    # the YAML file that set it), so runs do not depend on the working directory
+    book = (raw.get("portfolio") or {}).get("trade_book")
+    if book is None or Path(book).is_absolute():
+        return raw
+    resolved = str((Path(config_dir) / book).resolve())
+    return raw | {"portfolio": raw["portfolio"] | {"trade_book": resolved}}
+
 
 def load_config(path: str | Path) -> AppConfig:
     with open(path, "r", encoding="utf-8") as f:
         raw = yaml.safe_load(f)
-    return AppConfig.model_validate(raw)
+    return AppConfig.model_validate(resolve_config_paths(raw, Path(path).parent))
@@ -1,3 +1,24 @@
-from guarantee_vehicle.credit.default_model import draw_default_times, hazard_from_annual_pd
+from guarantee_vehicle.credit.correlation import GaussianCopula, copula_for_config, correlate_normals, norm_cdf
+from guarantee_vehicle.credit.default_model import (
+    default_time_streams,
+    default_times_from_uniforms,
+    draw_default_times,
+    hazard_from_annual_pd,
+    hazard_tilt_log_weights,
+    sample_default_times,
+    tilted_pd,
+)
 
-__all__ = ["draw_default_times", "hazard_from_annual_pd"]
+__all__ = [
+    "GaussianCopula",
+    "copula_for_config",
+    "correlate_normals",
+    "default_time_streams",
+    "default_times_from_uniforms",
+    "draw_default_times",
+    "hazard_from_annual_pd",
+    "hazard_tilt_log_weights",
+    "norm_cdf",
+    "sample_default_times",
+    "tilted_pd",
+]
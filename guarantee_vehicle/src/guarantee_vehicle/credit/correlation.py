@@ -1,7 +1,101 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
+from functools import lru_cache
+
 import numpy as np
 
+from guarantee_vehicle.config import FXDefaultDependenceConfig
+from guarantee_vehicle.stats.variance_reduction import antithetic_normals
+
 
 def correlate_normals(chol: np.ndarray, z: np.ndarray) -> np.ndarray:
     return z @ chol.T
+
+
+# Numerical Recipes erfcc coefficients, highest order first; fractional error < 1.2e-7 everywhere
+_ERFC_COEFFS = (
+    0.17087277,
+    -0.82215223,
+    1.48851587,
+    -1.13520398,
+    0.27886807,
+    -0.18628806,
+    0.09678418,
+    0.37409196,
+    1.00002368,
+    -1.26551223,
+)
+
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = np.zeros_like(t)
+    for c in _ERFC_COEFFS:
+        poly = poly * t + c
+    half_erfc = 0.5 * t * np.exp(-z * z + poly)
+    return np.where(x >= 0, 1.0 - half_erfc, half_erfc)
+
+
+@dataclass(frozen=True)
+class GaussianCopula:
+    # Latent normals (z_fx, z_def) per currency. z_fx drives the LCY move (positive = LCY weakens,
+    # lender MTM up), low z_def means early default, and corr(z_fx_j, z_def_j) = -strength, so a
+    # positive strength is wrong-way risk. The joint correlation is
+    #     [[R, -s R], [-s R, s^2 R + (1 - s^2) I]]
+    # i.e. z_def = -s z_fx + sqrt(1 - s^2) eps, which stays positive definite for any FX correlation R.
+    strength: float
+    fx_correlation: np.ndarray
+    chol: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not -1.0 < self.strength < 1.0:
+            raise ValueError(f"Copula strength must be in (-1, 1), got {self.strength}")
+        r = np.asarray(self.fx_correlation, dtype=float)
+        s = self.strength
+        k = len(r)
+        corr = np.block([[r, -s * r], [-s * r, s * s * r + (1 - s * s) * np.eye(k)]])
+        try:
+            chol = np.linalg.cholesky(corr)
+        except np.linalg.LinAlgError as exc:
+            raise ValueError("FX correlation matrix is not positive definite") from exc
+        object.__setattr__(self, "chol", chol)
+
+    @property
+    def n_ccy(self) -> int:
+        return len(self.fx_correlation)
+
+    def draw(self, rng: np.random.Generator, n: int, antithetic: bool = False) -> tuple[np.ndarray, np.ndarray]:
+        shape = (n, 2 * self.n_ccy)
+        z = correlate_normals(self.chol, antithetic_normals(rng, shape) if antithetic else rng.standard_normal(shape))
+        return z[:, : self.n_ccy], z[:, self.n_ccy :]
+
+    def default_normals(self, z_fx: np.ndarray, rng: np.random.Generator, antithetic: bool = False) -> np.ndarray:
+        # z_def conditional on already simulated FX factors with correlation fx_correlation
+        s = self.strength
+        eps = antithetic_normals(rng, z_fx.shape) if antithetic else rng.standard_normal(z_fx.shape)
+        return -s * z_fx + np.sqrt(1 - s * s) * eps
+
+
+@lru_cache(maxsize=32)
+def _independent_fx_copula(strength: float, n_ccy: int) -> GaussianCopula:
+    return GaussianCopula(strength=strength, fx_correlation=np.eye(n_ccy))
+
+
+@lru_cache(maxsize=32)
+def _correlated_fx_copula(strength: float, n_ccy: int, corr_bytes: bytes) -> GaussianCopula:
+    # keyed on the correlation's bytes, so every chunk of a run shares one Cholesky factor
+    return GaussianCopula(strength=strength, fx_correlation=np.frombuffer(corr_bytes).reshape(n_ccy, n_ccy))
+
+
+def copula_for_config(
+    dep: FXDefaultDependenceConfig, n_ccy: int, fx_correlation: np.ndarray | None = None
+) -> GaussianCopula | None:
+    if not dep.enabled:
+        return None
+    if fx_correlation is None:
+        return _independent_fx_copula(float(dep.strength), n_ccy)
+    corr = np.ascontiguousarray(fx_correlation, dtype=float)
+    return _correlated_fx_copula(float(dep.strength), n_ccy, corr.tobytes())
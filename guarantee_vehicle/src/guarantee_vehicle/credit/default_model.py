@@ -1,16 +1,77 @@
 from __future__ import annotations
 
+from collections.abc import Sequence
+
 import numpy as np
 
+from guarantee_vehicle.stats.variance_reduction import antithetic_uniforms
+
 
 def hazard_from_annual_pd(pd_annual: float) -> float:
     return float(-np.log(1 - pd_annual))
 
 
-def draw_default_times(pd_annual: float, tenor_years: int, n: int, seed: int) -> np.ndarray:
-    lam = hazard_from_annual_pd(pd_annual)
-    rng = np.random.default_rng(seed)
-    u = rng.random(n)
+def default_time_streams(seed: int | np.random.SeedSequence, n_obligors: int) -> list[np.random.Generator]:
+    ss = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in ss.spawn(n_obligors)]
+
+
+def default_times_from_uniforms(u: np.ndarray, pd_annual: float | np.ndarray, tenor_years: float) -> np.ndarray:
+    lam = -np.log(1 - np.asarray(pd_annual, dtype=float))
     t = -np.log(1 - u) / lam
     t[t > tenor_years] = np.inf
     return t
+
+
+def sample_default_times(
+    rng: np.random.Generator | Sequence[np.random.Generator],
+    pd_annual: float | np.ndarray,
+    tenor_years: float,
+    n_paths: int,
+    antithetic: bool = False,
+) -> np.ndarray:
+    # pd_annual: scalar -> (n_paths,), (n_obligors,) -> (n_paths, n_obligors),
+    # (n_scenarios, n_obligors) -> (n_scenarios, n_paths, n_obligors) sharing the same uniforms.
+    # antithetic: paths 2j and 2j + 1 use u and 1 - u.
+    pds = np.asarray(pd_annual, dtype=float)
+    n_obligors = pds.shape[-1] if pds.ndim else 1
+    draw = antithetic_uniforms if antithetic else lambda g, shape: g.random(shape)
+    if isinstance(rng, np.random.Generator):
+        u = draw(rng, (n_paths, n_obligors))
+    else:
+        if len(rng) != n_obligors:
+            raise ValueError(f"Expected {n_obligors} default-time streams, got {len(rng)}")
+        u = np.stack([draw(g, n_paths) for g in rng], axis=1)
+
+    if pds.ndim == 0:
+        return default_times_from_uniforms(u[:, 0], pds, tenor_years)
+    if pds.ndim == 1:
+        return default_times_from_uniforms(u, pds, tenor_years)
+    if pds.ndim == 2:
+        return default_times_from_uniforms(np.broadcast_to(u, (pds.shape[0], *u.shape)), pds[:, None, :], tenor_years)
+    raise ValueError(f"pd_annual must be a scalar, vector or (scenarios x obligors) matrix, got shape {pds.shape}")
+
+
+def tilted_pd(pd_annual: float | np.ndarray, hazard_multiplier: float) -> np.ndarray:
+    # annual PD whose constant hazard is hazard_multiplier times that of pd_annual
+    return -np.expm1(hazard_multiplier * np.log1p(-np.asarray(pd_annual, dtype=float)))
+
+
+def hazard_tilt_log_weights(
+    default_time: np.ndarray, pd_annual: float | np.ndarray, hazard_multiplier: float, tenor_years: float
+) -> np.ndarray:
+    # Log likelihood ratio of default times drawn at hazard_multiplier x the hazard of pd_annual, summed
+    # over the last (obligor) axis. Survivors (inf) contribute the ratio of survival probabilities.
+    lam = -np.log1p(-np.asarray(pd_annual, dtype=float))
+    excess = lam * (1.0 - hazard_multiplier)
+    defaulted = np.isfinite(default_time)
+    log_w = np.where(
+        defaulted,
+        -np.log(hazard_multiplier) - excess * np.where(defaulted, default_time, 0.0),
+        -excess * tenor_years,
+    )
+    return log_w.sum(axis=-1)
+
+
+def draw_default_times(pd_annual: float, tenor_years: int, n: int, seed: int) -> np.ndarray:
+    return sample_default_times(np.random.default_rng(seed), pd_annual, tenor_years, n)
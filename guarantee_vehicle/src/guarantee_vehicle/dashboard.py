@@ -8,9 +8,9 @@ import pandas as pd
 import streamlit as st
 
 from guarantee_vehicle.capital.aggregation import weighted_portfolio_samples
-from guarantee_vehicle.capital.returns import returns_for_leverage
+from guarantee_vehicle.capital.returns import compile_stack, returns_for_leverage
 from guarantee_vehicle.config import AppConfig, load_config
-from guarantee_vehicle.io import load_data, validate_loaded_data
+from guarantee_vehicle.io import DataCache, load_data_cached, validate_loaded_data
 from guarantee_vehicle.market.fx import phase0_mtm_positive, summarize_mtm_distribution
 
 
@@ -105,7 +105,7 @@ def main() -> None:
 
     excel_bytes = uploaded.getvalue()
     try:
-        data = load_data(BytesIO(excel_bytes), cfg)
+        data = load_data_cached(BytesIO(excel_bytes), cfg, DataCache())
         checks = validate_loaded_data(data, cfg)
     except Exception as exc:
         st.error(f"Failed to parse workbook: {exc}")
@@ -147,29 +147,30 @@ def main() -> None:
     mtm_used = mean_mtm_pos if mean_mtm_pos > 0 else inferred_mtm
     expected_loss_rate = pd_annual * mtm_used
 
-    returns = returns_for_leverage(cfg, leverage=leverage, expected_loss_rate=expected_loss_rate)
+    try:
+        returns = returns_for_leverage(cfg, leverage=leverage, expected_loss_rate=expected_loss_rate)
+    except ValueError as exc:
+        st.error(str(exc))
+        st.stop()
     m1, m2, m3, m4 = st.columns(4)
     m1.metric("Equity ROE", f"{returns['equity_roe']:.2%}")
     m2.metric("Mezz return", f"{returns['mezz_return']:.2%}")
     m3.metric("Guarantor ROE", f"{returns['guarantor_roe']:.2%}")
     m4.metric("Expected loss (bps)", f"{expected_loss_rate*10000:.1f}")
 
+    stack = compile_stack(cfg.capital_stack)
     lev_grid = np.arange(3.0, 35.5, 0.5)
-    rows = []
-    for lev in lev_grid:
-        try:
-            out = returns_for_leverage(cfg, leverage=float(lev), expected_loss_rate=expected_loss_rate)
-        except ValueError:
-            continue
-        rows.append(
-            {
-                "leverage": lev,
-                "equity_roe": out["equity_roe"],
-                "mezz_return": out["mezz_return"],
-                "guarantor_roe": out["guarantor_roe"],
-            }
-        )
-    st.line_chart(pd.DataFrame(rows).set_index("leverage"), use_container_width=True)
+    lev_grid = lev_grid[lev_grid >= stack.min_leverage]
+    curve = returns_for_leverage(cfg, leverage=lev_grid, expected_loss_rate=expected_loss_rate, stack=stack)
+    rows = pd.DataFrame(
+        {
+            "leverage": lev_grid,
+            "equity_roe": curve["equity_roe"],
+            "mezz_return": curve["mezz_return"],
+            "guarantor_roe": curve["guarantor_roe"],
+        }
+    )
+    st.line_chart(rows.set_index("leverage"), use_container_width=True)
 
     st.subheader("Download editable template workbook")
     template_bytes = _to_upload_template(cfg, data.fx, data.rates)
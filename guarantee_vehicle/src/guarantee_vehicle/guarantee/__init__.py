@@ -1,3 +1,3 @@
-from guarantee_vehicle.guarantee.payout import payout_default_only
+from guarantee_vehicle.guarantee.payout import payout_default_only, payout_default_only_array
 
-__all__ = ["payout_default_only"]
+__all__ = ["payout_default_only", "payout_default_only_array"]
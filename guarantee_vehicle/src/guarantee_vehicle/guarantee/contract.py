@@ -1,7 +1,15 @@
 from __future__ import annotations
 
+import numpy as np
+
 
 def apply_attachment_detachment(loss: float, attach: float, detach: float, notional: float) -> float:
     lo = attach * notional
     hi = detach * notional
     return max(min(loss, hi) - lo, 0.0)
+
+
+def apply_attachment_detachment_array(loss: np.ndarray, attach: float, detach: float, notional: float | np.ndarray) -> np.ndarray:
+    lo = attach * np.asarray(notional)
+    hi = detach * np.asarray(notional)
+    return np.maximum(np.minimum(loss, hi) - lo, 0.0)
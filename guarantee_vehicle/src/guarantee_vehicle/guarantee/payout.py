@@ -1,8 +1,21 @@
 from __future__ import annotations
 
-from guarantee_vehicle.guarantee.contract import apply_attachment_detachment
+import numpy as np
+
+from guarantee_vehicle.guarantee.contract import apply_attachment_detachment, apply_attachment_detachment_array
 
 
 def payout_default_only(mtm_lender: float, coverage_pct: float, attach_pct: float, detach_pct: float, notional: float) -> float:
     raw = coverage_pct * max(mtm_lender, 0.0)
     return apply_attachment_detachment(raw, attach_pct, detach_pct, notional)
+
+
+def payout_default_only_array(
+    mtm_lender: np.ndarray,
+    coverage_pct: float | np.ndarray,
+    attach_pct: float,
+    detach_pct: float,
+    notional: float | np.ndarray,
+) -> np.ndarray:
+    raw = coverage_pct * np.maximum(mtm_lender, 0.0)
+    return apply_attachment_detachment_array(raw, attach_pct, detach_pct, notional)
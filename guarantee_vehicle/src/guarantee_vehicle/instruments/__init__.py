@@ -1,4 +1,13 @@
-from guarantee_vehicle.instruments.ccs import CCSParams, mtm_ccs_lender
-from guarantee_vehicle.instruments.ndf import NDFParams, mtm_ndf_lender
+from guarantee_vehicle.instruments.ccs import CCSParams, mtm_ccs_lender, mtm_ccs_lender_array, mtm_ccs_lender_discounted
+from guarantee_vehicle.instruments.ndf import NDFParams, mtm_ndf_lender, mtm_ndf_lender_array, mtm_ndf_lender_discounted
 
-__all__ = ["CCSParams", "NDFParams", "mtm_ccs_lender", "mtm_ndf_lender"]
+__all__ = [
+    "CCSParams",
+    "NDFParams",
+    "mtm_ccs_lender",
+    "mtm_ccs_lender_array",
+    "mtm_ccs_lender_discounted",
+    "mtm_ndf_lender",
+    "mtm_ndf_lender_array",
+    "mtm_ndf_lender_discounted",
+]
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from guarantee_vehicle.market.curves import flat_discount_factor
+import numpy as np
+
+from guarantee_vehicle.market.curves import flat_discount_factor, flat_discount_factor_array
 
 
 @dataclass
@@ -23,3 +25,31 @@ def mtm_ccs_lender(params: CCSParams, spot_now: float, t_years: float, usd_disc:
     lcy_notional = params.notional_usd * params.spot_lcy_per_usd
     lcy_leg = (lcy_notional / spot_now) * (1 + params.fixed_lcy_rate * rem) * flat_discount_factor(lcy_disc, rem)
     return usd_leg - lcy_leg
+
+
+def mtm_ccs_lender_array(
+    params: CCSParams,
+    spot_now: np.ndarray,
+    t_years: np.ndarray,
+    usd_disc: float | np.ndarray,
+    lcy_disc: float | np.ndarray,
+) -> np.ndarray:
+    # params fields may be arrays broadcastable against spot_now / t_years
+    rem = np.maximum(params.tenor_years - t_years, 0.0)
+    return mtm_ccs_lender_discounted(
+        params, spot_now, rem, flat_discount_factor_array(usd_disc, rem), flat_discount_factor_array(lcy_disc, rem)
+    )
+
+
+def mtm_ccs_lender_discounted(
+    params: CCSParams,
+    spot_now: np.ndarray,
+    rem: np.ndarray,
+    usd_df: np.ndarray,
+    lcy_df: np.ndarray,
+) -> np.ndarray:
+    # as mtm_ccs_lender_array, with remaining years and discount factors to maturity precomputed
+    usd_leg = params.notional_usd * (1 + params.fixed_usd_rate * rem) * usd_df
+    lcy_notional = params.notional_usd * params.spot_lcy_per_usd
+    lcy_leg = (lcy_notional / spot_now) * (1 + params.fixed_lcy_rate * rem) * lcy_df
+    return np.where(rem > 0, usd_leg - lcy_leg, 0.0)
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from guarantee_vehicle.market.curves import forward_rate, flat_discount_factor
+import numpy as np
+
+from guarantee_vehicle.market.curves import flat_discount_factor, flat_discount_factor_array, forward_rate, forward_rate_array
 
 
 @dataclass
@@ -19,3 +21,30 @@ def mtm_ndf_lender(params: NDFParams, spot_now: float, t_years: float, usd_rate:
     fwd = forward_rate(spot_now, usd_rate, lcy_rate, rem)
     payoff_usd = params.notional_usd * (fwd / params.strike - 1.0)
     return payoff_usd * flat_discount_factor(usd_rate, rem)
+
+
+def mtm_ndf_lender_array(
+    params: NDFParams,
+    spot_now: np.ndarray,
+    t_years: np.ndarray,
+    usd_rate: float | np.ndarray,
+    lcy_rate: float | np.ndarray,
+) -> np.ndarray:
+    rem = np.maximum(params.tenor_years - t_years, 0.0)
+    fwd = forward_rate_array(spot_now, usd_rate, lcy_rate, rem)
+    payoff_usd = params.notional_usd * (fwd / params.strike - 1.0)
+    return np.where(rem > 0, payoff_usd * flat_discount_factor_array(usd_rate, rem), 0.0)
+
+
+def mtm_ndf_lender_discounted(
+    params: NDFParams,
+    spot_now: np.ndarray,
+    rem: np.ndarray,
+    usd_df: np.ndarray,
+    lcy_df: np.ndarray,
+) -> np.ndarray:
+    # as mtm_ndf_lender_array, with discount factors to maturity precomputed; the forward is
+    # spot * lcy_df / usd_df, the same convention as forward_rate_array
+    fwd = spot_now * (lcy_df / usd_df)
+    payoff_usd = params.notional_usd * (fwd / params.strike - 1.0)
+    return np.where(rem > 0, payoff_usd * usd_df, 0.0)
@@ -1,4 +1,5 @@
+from guarantee_vehicle.io.cache import DataCache, load_data_cached
 from guarantee_vehicle.io.excel_loader import LoadedData, load_data
 from guarantee_vehicle.io.validation import validate_loaded_data
 
-__all__ = ["LoadedData", "load_data", "validate_loaded_data"]
+__all__ = ["DataCache", "LoadedData", "load_data", "load_data_cached", "validate_loaded_data"]
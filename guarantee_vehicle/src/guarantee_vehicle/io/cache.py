@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zipfile
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+import pandas as pd
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.io.excel_loader import LoadedData, load_data
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_CACHE_DIR = Path(os.environ.get("GUARANTEE_VEHICLE_CACHE_DIR", Path.home() / ".cache" / "guarantee_vehicle"))
+
+
+def workbook_digest(path: str | Path | BinaryIO) -> str:
+    h = hashlib.sha256()
+    if hasattr(path, "read"):
+        pos = path.tell()
+        h.update(path.read())
+        path.seek(pos)
+        return h.hexdigest()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def data_cache_key(path: str | Path | BinaryIO, cfg: AppConfig) -> str:
+    # The FX loader filters rows by universe.currencies, so it is part of the key alongside data.*
+    spec = {
+        "version": CACHE_FORMAT_VERSION,
+        "workbook": workbook_digest(path),
+        "data": cfg.data.model_dump(mode="json"),
+        "currencies": cfg.universe.currencies,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _to_npz(data: LoadedData) -> bytes:
+    arrays: dict[str, np.ndarray] = {
+        "fx_index": data.fx.index.values,
+        "fx_freq": np.array(getattr(data.fx.index, "freqstr", None) or "", dtype=str),
+        "fx_columns": np.array([str(c) for c in data.fx.columns], dtype=str),
+        "rate_keys": np.array(list(data.rates.keys()), dtype=str),
+        # series names carry the source sheet row, -1 when unnamed
+        "rate_rows": np.array([-1 if s.name is None else int(s.name) for s in data.rates.values()], dtype=np.int64),
+    }
+    for i, col in enumerate(data.fx.columns):
+        arrays[f"fx_{i}"] = data.fx[col].to_numpy()
+    for i, series in enumerate(data.rates.values()):
+        arrays[f"rate_{i}"] = series.to_numpy()
+    buf = BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def _from_npz(path: Path) -> LoadedData:
+    with np.load(path, allow_pickle=False) as z:
+        index = pd.DatetimeIndex(z["fx_index"], freq=str(z["fx_freq"]) or None)
+        fx = pd.DataFrame({str(c): z[f"fx_{i}"] for i, c in enumerate(z["fx_columns"])}, index=index)
+        rates = {
+            str(k): pd.Series(z[f"rate_{i}"], name=None if row < 0 else int(row))
+            for i, (k, row) in enumerate(zip(z["rate_keys"], z["rate_rows"]))
+        }
+    return LoadedData(fx=fx, rates=rates)
+
+
+def evict_lru(directory: Path, pattern: str, max_bytes: int | None, max_age_days: float | None) -> None:
+    # Entries are touched on read, so mtime order is least-recently-used first. Drops entries older than
+    # max_age_days, then the oldest until the total is within max_bytes (the newest entry always stays).
+    if not directory.exists():
+        return
+    entries = sorted(directory.glob(pattern), key=lambda p: p.stat().st_mtime)
+    if max_age_days is not None:
+        cutoff = time.time() - max_age_days * 86400
+        for entry in [e for e in entries if e.stat().st_mtime < cutoff]:
+            entry.unlink(missing_ok=True)
+            entries.remove(entry)
+    if max_bytes is not None:
+        total = sum(e.stat().st_size for e in entries)
+        for entry in entries[:-1]:
+            if total <= max_bytes:
+                break
+            total -= entry.stat().st_size
+            entry.unlink(missing_ok=True)
+
+
+@dataclass
+class DataCache:
+    directory: Path = DEFAULT_CACHE_DIR
+    max_bytes: int | None = 512 * 1024 * 1024
+    max_age_days: float | None = 30.0
+
+    def _entry(self, key: str) -> Path:
+        return Path(self.directory) / f"{key}.npz"
+
+    def get(self, key: str) -> LoadedData | None:
+        entry = self._entry(key)
+        if not entry.exists():
+            return None
+        try:
+            data = _from_npz(entry)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            entry.unlink(missing_ok=True)
+            return None
+        os.utime(entry)
+        return data
+
+    def put(self, key: str, data: LoadedData) -> None:
+        directory = Path(self.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(_to_npz(data))
+        os.replace(tmp, self._entry(key))
+        self.evict()
+
+    def evict(self) -> None:
+        evict_lru(Path(self.directory), "*.npz", self.max_bytes, self.max_age_days)
+
+    def clear(self) -> None:
+        for entry in Path(self.directory).glob("*.npz"):
+            entry.unlink(missing_ok=True)
+
+
+def load_data_cached(
+    path: str | Path | BinaryIO, cfg: AppConfig, cache: DataCache | None = None, key: str | None = None
+) -> LoadedData:
+    # key: data_cache_key(path, cfg) when the caller already has it
+    if cache is None:
+        return load_data(path, cfg)
+    key = key or data_cache_key(path, cfg)
+    data = cache.get(key)
+    if data is None:
+        data = load_data(path, cfg)
+        cache.put(key, data)
+    return data
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -18,6 +19,36 @@ def _read_sheet(path: str | Path, sheet_name: str) -> pd.DataFrame:
     return pd.read_excel(path, sheet_name=sheet_name, header=None, engine="openpyxl")
 
 
+def _iter_sheet_rows(path: str | Path, sheet_name: str) -> Iterator[tuple]:
+    # openpyxl is imported on first parse so cache hits never load it
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from wb[sheet_name].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _cells(row: tuple) -> list:
+    # mirror pandas' openpyxl reader: whole floats become ints, blanks become ""
+    return ["" if v is None else int(v) if isinstance(v, float) and v.is_integer() else v for v in row]
+
+
+def _fx_frame(date_cells: list, ccy_rows: list[tuple[str, list]]) -> pd.DataFrame:
+    date_values = pd.to_datetime(pd.Series(date_cells, dtype=object), errors="coerce")
+    out: dict[str, pd.Series] = {}
+    for ccy_str, cells in ccy_rows:
+        vals = pd.to_numeric(pd.Series(cells, dtype=object), errors="coerce")
+        series = pd.Series(vals.values, index=date_values.values).dropna()
+        if not series.empty:
+            series.index = pd.to_datetime(series.index)
+            out[ccy_str] = series.sort_index()
+
+    fx_df = pd.DataFrame(out).sort_index().ffill().dropna(how="all")
+    return fx_df
+
+
 def load_fx_history(path: str | Path, cfg: AppConfig) -> pd.DataFrame:
     sheet = _read_sheet(path, cfg.data.excel.fx_sheet)
     date_row = cfg.data.excel.dates_row_index
@@ -25,22 +56,44 @@ def load_fx_history(path: str | Path, cfg: AppConfig) -> pd.DataFrame:
     start_row = cfg.data.excel.values_start_row_index
     start_col = cfg.data.excel.values_start_col_index
 
-    date_values = pd.to_datetime(sheet.iloc[date_row, start_col:], errors="coerce")
-    out: dict[str, pd.Series] = {}
+    ccy_rows: list[tuple[str, list]] = []
     for row in range(start_row, sheet.shape[0]):
         ccy = sheet.iloc[row, code_col]
         if pd.isna(ccy):
             continue
         ccy_str = str(ccy).strip().upper()
         if ccy_str in cfg.universe.currencies:
-            vals = pd.to_numeric(sheet.iloc[row, start_col:], errors="coerce")
-            series = pd.Series(vals.values, index=date_values.values).dropna()
-            if not series.empty:
-                series.index = pd.to_datetime(series.index)
-                out[ccy_str] = series.sort_index()
+            ccy_rows.append((ccy_str, sheet.iloc[row, start_col:].tolist()))
+    return _fx_frame(sheet.iloc[date_row, start_col:].tolist(), ccy_rows)
 
-    fx_df = pd.DataFrame(out).sort_index().ffill().dropna(how="all")
-    return fx_df
+
+def load_fx_history_streaming(path: str | Path, cfg: AppConfig) -> pd.DataFrame:
+    date_row = cfg.data.excel.dates_row_index
+    code_col = cfg.data.excel.fx_row_key_column
+    start_row = cfg.data.excel.values_start_row_index
+    start_col = cfg.data.excel.values_start_col_index
+    wanted = set(cfg.universe.currencies)
+
+    date_cells: list = []
+    ccy_rows: list[tuple[str, list]] = []
+    for i, row in enumerate(_iter_sheet_rows(path, cfg.data.excel.fx_sheet)):
+        if i == date_row:
+            date_cells = _cells(row[start_col:])
+        if i < start_row or len(row) <= code_col:
+            continue
+        ccy = _cells(row[code_col : code_col + 1])[0]
+        if ccy == "":
+            continue
+        ccy_str = str(ccy).strip().upper()
+        if ccy_str in wanted:
+            ccy_rows.append((ccy_str, _cells(row[start_col:])))
+
+    # read-only rows are not padded to a common width
+    width = max([len(date_cells), *(len(cells) for _, cells in ccy_rows)])
+    date_cells += [""] * (width - len(date_cells))
+    for _, cells in ccy_rows:
+        cells += [""] * (width - len(cells))
+    return _fx_frame(date_cells, ccy_rows)
 
 
 def load_rates(path: str | Path, cfg: AppConfig) -> dict[str, pd.Series]:
@@ -60,7 +113,32 @@ def load_rates(path: str | Path, cfg: AppConfig) -> dict[str, pd.Series]:
     return rates
 
 
+def load_rates_streaming(path: str | Path, cfg: AppConfig) -> dict[str, pd.Series]:
+    if not cfg.data.rates.enabled:
+        return {}
+
+    pending: dict[str, list[str]] = {}
+    for ccy, key in cfg.data.rates.mapping.items():
+        pending.setdefault(str(key).strip(), []).append(ccy)
+
+    found: dict[str, pd.Series] = {}
+    for i, row in enumerate(_iter_sheet_rows(path, cfg.data.rates.sheet)):
+        if not pending:
+            break
+        if not row:
+            continue
+        ccys = pending.pop(str(_cells(row[:1])[0]).strip(), None)
+        if ccys is None:
+            continue
+        values = pd.to_numeric(pd.Series(_cells(row[1:]), dtype=object, name=i), errors="coerce").dropna()
+        for ccy in ccys:
+            found[ccy] = values.reset_index(drop=True)
+    return {ccy: found[ccy] for ccy in cfg.data.rates.mapping if ccy in found}
+
+
 def load_data(path: str | Path, cfg: AppConfig) -> LoadedData:
+    if cfg.data.backend == "streaming":
+        return LoadedData(fx=load_fx_history_streaming(path, cfg), rates=load_rates_streaming(path, cfg))
     fx = load_fx_history(path, cfg)
     rates = load_rates(path, cfg)
     return LoadedData(fx=fx, rates=rates)
@@ -1,3 +1,71 @@
-from guarantee_vehicle.market.fx import phase0_mtm_positive, summarize_mtm_distribution
+from guarantee_vehicle.market.bootstrap import (
+    ReturnHistory,
+    aligned_log_returns,
+    bootstrap_indices,
+    iter_bootstrap_fx_blocks,
+)
+from guarantee_vehicle.market.exposure import (
+    ExposureProfile,
+    currency_exposure_profile,
+    exposure_profiles,
+    mtm_positive_matrix,
+    peak_mtm_positive,
+    portfolio_exposure_profile,
+    profile_from_matrix,
+    sliding_window_max,
+    sliding_window_min,
+)
+from guarantee_vehicle.market.fx import (
+    iter_phase0_mtm_chunks,
+    phase0_mtm_positive,
+    phase0_mtm_sketch,
+    summarize_mtm_distribution,
+)
+from guarantee_vehicle.market.rates import (
+    DiscountGrid,
+    RateCurve,
+    RateCurves,
+    build_rate_curves,
+    curve_from_series,
+    discount_grid,
+)
+from guarantee_vehicle.market.simulation import (
+    FXModel,
+    calibrate_fx_model,
+    iter_correlated_fx_blocks,
+    iter_gbm_path_blocks,
+    reduce_gbm_paths,
+    simulate_gbm_paths,
+)
 
-__all__ = ["phase0_mtm_positive", "summarize_mtm_distribution"]
+__all__ = [
+    "DiscountGrid",
+    "ExposureProfile",
+    "FXModel",
+    "RateCurve",
+    "RateCurves",
+    "ReturnHistory",
+    "aligned_log_returns",
+    "bootstrap_indices",
+    "build_rate_curves",
+    "calibrate_fx_model",
+    "currency_exposure_profile",
+    "curve_from_series",
+    "discount_grid",
+    "exposure_profiles",
+    "iter_bootstrap_fx_blocks",
+    "iter_correlated_fx_blocks",
+    "iter_gbm_path_blocks",
+    "iter_phase0_mtm_chunks",
+    "mtm_positive_matrix",
+    "peak_mtm_positive",
+    "phase0_mtm_positive",
+    "phase0_mtm_sketch",
+    "portfolio_exposure_profile",
+    "profile_from_matrix",
+    "reduce_gbm_paths",
+    "simulate_gbm_paths",
+    "sliding_window_max",
+    "sliding_window_min",
+    "summarize_mtm_distribution",
+]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+
+BootstrapMethod = Literal["stationary", "block"]
+
+
+@dataclass(frozen=True)
+class ReturnHistory:
+    # Monthly log returns on the dates where every currency is observed, so a resampled row moves all
+    # currencies together. Moments are annualised to match FXModel.
+    currencies: list[str]
+    log_returns: np.ndarray
+    s0: np.ndarray
+    periods_per_year: int = 12
+
+    @property
+    def n_obs(self) -> int:
+        return len(self.log_returns)
+
+    @property
+    def log_drift(self) -> np.ndarray:
+        return self.log_returns.mean(axis=0) * self.periods_per_year
+
+    @property
+    def vol(self) -> np.ndarray:
+        return self.log_returns.std(axis=0, ddof=1) * np.sqrt(self.periods_per_year)
+
+    @property
+    def corr(self) -> np.ndarray:
+        sd = self.log_returns.std(axis=0)
+        centred = self.log_returns - self.log_returns.mean(axis=0)
+        cov = centred.T @ centred / self.n_obs
+        d = np.where(sd > 0, sd, 1.0)
+        corr = cov / np.outer(d, d)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+
+def aligned_log_returns(fx: pd.DataFrame, currencies: list[str], periods_per_year: int = 12) -> ReturnHistory:
+    levels = fx[currencies].astype(float)
+    log_ret = np.log(levels).diff().dropna(how="any")
+    if len(log_ret) < 2:
+        raise ValueError(f"Need at least 2 dates with returns for all of {currencies}, got {len(log_ret)}")
+    s0 = levels.ffill().iloc[-1].to_numpy()
+    return ReturnHistory(
+        currencies=list(currencies),
+        log_returns=np.ascontiguousarray(log_ret.to_numpy()),
+        s0=s0,
+        periods_per_year=periods_per_year,
+    )
+
+
+def bootstrap_indices(
+    rng: np.random.Generator,
+    n_obs: int,
+    n_paths: int,
+    n_steps: int,
+    block_length: int = 12,
+    method: BootstrapMethod = "stationary",
+) -> np.ndarray:
+    # (n_paths, n_steps) row indices into the return history. Blocks wrap around the end of the
+    # history (circular). "block" uses fixed-length blocks; "stationary" (Politis-Romano) starts a new
+    # block at each step with probability 1 / block_length.
+    if block_length <= 0:
+        raise ValueError("block_length must be positive")
+    if method == "block":
+        n_blocks = -(-n_steps // block_length)
+        starts = rng.integers(0, n_obs, size=(n_paths, n_blocks, 1))
+        idx = (starts + np.arange(block_length)).reshape(n_paths, n_blocks * block_length)[:, :n_steps]
+        return idx % n_obs
+    if method == "stationary":
+        steps = np.arange(n_steps)
+        starts = rng.integers(0, n_obs, size=(n_paths, n_steps))
+        new_block = rng.random((n_paths, n_steps)) < 1.0 / block_length
+        new_block[:, 0] = True
+        block_start = np.maximum.accumulate(np.where(new_block, steps, 0), axis=1)
+        offset = steps - block_start
+        return (np.take_along_axis(starts, block_start, axis=1) + offset) % n_obs
+    raise ValueError(f"Unknown bootstrap method: {method}")
+
+
+def iter_bootstrap_fx_blocks(
+    history: ReturnHistory,
+    n_steps: int,
+    n_paths: int,
+    seed: int | np.random.SeedSequence | np.random.Generator,
+    block_length: int = 12,
+    method: BootstrapMethod = "stationary",
+    block_paths: int = 8_192,
+    dtype: type[np.floating] = np.float64,
+) -> Iterator[np.ndarray]:
+    # Joint spot paths of shape (rows, n_steps + 1, n_ccy) from the latest spot, with whole history rows
+    # resampled so cross-currency dependence is kept. Same buffer-reuse contract as
+    # iter_correlated_fx_blocks.
+    if block_paths <= 0:
+        raise ValueError("block_paths must be positive")
+    rng = np.random.default_rng(seed)
+    dtype = np.dtype(dtype)
+    log_returns = history.log_returns.astype(dtype, copy=False)
+    rows = min(block_paths, n_paths)
+    ret_buf = np.empty((rows, n_steps, len(history.currencies)), dtype=dtype)
+    path_buf = np.empty((rows, n_steps + 1, len(history.currencies)), dtype=dtype)
+    path_buf[:, 0] = history.s0
+
+    for start in range(0, n_paths, block_paths):
+        b = min(block_paths, n_paths - start)
+        idx = bootstrap_indices(rng, history.n_obs, b, n_steps, block_length, method)
+        ret = ret_buf[:b]
+        paths = path_buf[:b]
+        np.take(log_returns, idx, axis=0, out=ret)
+        log_paths = paths[:, 1:]
+        np.cumsum(ret, axis=1, out=log_paths)
+        np.exp(log_paths, out=log_paths)
+        log_paths *= history.s0
+        yield paths
@@ -9,3 +9,11 @@ def flat_discount_factor(rate: float, t_years: float) -> float:
 
 def forward_rate(spot: float, r_dom: float, r_for: float, t_years: float) -> float:
     return float(spot * np.exp((r_dom - r_for) * t_years))
+
+
+def flat_discount_factor_array(rate: float | np.ndarray, t_years: np.ndarray) -> np.ndarray:
+    return np.exp(-np.asarray(rate) * t_years)
+
+
+def forward_rate_array(spot: np.ndarray, r_dom: float | np.ndarray, r_for: float | np.ndarray, t_years: np.ndarray) -> np.ndarray:
+    return spot * np.exp((np.asarray(r_dom) - np.asarray(r_for)) * t_years)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from guarantee_vehicle.market.fx import forward_spot_windows
+
+
+def sliding_window_min(x: np.ndarray, window: int) -> np.ndarray:
+    # min of x[i : i + window] for i = 0..len(x) - window in O(len(x)) (van Herk / Gil-Werman): split x
+    # into window-sized blocks; each window is the suffix of one block joined to the prefix of the next
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    if window < 1 or n < window:
+        return np.empty(0)
+    blocks = np.concatenate([x, np.full(-n % window, np.inf)]).reshape(-1, window)
+    prefix = np.minimum.accumulate(blocks, axis=1).ravel()
+    suffix = np.minimum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    return np.minimum(suffix[: n - window + 1], prefix[window - 1 : n])
+
+
+def sliding_window_max(x: np.ndarray, window: int) -> np.ndarray:
+    return -sliding_window_min(-np.asarray(x, dtype=float), window)
+
+
+def mtm_positive_matrix(s: np.ndarray, tenor_months: int) -> np.ndarray:
+    # (start, horizon) phase-0 MTM+ max(s[t0] / s[t0 + h] - 1, 0), h = 1..tenor_months; NaN past the
+    # end of the series or where either spot is missing
+    s = np.asarray(s, dtype=float)
+    windows = forward_spot_windows(s, tenor_months)
+    return np.maximum(s[: len(windows), None] / windows - 1.0, 0.0)
+
+
+def peak_mtm_positive(s: np.ndarray, tenor_months: int) -> np.ndarray:
+    # per start date, the largest MTM+ over its (possibly truncated) window: MTM+ falls as the later
+    # spot rises, so the peak is set by the window minimum of s[t0 + 1 .. t0 + tenor_months]
+    s = np.asarray(s, dtype=float)
+    if len(s) < 2 or tenor_months < 1:
+        return np.empty(0)
+    later = np.concatenate([s[1:], np.full(tenor_months - 1, np.inf)])
+    return np.maximum(s[:-1] / sliding_window_min(later, tenor_months) - 1.0, 0.0)
+
+
+@dataclass
+class ExposureProfile:
+    label: str
+    # last month of each horizon bucket
+    bucket_end_months: np.ndarray
+    quantiles: np.ndarray
+    # per bucket: number of (start, horizon) observations, expected exposure and PFE (n_quantiles, n_buckets)
+    n_obs: np.ndarray
+    ee: np.ndarray
+    pfe: np.ndarray
+    # per start date, peak MTM+ over the tenor
+    peak: np.ndarray
+
+    def rows(self) -> list[dict]:
+        return [
+            {
+                "series": self.label,
+                "horizon_months": int(m),
+                "n_obs": int(n),
+                "ee": float(self.ee[i]),
+                **{f"pfe_{q * 100:g}": float(self.pfe[j, i]) for j, q in enumerate(self.quantiles)},
+            }
+            for i, (m, n) in enumerate(zip(self.bucket_end_months, self.n_obs))
+        ]
+
+    def peak_summary(self, quantile: float = 0.99) -> dict[str, float]:
+        if not len(self.peak):
+            return {"series": self.label, "peak_mean": 0.0, f"peak_p{quantile * 100:g}": 0.0}
+        return {
+            "series": self.label,
+            "peak_mean": float(self.peak.mean()),
+            f"peak_p{quantile * 100:g}": float(np.quantile(self.peak, quantile)),
+        }
+
+
+def profile_from_matrix(
+    label: str, mtm: np.ndarray, quantiles: list[float], bucket_months: int = 1, peak: np.ndarray | None = None
+) -> ExposureProfile:
+    # EE and PFE over every (start, horizon) cell of each bucket of bucket_months horizons; NaN cells
+    # are skipped and empty buckets are NaN. peak defaults to the row maxima of mtm.
+    n_starts, tenor_months = mtm.shape
+    n_buckets = -(-tenor_months // bucket_months)
+    padded = np.pad(mtm, ((0, 0), (0, n_buckets * bucket_months - tenor_months)), constant_values=np.nan)
+    cells = np.moveaxis(padded.reshape(n_starts, n_buckets, bucket_months), 1, 0).reshape(n_buckets, -1)
+    valid = ~np.isnan(cells)
+    n_obs = valid.sum(axis=1)
+    ee = np.where(n_obs > 0, np.where(valid, cells, 0.0).sum(axis=1) / np.maximum(n_obs, 1), np.nan)
+    qs = np.asarray(quantiles, dtype=float)
+    pfe = np.full((len(qs), n_buckets), np.nan)
+    if n_obs.any():
+        pfe[:, n_obs > 0] = np.nanquantile(cells[n_obs > 0], qs, axis=1)
+    if peak is None:
+        observed = ~np.isnan(mtm).all(axis=1)
+        peak = np.nanmax(mtm[observed], axis=1) if observed.any() else np.empty(0)
+    return ExposureProfile(
+        label=label,
+        bucket_end_months=np.minimum(np.arange(1, n_buckets + 1) * bucket_months, tenor_months),
+        quantiles=qs,
+        n_obs=n_obs,
+        ee=ee,
+        pfe=pfe,
+        peak=peak,
+    )
+
+
+def currency_exposure_profile(
+    fx_series: pd.Series, tenor_months: int, quantiles: list[float], bucket_months: int = 1
+) -> ExposureProfile:
+    # same (start, horizon) samples as phase0_mtm_positive, kept apart by horizon
+    s = fx_series.dropna().astype(float).values
+    mtm = mtm_positive_matrix(s, tenor_months)
+    return profile_from_matrix(str(fx_series.name), mtm, quantiles, bucket_months, peak_mtm_positive(s, tenor_months))
+
+
+def portfolio_exposure_profile(
+    fx: pd.DataFrame, weights: dict[str, float], tenor_months: int, quantiles: list[float], bucket_months: int = 1
+) -> ExposureProfile:
+    # weighted MTM+ on the FX calendar; a (start, horizon) cell counts only when every weighted
+    # currency is observed at both dates
+    mtm = None
+    for ccy, w in weights.items():
+        if w == 0:
+            continue
+        m = w * mtm_positive_matrix(fx[ccy].astype(float).values, tenor_months)
+        mtm = m if mtm is None else mtm + m
+    if mtm is None:
+        mtm = np.full((0, tenor_months), np.nan)
+    return profile_from_matrix("portfolio", mtm, quantiles, bucket_months)
+
+
+def exposure_profiles(
+    fx: pd.DataFrame, weights: dict[str, float], tenor_months: int, quantiles: list[float], bucket_months: int = 1
+) -> dict[str, ExposureProfile]:
+    # one profile per weighted currency, then the portfolio
+    profiles = {
+        ccy: currency_exposure_profile(fx[ccy], tenor_months, quantiles, bucket_months) for ccy in weights
+    }
+    profiles["portfolio"] = portfolio_exposure_profile(fx, weights, tenor_months, quantiles, bucket_months)
+    return profiles
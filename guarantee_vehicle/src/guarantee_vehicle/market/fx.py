@@ -1,27 +1,74 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from guarantee_vehicle.stats.risk_metrics import RiskMetrics
+from guarantee_vehicle.stats.sketch import LogHistogramSketch
+
+
+def forward_spot_windows(s: np.ndarray, tenor_months: int) -> np.ndarray:
+    # (start, horizon) view of s[t0 + h] for h = 1..tenor_months; horizons past the end of the series are NaN
+    n = len(s)
+    if n < 2 or tenor_months < 1:
+        return np.empty((0, max(tenor_months, 0)), dtype=s.dtype)
+    padded = np.concatenate([s, np.full(tenor_months, np.nan, dtype=s.dtype)])
+    return sliding_window_view(padded, tenor_months + 1)[: n - 1, 1:]
+
+
+def phase0_mtm_positive(fx_series: pd.Series, tenor_months: int = 60, dtype: np.dtype | type = np.float64) -> np.ndarray:
+    s = fx_series.dropna().astype(float).values.astype(dtype, copy=False)
+    windows = forward_spot_windows(s, tenor_months)
+    if windows.size == 0:
+        return np.empty(0, dtype=dtype)
+    ratio = s[: len(windows), None] / windows
+    valid = ~np.isnan(windows)
+    mtm = ratio[valid]
+    mtm -= 1.0
+    np.maximum(mtm, 0.0, out=mtm)
+    return mtm
+
+
+def iter_phase0_mtm_chunks(
+    fx_series: pd.Series, tenor_months: int = 60, chunk_size: int = 1 << 20, dtype: np.dtype | type = np.float64
+) -> Iterator[np.ndarray]:
+    # yields phase0_mtm_positive's samples in order, in chunks of exactly chunk_size (the last may be shorter)
+    s = fx_series.dropna().astype(float).values.astype(dtype, copy=False)
+    windows = forward_spot_windows(s, tenor_months)
+    row_len = np.minimum(tenor_months, len(s) - 1 - np.arange(len(windows)))
+    offsets = np.concatenate([[0], np.cumsum(row_len)])
+    for k0 in range(0, int(offsets[-1]), chunk_size):
+        k1 = min(k0 + chunk_size, int(offsets[-1]))
+        r0 = int(np.searchsorted(offsets, k0, side="right")) - 1
+        r1 = int(np.searchsorted(offsets, k1, side="left"))
+        block = windows[r0:r1]
+        mtm = (s[r0:r1, None] / block)[~np.isnan(block)]
+        mtm = mtm[k0 - offsets[r0] : k1 - offsets[r0]]
+        mtm -= 1.0
+        np.maximum(mtm, 0.0, out=mtm)
+        yield mtm
 
 
-def phase0_mtm_positive(fx_series: pd.Series, tenor_months: int = 60) -> np.ndarray:
-    s = fx_series.dropna().astype(float).values
-    mtm_pos: list[float] = []
-    for t0 in range(len(s) - 1):
-        end = min(len(s), t0 + tenor_months + 1)
-        for t in range(t0 + 1, end):
-            mtm = max((s[t0] / s[t]) - 1.0, 0.0)
-            mtm_pos.append(mtm)
-    return np.array(mtm_pos, dtype=float)
+def phase0_mtm_sketch(
+    fx_series: pd.Series, tenor_months: int = 60, chunk_size: int = 1 << 20, sketch: LogHistogramSketch | None = None
+) -> LogHistogramSketch:
+    sketch = sketch if sketch is not None else LogHistogramSketch()
+    for chunk in iter_phase0_mtm_chunks(fx_series, tenor_months, chunk_size):
+        sketch.update(chunk)
+    return sketch
 
 
-def summarize_mtm_distribution(samples: np.ndarray) -> dict[str, float]:
+def summarize_mtm_distribution(samples: np.ndarray | RiskMetrics | LogHistogramSketch) -> dict[str, float]:
     if len(samples) == 0:
         return {"p_positive": 0.0, "mean": 0.0, "p90": 0.0, "p99": 0.0, "p995": 0.0}
-    return {
-        "p_positive": float((samples > 0).mean()),
-        "mean": float(samples.mean()),
-        "p90": float(np.quantile(samples, 0.90)),
-        "p99": float(np.quantile(samples, 0.99)),
-        "p995": float(np.quantile(samples, 0.995)),
-    }
+    if isinstance(samples, (RiskMetrics, LogHistogramSketch)):
+        p_positive, mean = samples.p_positive, samples.mean
+        qs = samples.quantile(np.array([0.90, 0.99, 0.995]))
+    else:
+        p_positive, mean = float((samples > 0).mean()), float(samples.mean())
+        qs = np.quantile(samples, [0.90, 0.99, 0.995])
+    p90, p99, p995 = (float(v) for v in qs)
+    return {"p_positive": p_positive, "mean": mean, "p90": p90, "p99": p99, "p995": p995}
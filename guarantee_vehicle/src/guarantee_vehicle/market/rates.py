@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from guarantee_vehicle.config import RatesConfig
+from guarantee_vehicle.instruments.cashflows import generate_monthly_schedule
+
+
+@dataclass(frozen=True)
+class RateCurve:
+    # Continuously compounded zero rates at increasing pillar times (years); linear in between and flat
+    # beyond either end.
+    pillars: np.ndarray
+    zero_rates: np.ndarray
+
+    @classmethod
+    def flat(cls, rate: float) -> "RateCurve":
+        return cls(np.array([1.0]), np.array([float(rate)]))
+
+    def zero_rate(self, t_years: float | np.ndarray) -> np.ndarray:
+        return np.interp(t_years, self.pillars, self.zero_rates)
+
+    def discount_factor(self, t_years: float | np.ndarray) -> np.ndarray:
+        return np.exp(-self.zero_rate(t_years) * np.asarray(t_years, dtype=float))
+
+
+@dataclass(frozen=True)
+class RateCurves:
+    usd: RateCurve
+    # used for currencies without a curve of their own
+    lcy_fallback: RateCurve
+    lcy: dict[str, RateCurve] = field(default_factory=dict)
+
+    def for_currency(self, ccy: str) -> RateCurve:
+        return self.lcy.get(ccy, self.lcy_fallback)
+
+
+def curve_from_series(values: pd.Series, pillar_years: list[float] | None = None) -> RateCurve:
+    # Without pillar_years the row is a newest-first history of one rate and the curve is flat at its
+    # latest observation; with them the row is a term structure, one column per pillar.
+    rates = np.asarray(values, dtype=float)
+    if not len(rates):
+        raise ValueError("Rate row has no observations")
+    if pillar_years is None:
+        return RateCurve.flat(rates[0])
+    if len(pillar_years) != len(rates):
+        raise ValueError(f"Rate row has {len(rates)} columns but {len(pillar_years)} pillar_years are configured")
+    pillars = np.asarray(pillar_years, dtype=float)
+    if np.any(np.diff(pillars) <= 0):
+        raise ValueError("pillar_years must be strictly increasing")
+    return RateCurve(pillars, rates)
+
+
+def build_rate_curves(rates: Mapping[str, pd.Series], cfg: RatesConfig) -> RateCurves:
+    # One curve per loaded row of the rates sheet (decimal zero rates); USD and any currency without a
+    # row fall back to the configured flat rates.
+    curves = {ccy: curve_from_series(s, cfg.pillar_years) for ccy, s in rates.items() if len(s)}
+    usd = curves.pop(cfg.usd_curve, None) or RateCurve.flat(cfg.fallback_usd_rate)
+    return RateCurves(usd=usd, lcy_fallback=RateCurve.flat(cfg.fallback_lcy_rate), lcy=curves)
+
+
+@dataclass(frozen=True)
+class DiscountGrid:
+    # Discount factors from each monthly schedule date (0, 1/12, ..., tenor) to maturity on today's
+    # curves, P(0, T) / P(0, t), for USD (n_steps + 1,) and each LCY (n_ccy, n_steps + 1), plus the
+    # swap coupons (zero rate at the tenor) struck at inception.
+    tenor_years: int
+    usd: np.ndarray
+    lcy: np.ndarray
+    usd_fixed_rate: float
+    lcy_fixed_rate: np.ndarray
+
+    @property
+    def forward_points(self) -> np.ndarray:
+        # forward / spot from each schedule date to maturity, per LCY
+        return self.lcy / self.usd
+
+    def to_maturity(self, t_years: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # (usd_df, lcy_df) from valuation times t_years (..., n_ccy) to maturity, blending the two
+        # neighbouring schedule dates linearly so no exponentials are taken per path
+        return self.at(t_years, np.arange(self.lcy.shape[0]))
+
+    def at(self, t_years: np.ndarray, ccy_idx: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # to_maturity with the LCY row picked per element by ccy_idx (broadcast against t_years)
+        n_steps = self.usd.shape[0] - 1
+        pos = np.clip(np.asarray(t_years, dtype=float) * 12.0, 0.0, n_steps)
+        k = np.minimum(pos.astype(np.int64), n_steps - 1)
+        w = pos - k
+        usd = self.usd[k] + w * (self.usd[k + 1] - self.usd[k])
+        lcy = self.lcy[ccy_idx, k] + w * (self.lcy[ccy_idx, k + 1] - self.lcy[ccy_idx, k])
+        return usd, lcy
+
+
+def discount_grid(curves: RateCurves, currencies: list[str], tenor_years: int) -> DiscountGrid:
+    times = np.array([0.0, *generate_monthly_schedule(tenor_years)])
+
+    def to_maturity(curve: RateCurve) -> np.ndarray:
+        df = curve.discount_factor(times)
+        return df[-1] / df
+
+    lcy_curves = [curves.for_currency(c) for c in currencies]
+    return DiscountGrid(
+        tenor_years=tenor_years,
+        usd=to_maturity(curves.usd),
+        lcy=np.array([to_maturity(c) for c in lcy_curves]).reshape(len(currencies), len(times)),
+        usd_fixed_rate=float(curves.usd.zero_rate(tenor_years)),
+        lcy_fixed_rate=np.array([float(c.zero_rate(tenor_years)) for c in lcy_curves]),
+    )
@@ -1,12 +1,186 @@
 from __future__ import annotations
 
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from typing import TypeVar
+
 import numpy as np
+import pandas as pd
+
+from guarantee_vehicle.stats.variance_reduction import antithetic_normals
+
+T = TypeVar("T")
 
 
-def simulate_gbm_paths(s0: float, mu: float, sigma: float, dt: float, n_steps: int, n_paths: int, seed: int) -> np.ndarray:
+def iter_gbm_path_blocks(
+    s0: float,
+    mu: float,
+    sigma: float,
+    dt: float,
+    n_steps: int,
+    n_paths: int,
+    seed: int | np.random.SeedSequence | np.random.Generator,
+    block_paths: int = 65_536,
+    dtype: type[np.floating] = np.float64,
+) -> Iterator[np.ndarray]:
+    # Yields (rows, n_steps + 1) blocks from one random stream, so float64 blocks stacked together equal
+    # simulate_gbm_paths. Each block is a view of a reused buffer: copy it if it must outlive the iteration.
+    if block_paths <= 0:
+        raise ValueError("block_paths must be positive")
     rng = np.random.default_rng(seed)
-    z = rng.normal(size=(n_paths, n_steps))
-    increments = (mu - 0.5 * sigma**2) * dt + sigma * np.sqrt(dt) * z
-    log_paths = np.cumsum(increments, axis=1)
-    paths = np.concatenate([np.full((n_paths, 1), s0), s0 * np.exp(log_paths)], axis=1)
-    return paths
+    dtype = np.dtype(dtype)
+    rows = min(block_paths, n_paths)
+    z_buf = np.empty((rows, n_steps), dtype=dtype)
+    path_buf = np.empty((rows, n_steps + 1), dtype=dtype)
+    path_buf[:, 0] = s0
+    drift = (mu - 0.5 * sigma**2) * dt
+    vol = sigma * np.sqrt(dt)
+
+    for start in range(0, n_paths, block_paths):
+        b = min(block_paths, n_paths - start)
+        z = z_buf[:b]
+        paths = path_buf[:b]
+        rng.standard_normal(out=z, dtype=dtype)
+        z *= vol
+        z += drift
+        log_paths = paths[:, 1:]
+        np.cumsum(z, axis=1, out=log_paths)
+        np.exp(log_paths, out=log_paths)
+        log_paths *= s0
+        yield paths
+
+
+def reduce_gbm_paths(
+    reducer: Callable[[np.ndarray], T],
+    s0: float,
+    mu: float,
+    sigma: float,
+    dt: float,
+    n_steps: int,
+    n_paths: int,
+    seed: int | np.random.SeedSequence | np.random.Generator,
+    block_paths: int = 65_536,
+    dtype: type[np.floating] = np.float64,
+) -> list[T]:
+    # e.g. reducer=lambda p: p.max(axis=1) keeps only the running maxima of each block
+    return [
+        reducer(block)
+        for block in iter_gbm_path_blocks(s0, mu, sigma, dt, n_steps, n_paths, seed, block_paths, dtype)
+    ]
+
+
+def simulate_gbm_paths(
+    s0: float,
+    mu: float,
+    sigma: float,
+    dt: float,
+    n_steps: int,
+    n_paths: int,
+    seed: int,
+    dtype: type[np.floating] = np.float64,
+) -> np.ndarray:
+    if n_paths == 0:
+        return np.full((0, n_steps + 1), s0, dtype=dtype)
+    return next(iter_gbm_path_blocks(s0, mu, sigma, dt, n_steps, n_paths, seed, n_paths, dtype))
+
+
+@dataclass(frozen=True)
+class FXModel:
+    # Joint lognormal model of LCY-per-USD spots: annualised log drift, volatility and correlation of
+    # monthly log returns, started from the latest observed spot. Currencies without enough history
+    # have zero drift and volatility.
+    currencies: list[str]
+    s0: np.ndarray
+    log_drift: np.ndarray
+    vol: np.ndarray
+    corr: np.ndarray
+    chol: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "chol", np.linalg.cholesky(self.corr))
+
+    @property
+    def cov(self) -> np.ndarray:
+        return self.corr * np.outer(self.vol, self.vol)
+
+
+def _nearest_correlation(corr: np.ndarray, floor: float = 1e-10) -> np.ndarray:
+    # pairwise-complete estimates need not be positive definite; clip the spectrum and renormalise
+    w, v = np.linalg.eigh(corr)
+    if w.min() > floor:
+        return corr
+    fixed = (v * np.maximum(w, floor)) @ v.T
+    d = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(d, d)
+
+
+def calibrate_fx_model(
+    fx: pd.DataFrame, currencies: list[str], shrinkage: float = 0.0, periods_per_year: int = 12
+) -> FXModel:
+    # Moments of date-aligned log returns, pairwise over overlapping history. shrinkage in [0, 1] pulls
+    # the correlation toward the identity (the covariance toward its diagonal).
+    if not 0.0 <= shrinkage <= 1.0:
+        raise ValueError(f"shrinkage must be in [0, 1], got {shrinkage}")
+    levels = fx[currencies].astype(float)
+    log_ret = np.log(levels).diff()
+    k = len(currencies)
+
+    drift = np.nan_to_num(log_ret.mean().to_numpy()) * periods_per_year
+    vol = np.nan_to_num(log_ret.std().to_numpy()) * np.sqrt(periods_per_year)
+    corr = np.nan_to_num(log_ret.corr(min_periods=3).to_numpy())
+    np.fill_diagonal(corr, 1.0)
+    corr = (1.0 - shrinkage) * corr + shrinkage * np.eye(k)
+    s0 = np.array([levels[c].dropna().iloc[-1] if levels[c].notna().any() else np.nan for c in currencies])
+    return FXModel(
+        currencies=list(currencies), s0=s0, log_drift=drift, vol=vol, corr=_nearest_correlation(corr)
+    )
+
+
+def iter_correlated_fx_blocks(
+    model: FXModel,
+    dt: float,
+    n_steps: int,
+    n_paths: int,
+    seed: int | np.random.SeedSequence | np.random.Generator,
+    block_paths: int = 8_192,
+    dtype: type[np.floating] = np.float64,
+    shift: np.ndarray | None = None,
+    antithetic: bool = False,
+) -> Iterator[np.ndarray]:
+    # Joint spot paths of shape (rows, n_steps + 1, n_ccy), all currencies in one pass per block. As in
+    # iter_gbm_path_blocks the yielded array is a reused buffer. shift adds a per-step mean to the
+    # standardised correlated increments (importance sampling); the caller owns the likelihood ratio.
+    # antithetic: rows 2j and 2j + 1 use mirrored innovations (keep block_paths even to keep pairs).
+    if block_paths <= 0:
+        raise ValueError("block_paths must be positive")
+    rng = np.random.default_rng(seed)
+    dtype = np.dtype(dtype)
+    k = len(model.currencies)
+    rows = min(block_paths, n_paths)
+    z_buf = np.empty((rows, n_steps, k), dtype=dtype)
+    corr_buf = np.empty((rows, n_steps, k), dtype=dtype)
+    path_buf = np.empty((rows, n_steps + 1, k), dtype=dtype)
+    path_buf[:, 0] = model.s0
+    chol_t = model.chol.T.astype(dtype)
+    drift = (model.log_drift * dt).astype(dtype)
+    vol = (model.vol * np.sqrt(dt)).astype(dtype)
+
+    for start in range(0, n_paths, block_paths):
+        b = min(block_paths, n_paths - start)
+        z = z_buf[:b]
+        dz = corr_buf[:b]
+        paths = path_buf[:b]
+        if antithetic:
+            antithetic_normals(rng, z.shape, out=z)
+        else:
+            rng.standard_normal(out=z, dtype=dtype)
+        np.matmul(z, chol_t, out=dz)
+        if shift is not None:
+            dz += shift
+        dz *= vol
+        dz += drift
+        log_paths = paths[:, 1:]
+        np.cumsum(dz, axis=1, out=log_paths)
+        np.exp(log_paths, out=log_paths)
+        log_paths *= model.s0
+        yield paths
@@ -0,0 +1,491 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from pydantic import BaseModel
+
+from guarantee_vehicle import __version__
+from guarantee_vehicle.capital.aggregation import weighted_portfolio_samples, weighted_portfolio_sketch
+from guarantee_vehicle.capital.rating_capital import severity_capital
+from guarantee_vehicle.capital.returns import break_even_fee_bps, compile_stack, returns_for_leverage, stack_returns
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.io import LoadedData, validate_loaded_data
+from guarantee_vehicle.io.cache import DEFAULT_CACHE_DIR, evict_lru
+from guarantee_vehicle.market.exposure import exposure_profiles
+from guarantee_vehicle.market.fx import (
+    iter_phase0_mtm_chunks,
+    phase0_mtm_positive,
+    phase0_mtm_sketch,
+    summarize_mtm_distribution,
+)
+from guarantee_vehicle.market.rates import build_rate_curves
+from guarantee_vehicle.portfolio.book import TradeBook
+from guarantee_vehicle.profiling import Profiler
+from guarantee_vehicle.simulation.adaptive import run_adaptive_loss_simulation
+from guarantee_vehicle.simulation.book_engine import run_book_simulation
+from guarantee_vehicle.simulation.loss_engine import LossSimulationResult, SpotPanel, build_spot_panel, phase0_el_control
+from guarantee_vehicle.simulation.parallel import run_loss_simulation
+from guarantee_vehicle.simulation.sweep import scenario_grid_table, scenario_tail_metrics
+from guarantee_vehicle.stats.risk_metrics import RiskMetrics
+from guarantee_vehicle.stats.sketch import LogHistogramSketch
+from guarantee_vehicle.stats.variance_reduction import (
+    MeanEstimate,
+    antithetic_estimate,
+    control_variate_estimate,
+    plain_estimate,
+)
+
+
+@dataclass
+class StageContext:
+    # Run inputs outside the stage keys: data is keyed by data_key (see io.cache.data_cache_key);
+    # workers only changes speed, and samples_by_ccy / panel are precomputed intermediates equal to
+    # what the stages would build themselves (shared across batch runs).
+    data: LoadedData
+    data_key: str | None = None
+    workers: int = 1
+    samples_by_ccy: dict[str, np.ndarray] | None = None
+    panel: SpotPanel | None = None
+    # loaded from cfg.portfolio.trade_book; its digest must be part of data_key
+    book: TradeBook | None = None
+
+
+@dataclass(frozen=True)
+class Stage:
+    # fn(cfg, ctx, **upstream outputs) -> dict. config lists the dotted config paths fn reads; the stage
+    # key hashes their values with the upstream keys, so a change invalidates this stage and everything
+    # downstream of it.
+    name: str
+    fn: Callable[..., dict]
+    config: tuple[str, ...]
+    inputs: tuple[str, ...] = ()
+
+
+def _config_value(cfg: AppConfig, path: str) -> object:
+    value: object = cfg
+    for part in path.split("."):
+        value = getattr(value, part)
+    return value
+
+
+def _jsonable(value: object) -> object:
+    # config models nested in lists (capital_stack) are not handled by json.dumps itself
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+@functools.cache
+def code_version() -> str:
+    # the package version and a digest of every module's source, so any code change invalidates the
+    # cached stages (stage functions call into most of the package)
+    root = Path(__file__).resolve().parent
+    digest = hashlib.sha256(__version__.encode("utf-8"))
+    for path in sorted(root.rglob("*.py")):
+        digest.update(path.relative_to(root).as_posix().encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def stage_key(stage: Stage, cfg: AppConfig, data_key: str, upstream: dict[str, str]) -> str:
+    spec = {
+        "code": code_version(),
+        "stage": stage.name,
+        "data": data_key,
+        "config": {path: _config_value(cfg, path) for path in stage.config},
+        "inputs": {name: upstream[name] for name in stage.inputs},
+    }
+    encoded = json.dumps(spec, sort_keys=True, default=_jsonable)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class StageCache:
+    # Pickled stage outputs, one file per key, with the same LRU / age eviction as DataCache
+    directory: Path = DEFAULT_CACHE_DIR / "stages"
+    max_bytes: int | None = 512 * 1024 * 1024
+    max_age_days: float | None = 30.0
+
+    def _entry(self, key: str) -> Path:
+        return Path(self.directory) / f"{key}.pkl"
+
+    def get(self, key: str) -> dict | None:
+        entry = self._entry(key)
+        if not entry.exists():
+            return None
+        try:
+            with open(entry, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            entry.unlink(missing_ok=True)
+            return None
+        os.utime(entry)
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        directory = Path(self.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._entry(key))
+        self.evict()
+
+    def evict(self) -> None:
+        evict_lru(Path(self.directory), "*.pkl", self.max_bytes, self.max_age_days)
+
+    def clear(self) -> None:
+        for entry in Path(self.directory).glob("*.pkl"):
+            entry.unlink(missing_ok=True)
+
+
+def _profiled_arrays(output: dict) -> dict[str, object]:
+    return {
+        k: v
+        for k, v in output.items()
+        if isinstance(v, np.ndarray)
+        or hasattr(v, "memory_usage")
+        or (isinstance(v, dict) and v and all(isinstance(a, np.ndarray) for a in v.values()))
+    }
+
+
+def run_stages(
+    stages: tuple[Stage, ...],
+    cfg: AppConfig,
+    ctx: StageContext,
+    cache: StageCache | None = None,
+    prof: Profiler | None = None,
+) -> tuple[dict[str, dict], dict[str, bool]]:
+    # Runs the stages in order (each after its inputs); returns the outputs and which came from the cache
+    if cache is not None and ctx.data_key is None:
+        raise ValueError("A stage cache needs ctx.data_key to key the stages")
+    prof = prof or Profiler()
+    outputs: dict[str, dict] = {}
+    keys: dict[str, str] = {}
+    hits: dict[str, bool] = {}
+    for stage in stages:
+        with prof.stage(stage.name) as st:
+            output = None
+            if cache is not None:
+                keys[stage.name] = stage_key(stage, cfg, ctx.data_key, keys)
+                output = cache.get(keys[stage.name])
+            hits[stage.name] = output is not None
+            if cache is not None:
+                st.annotate(cached=hits[stage.name])
+            if output is None:
+                output = stage.fn(cfg, ctx, **{name: outputs[name] for name in stage.inputs})
+                if cache is not None:
+                    cache.put(keys[stage.name], output)
+            st.add_arrays(**_profiled_arrays(output))
+        outputs[stage.name] = output
+    return outputs, hits
+
+
+def apply_trade_book(cfg: AppConfig, book: TradeBook) -> AppConfig:
+    # the book's currency weights and total notional replace the configured ones
+    weights = book.currency_weights()
+    portfolio = cfg.portfolio.model_copy(
+        update={
+            "weighting": "custom",
+            "custom_weights": {c: weights.get(c, 0.0) for c in cfg.universe.currencies},
+            "notional_usd_total": book.total_notional,
+        }
+    )
+    return cfg.model_copy(update={"portfolio": portfolio})
+
+
+def _validate(cfg: AppConfig, ctx: StageContext) -> dict:
+    checks = validate_loaded_data(ctx.data, cfg)
+    if ctx.book is not None:
+        checks += ctx.book.concentration_checks(cfg.capital_target.concentration_limits)
+    return {"checks": checks}
+
+
+def _exposure(cfg: AppConfig, ctx: StageContext, validate: dict) -> dict:
+    weights = (
+        {c: 1 / len(cfg.universe.currencies) for c in cfg.universe.currencies}
+        if cfg.portfolio.weighting == "equal"
+        else cfg.portfolio.custom_weights
+    )
+    if cfg.sketch.enabled:
+        return _exposure_sketch(cfg, ctx, weights)
+    samples_by_ccy = ctx.samples_by_ccy
+    if samples_by_ccy is None:
+        samples_by_ccy = {
+            ccy: phase0_mtm_positive(ctx.data.fx[ccy], tenor_months=cfg.portfolio.tenor_years * 12)
+            for ccy in cfg.universe.currencies
+        }
+    return {
+        "weights": weights,
+        "samples_by_ccy": samples_by_ccy,
+        "ccy_stats": [{"currency": ccy, **summarize_mtm_distribution(samples_by_ccy[ccy])} for ccy in cfg.universe.currencies],
+        "portfolio_samples": weighted_portfolio_samples(samples_by_ccy, weights),
+    }
+
+
+def _exposure_sketch(cfg: AppConfig, ctx: StageContext, weights: dict[str, float]) -> dict:
+    # cfg.sketch: the same outputs as sketches streamed from the phase-0 windows, without the sample arrays
+    tenor_months = cfg.portfolio.tenor_years * 12
+    template = LogHistogramSketch(cfg.sketch.relative_accuracy)
+    currencies = cfg.universe.currencies
+    samples_by_ccy = {
+        ccy: phase0_mtm_sketch(ctx.data.fx[ccy], tenor_months, sketch=template.empty_like()) for ccy in currencies
+    }
+    chunks_by_ccy = {ccy: iter_phase0_mtm_chunks(ctx.data.fx[ccy], tenor_months) for ccy in currencies}
+    return {
+        "weights": weights,
+        "samples_by_ccy": samples_by_ccy,
+        "ccy_stats": [{"currency": ccy, **summarize_mtm_distribution(samples_by_ccy[ccy])} for ccy in currencies],
+        "portfolio_samples": weighted_portfolio_sketch(chunks_by_ccy, weights, template.empty_like()),
+    }
+
+
+def _exposure_profile(cfg: AppConfig, ctx: StageContext, exposure: dict) -> dict:
+    profile = cfg.exposure_profile
+    if not profile.enabled:
+        return {"profiles": None}
+    profiles = exposure_profiles(
+        ctx.data.fx, exposure["weights"], cfg.portfolio.tenor_years * 12, profile.pfe_quantiles, profile.bucket_months
+    )
+    return {"profiles": profiles}
+
+
+def _simulation(cfg: AppConfig, ctx: StageContext, exposure: dict) -> dict:
+    # Phase-2 losses, EL estimators and the simulated half of the scenario grid. Only the losses and
+    # likelihood ratios of the paths are kept.
+    out = {"sim": None, "conv": None, "el_estimate": None, "el_lines": [], "scenarios": None}
+    n_sim = cfg.simulation.n_paths or min(5000, len(exposure["portfolio_samples"]))
+    if cfg.simulation.antithetic:
+        n_sim += n_sim % 2
+    if cfg.run.phase < 2 or n_sim <= 0:
+        return out
+    weights = exposure["weights"]
+    samples_by_ccy = exposure["samples_by_ccy"]
+    el_lines = out["el_lines"]
+    pd_base = cfg.credit.pd_scenarios_annual[1]
+    panel = ctx.panel
+    if panel is None:
+        panel = build_spot_panel(
+            ctx.data.fx,
+            cfg.universe.currencies,
+            build_rate_curves(ctx.data.rates, cfg.data.rates),
+            cfg.simulation.fx_shrinkage,
+        )
+    if ctx.book is not None:
+        book = ctx.book
+        losses = run_book_simulation(cfg, panel, book, n_sim, cfg.run.seed, workers=ctx.workers)[0, 0]
+        el_estimate = (antithetic_estimate if cfg.simulation.antithetic else plain_estimate)(losses)
+        lo, hi = el_estimate.confidence_interval()
+        el_lines.append(
+            f"- Simulated EL (trade book, counterparty PDs): {el_estimate.mean:,.0f} (95% CI {lo:,.0f} to {hi:,.0f})"
+        )
+        el_lines.append(f"- Trade book: {book.n_trades:,} trades, {book.n_obligors:,} counterparties")
+        if cfg.simulation.antithetic:
+            el_lines.append(f"- Antithetic variance reduction: {el_estimate.variance_reduction:.2f}x")
+        out.update(
+            sim=LossSimulationResult(panel.currencies, losses),
+            el_estimate=el_estimate,
+            scenarios=scenario_tail_metrics(cfg, panel, weights, n_sim, cfg.run.seed, book=book, workers=ctx.workers),
+        )
+        return out
+    if cfg.simulation.convergence.enabled:
+        sim, conv = run_adaptive_loss_simulation(cfg, panel, weights, cfg.run.seed, pd_base, workers=ctx.workers)
+        n_sim = sim.n_paths
+        out["conv"] = conv
+        el_lines.append(
+            f"- Adaptive stopping: {conv.stop_reason.replace('_', ' ')} after {conv.n_paths:,} paths in "
+            f"{conv.n_batches} batches ({conv.elapsed_seconds:.1f}s); relative standard error "
+            f"EL {conv.el_rel_se:.2%} (target {cfg.simulation.convergence.el_rel_tol:.2%}), "
+            f"{cfg.capital_target.method} {cfg.capital_target.confidence:.1%} {conv.capital_rel_se:.2%} "
+            f"(target {cfg.simulation.convergence.capital_rel_tol:.2%})"
+        )
+    elif cfg.sketch.enabled:
+        sketch = LogHistogramSketch(cfg.sketch.relative_accuracy)
+        sim = run_loss_simulation(
+            cfg, panel, weights, n_sim, cfg.run.seed, pd_base, ctx.workers, keep_paths=False, keep_losses=False,
+            sketch=sketch,
+        )
+        sketch = sim.loss_sketch
+        el_estimate = MeanEstimate(sketch.mean, float(np.sqrt(sketch.variance / sketch.count)), sketch.count)
+        lo, hi = el_estimate.confidence_interval()
+        el_lines.append(f"- Simulated EL (PD {pd_base:.0%}): {el_estimate.mean:,.0f} (95% CI {lo:,.0f} to {hi:,.0f})")
+        el_lines.append(
+            "- Loss distribution summarised in a log-histogram sketch "
+            f"(relative accuracy {sketch.relative_accuracy:.2%})"
+        )
+        out.update(
+            sim=sim,
+            el_estimate=el_estimate,
+            scenarios=scenario_tail_metrics(cfg, panel, weights, n_sim, cfg.run.seed, workers=ctx.workers),
+        )
+        return out
+    else:
+        sim = run_loss_simulation(cfg, panel, weights, n_sim, cfg.run.seed, pd_base, workers=ctx.workers)
+
+    antithetic = cfg.simulation.antithetic
+    el_estimate = (antithetic_estimate if antithetic else plain_estimate)(sim.losses, sim.likelihood_ratio)
+    if antithetic:
+        el_lines.append(f"- Antithetic variance reduction: {el_estimate.variance_reduction:.2f}x")
+    if cfg.simulation.control_variate:
+        mean_mtm = [float(samples_by_ccy[c].mean()) if len(samples_by_ccy[c]) else 0.0 for c in panel.currencies]
+        control, control_mean = phase0_el_control(cfg, panel, weights, sim.default_time, mean_mtm, pd_base)
+        el_estimate = control_variate_estimate(sim.losses, control, control_mean, sim.likelihood_ratio, antithetic)
+        el_lines.append(
+            f"- Control-variate variance reduction (phase-0 EL control, beta {el_estimate.beta:.2f}): "
+            f"{el_estimate.variance_reduction:.2f}x"
+        )
+    lo, hi = el_estimate.confidence_interval()
+    el_lines.insert(0, f"- Simulated EL (PD {pd_base:.0%}): {el_estimate.mean:,.0f} (95% CI {lo:,.0f} to {hi:,.0f})")
+
+    out.update(
+        sim=LossSimulationResult(sim.currencies, sim.losses, likelihood_ratio=sim.likelihood_ratio),
+        el_estimate=el_estimate,
+        scenarios=scenario_tail_metrics(
+            cfg, panel, weights, n_sim, cfg.run.seed, workers=ctx.workers, base=sim, base_el=el_estimate.mean
+        ),
+    )
+    return out
+
+
+def _capital(cfg: AppConfig, ctx: StageContext, exposure: dict, simulation: dict) -> dict:
+    capital_pct = severity_capital(exposure["portfolio_samples"], 0.995, cfg.capital_target.addon_pct)
+    sim = simulation["sim"]
+    if sim is None:
+        loss_metrics = None
+    elif sim.loss_sketch is not None:
+        loss_metrics = sim.loss_sketch
+    else:
+        loss_metrics = RiskMetrics(sim.losses, sim.likelihood_ratio)
+    return {
+        "capital_pct": capital_pct,
+        "leverage": 1 / capital_pct if capital_pct > 0 else 0.0,
+        "loss_metrics": loss_metrics,
+    }
+
+
+def _returns(cfg: AppConfig, ctx: StageContext, exposure: dict, simulation: dict) -> dict:
+    portfolio_samples = exposure["portfolio_samples"]
+    # mean phase-0 MTM+ per unit notional, from the samples or the cfg.sketch summary
+    if isinstance(portfolio_samples, LogHistogramSketch):
+        mean_mtm = portfolio_samples.mean
+    else:
+        mean_mtm = float(np.mean(portfolio_samples))
+    checks = []
+    pd_rows = []
+    for pd_annual in cfg.credit.pd_scenarios_annual:
+        el_bps = pd_annual * mean_mtm * 10000
+        net_margin = (
+            cfg.economics.client_fee_bps_pa
+            - cfg.economics.opex_bps_pa
+            - cfg.economics.ndf_cost_addon_bps_pa
+            - cfg.economics.reserve_build_bps_pa
+            - el_bps
+        )
+        pd_rows.append({"pd": pd_annual, "el_bps": el_bps, "net_margin_bps": net_margin})
+    el_values = [r["el_bps"] for r in pd_rows]
+    checks.append(f"EL monotonic with PD: {all(el_values[i] <= el_values[i+1] for i in range(len(el_values)-1))}")
+
+    el_estimate = simulation["el_estimate"]
+    # the reported phase-2 EL (raw likelihood-ratio mean, or the control-variate estimate), as in the grid
+    if el_estimate is not None:
+        expected_loss_amount = el_estimate.mean
+    else:
+        expected_loss_amount = mean_mtm * cfg.credit.pd_scenarios_annual[1] * cfg.portfolio.notional_usd_total
+    stack = compile_stack(cfg.capital_stack)
+    returns = stack_returns(cfg, cfg.portfolio.notional_usd_total, float(expected_loss_amount), stack)
+    fixed_costs_amount = (
+        returns["opex"]
+        + returns["ndf_addon"]
+        + returns["reserve"]
+        + returns["expected_loss"]
+        + returns["mezz_coupon_amount"]
+        + returns["counter_guarantee_fee_amount"]
+    )
+    be_fee = break_even_fee_bps(0.15, returns["equity_amount"], fixed_costs_amount, cfg.portfolio.notional_usd_total)
+
+    lev_axis = np.arange(5, 31)
+    el_per_notional = np.asarray(cfg.credit.pd_scenarios_annual) * mean_mtm
+    all_equity = lev_axis[None, :] * (
+        cfg.economics.client_fee_bps_pa - cfg.economics.opex_bps_pa - el_per_notional[:, None] * 10000
+    ) / 10000
+    curves = {f"All-equity PD {int(pdv*100)}%": roe for pdv, roe in zip(cfg.credit.pd_scenarios_annual, all_equity)}
+    if lev_axis.min() >= stack.min_leverage:
+        curves[f"Equity ROE after stack costs (PD {int(cfg.credit.pd_scenarios_annual[1]*100)}%)"] = returns_for_leverage(
+            cfg, lev_axis, float(expected_loss_amount) / cfg.portfolio.notional_usd_total, stack=stack
+        )["equity_roe"]
+
+    roe_line = curves["All-equity PD 4%"] if "All-equity PD 4%" in curves else next(iter(curves.values()))
+    checks.append(f"ROE monotonic with leverage: {bool(np.all(np.diff(roe_line) >= -1e-12))}")
+    checks.append(
+        "Counter-guarantee return matches configured fee: "
+        f"{abs(returns['guarantor_return_on_guaranteed_amount'] - ((cfg.capital_stack[2].fee_bps_on_guaranteed_amount or 0)/10000.0)) < 1e-12}"
+    )
+
+    scenarios = simulation["scenarios"]
+    return {
+        "pd_rows": pd_rows,
+        "expected_loss_amount": float(expected_loss_amount),
+        "returns": returns,
+        "break_even_fee_bps": be_fee,
+        "lev_axis": lev_axis,
+        "curves": curves,
+        "scenario_grid": None if scenarios is None else scenario_grid_table(cfg, *scenarios),
+        "checks": checks,
+    }
+
+
+# load happens before the pipeline (DataCache); report writing after it, in the CLI
+MODEL_STAGES: tuple[Stage, ...] = (
+    Stage(
+        "validate",
+        _validate,
+        ("universe.currencies", "data.rates", "portfolio.trade_book", "capital_target.concentration_limits"),
+    ),
+    Stage(
+        "exposure",
+        _exposure,
+        ("universe.currencies", "portfolio.tenor_years", "portfolio.weighting", "portfolio.custom_weights", "sketch"),
+        ("validate",),
+    ),
+    Stage("exposure_profile", _exposure_profile, ("exposure_profile", "portfolio.tenor_years"), ("exposure",)),
+    Stage(
+        "simulation",
+        _simulation,
+        (
+            "run.phase",
+            "run.seed",
+            "data.rates",
+            "universe",
+            "portfolio",
+            "credit",
+            "guarantee",
+            "capital_target",
+            "simulation",
+            "sweep.coverage_pct",
+            "sketch",
+        ),
+        ("exposure",),
+    ),
+    Stage("capital", _capital, ("capital_target",), ("exposure", "simulation")),
+    Stage(
+        "returns",
+        _returns,
+        (
+            "economics",
+            "capital_stack",
+            "credit.pd_scenarios_annual",
+            "portfolio.notional_usd_total",
+            "sweep",
+        ),
+        ("exposure", "simulation"),
+    ),
+)
@@ -0,0 +1,3 @@
+from guarantee_vehicle.portfolio.book import BOOK_COLUMNS, INSTRUMENTS, TradeBook, load_trade_book
+
+__all__ = ["BOOK_COLUMNS", "INSTRUMENTS", "TradeBook", "load_trade_book"]
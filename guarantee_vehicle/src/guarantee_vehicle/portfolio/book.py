@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from guarantee_vehicle.config import ConcentrationLimitsConfig
+
+# strike is optional: blank means at the money at the simulation start
+BOOK_COLUMNS = ("counterparty", "currency", "instrument", "notional_usd", "strike", "tenor_years", "pd_annual")
+INSTRUMENTS = ("CCS", "NDF")
+
+
+@dataclass(frozen=True)
+class TradeBook:
+    # Struct of arrays, one entry per trade, sorted by counterparty (obligor), currency and tenor. The
+    # trades of obligor o are rows obligor_offsets[o]:obligor_offsets[o + 1]; each (obligor, currency)
+    # group g holds rows group_offsets[g]:group_offsets[g + 1], and obligor o owns groups
+    # obligor_groups[o]:obligor_groups[o + 1]. Codes index counterparties / currencies / INSTRUMENTS.
+    counterparties: np.ndarray
+    currencies: list[str]
+    obligor: np.ndarray
+    currency: np.ndarray
+    instrument: np.ndarray
+    notional: np.ndarray
+    # LCY per USD at inception; NaN = at the money
+    strike: np.ndarray
+    tenor_years: np.ndarray
+    obligor_offsets: np.ndarray
+    group_offsets: np.ndarray
+    group_currency: np.ndarray
+    obligor_groups: np.ndarray
+    # one annual PD per obligor
+    obligor_pd: np.ndarray
+
+    @property
+    def n_trades(self) -> int:
+        return len(self.notional)
+
+    @property
+    def n_obligors(self) -> int:
+        return len(self.counterparties)
+
+    @property
+    def total_notional(self) -> float:
+        return float(self.notional.sum())
+
+    @property
+    def n_groups(self) -> int:
+        return len(self.group_currency)
+
+    @property
+    def trades_per_obligor(self) -> np.ndarray:
+        return np.diff(self.obligor_offsets)
+
+    @property
+    def groups_per_obligor(self) -> np.ndarray:
+        return np.diff(self.obligor_groups)
+
+    @property
+    def trade_group(self) -> np.ndarray:
+        return np.repeat(np.arange(self.n_groups), np.diff(self.group_offsets))
+
+    @property
+    def obligor_notional(self) -> np.ndarray:
+        return np.bincount(self.obligor, weights=self.notional, minlength=self.n_obligors)
+
+    @property
+    def currency_notional(self) -> np.ndarray:
+        return np.bincount(self.currency, weights=self.notional, minlength=len(self.currencies))
+
+    def currency_weights(self) -> dict[str, float]:
+        return dict(zip(self.currencies, (self.currency_notional / self.total_notional).tolist()))
+
+    def concentration_checks(self, limits: ConcentrationLimitsConfig) -> list[str]:
+        # the largest counterparty and currency weights against the limits; a breach is a ValueError
+        obligor_w = self.obligor_notional / self.total_notional
+        currency_w = self.currency_notional / self.total_notional
+        top_o, top_c = int(obligor_w.argmax()), int(currency_w.argmax())
+        rows = [
+            ("counterparty", self.counterparties[top_o], obligor_w[top_o], limits.max_single_counterparty_weight),
+            ("currency", self.currencies[top_c], currency_w[top_c], limits.max_currency_weight),
+        ]
+        breaches = [f"{kind} {name} at {w:.2%} (limit {limit:.2%})" for kind, name, w, limit in rows if w > limit]
+        if breaches:
+            raise ValueError(f"Trade book breaches capital_target.concentration_limits: {'; '.join(breaches)}")
+        return [f"Largest {kind} weight {w:.2%} ({name}) within {limit:.2%} limit" for kind, name, w, limit in rows]
+
+    def digest(self) -> str:
+        h = hashlib.sha256("\x1f".join([*self.counterparties.tolist(), *self.currencies]).encode())
+        for a in (self.obligor, self.currency, self.instrument, self.notional, self.strike, self.tenor_years, self.obligor_pd):
+            h.update(np.ascontiguousarray(a).tobytes())
+        return h.hexdigest()[:16]
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, currencies: list[str] | None = None) -> "TradeBook":
+        # currencies: allowed currency codes (the model universe); the book keeps the ones it uses
+        missing = [c for c in BOOK_COLUMNS if c not in df.columns and c != "strike"]
+        if missing:
+            raise ValueError(f"Trade book is missing columns: {missing}")
+        if df.empty:
+            raise ValueError("Trade book has no trades")
+        ccy = df["currency"].astype(str).str.strip().str.upper()
+        unknown = sorted(set(ccy) - set(currencies)) if currencies is not None else []
+        if unknown:
+            raise ValueError(f"Trade book currencies not in universe.currencies: {unknown}")
+        inst = df["instrument"].astype(str).str.strip().str.upper()
+        bad = sorted(set(inst) - set(INSTRUMENTS))
+        if bad:
+            raise ValueError(f"Trade book instruments must be one of {INSTRUMENTS}, got {bad}")
+        notional = pd.to_numeric(df["notional_usd"], errors="raise").to_numpy(dtype=float)
+        tenor = pd.to_numeric(df["tenor_years"], errors="raise").to_numpy(dtype=float)
+        pd_annual = pd.to_numeric(df["pd_annual"], errors="raise").to_numpy(dtype=float)
+        strike = (
+            pd.to_numeric(df["strike"], errors="coerce").to_numpy(dtype=float)
+            if "strike" in df.columns
+            else np.full(len(df), np.nan)
+        )
+        if not (notional > 0).all() or not (tenor > 0).all():
+            raise ValueError("Trade book notional_usd and tenor_years must be positive")
+        if not ((pd_annual > 0) & (pd_annual < 1)).all():
+            raise ValueError("Trade book pd_annual must be in (0, 1)")
+
+        counterparties, obligor = np.unique(df["counterparty"].astype(str).str.strip().to_numpy(), return_inverse=True)
+        book_ccys = sorted(set(ccy), key=currencies.index) if currencies is not None else sorted(set(ccy))
+        currency = pd.Categorical(ccy, categories=book_ccys).codes.astype(np.int64)
+        order = np.lexsort((tenor, currency, obligor))
+        obligor, currency = obligor[order], currency[order]
+        obligor_offsets = np.concatenate([[0], np.cumsum(np.bincount(obligor, minlength=len(counterparties)))])
+        group_start = np.flatnonzero(np.r_[True, (obligor[1:] != obligor[:-1]) | (currency[1:] != currency[:-1])])
+        group_obligor = obligor[group_start]
+        obligor_groups = np.concatenate([[0], np.cumsum(np.bincount(group_obligor, minlength=len(counterparties)))])
+        pd_sorted = pd_annual[order]
+        obligor_pd = pd_sorted[obligor_offsets[:-1]]
+        if not np.allclose(pd_sorted, obligor_pd[obligor]):
+            conflicting = counterparties[np.unique(obligor[~np.isclose(pd_sorted, obligor_pd[obligor])])]
+            raise ValueError(f"Counterparties with more than one pd_annual: {conflicting[:10].tolist()}")
+        return cls(
+            counterparties=counterparties,
+            currencies=book_ccys,
+            obligor=obligor.astype(np.int64),
+            currency=currency,
+            instrument=pd.Categorical(inst, categories=list(INSTRUMENTS)).codes.astype(np.int8)[order],
+            notional=notional[order],
+            strike=strike[order],
+            tenor_years=tenor[order],
+            obligor_offsets=obligor_offsets.astype(np.int64),
+            group_offsets=np.append(group_start, len(obligor)).astype(np.int64),
+            group_currency=currency[group_start],
+            obligor_groups=obligor_groups.astype(np.int64),
+            obligor_pd=obligor_pd,
+        )
+
+
+def load_trade_book(path: str | Path, currencies: list[str] | None = None) -> TradeBook:
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        try:
+            df = pd.read_parquet(path)
+        except ImportError as exc:
+            raise ImportError("Reading a Parquet trade book needs pyarrow: pip install 'guarantee-vehicle[parquet]'") from exc
+    else:
+        df = pd.read_csv(path)
+    return TradeBook.from_frame(df, currencies)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+import tracemalloc
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _max_rss_mb() -> float | None:
+    # process high-water mark; ru_maxrss is in KiB on Linux and bytes on macOS
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == "darwin" else rss * 1024 / 1e6
+
+
+@dataclass
+class StageRecord:
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    # peak of memory traced during the stage (main process only); None unless memory tracing is on
+    peak_traced_mb: float | None = None
+    max_rss_mb: float | None = None
+    arrays: dict[str, dict] = field(default_factory=dict)
+    # free-form per-stage facts, e.g. whether the result came from a cache
+    notes: dict[str, object] = field(default_factory=dict)
+
+    def annotate(self, **notes: object) -> None:
+        self.notes.update(notes)
+
+    def add_arrays(self, **arrays: object) -> None:
+        # arrays, pandas objects or mappings of arrays; None entries are skipped
+        for name, a in arrays.items():
+            if a is None:
+                continue
+            if hasattr(a, "memory_usage"):  # pandas Series / DataFrame, sized without a copy
+                self.arrays[name] = {
+                    "shape": list(a.shape),
+                    "dtype": type(a).__name__,
+                    "mb": float(np.sum(a.memory_usage(deep=True))) / 1e6,
+                }
+            elif isinstance(a, Mapping):
+                parts = [np.asarray(v) for v in a.values()]
+                self.arrays[name] = {
+                    "shape": [len(parts)],
+                    "dtype": "mapping",
+                    "mb": sum(p.nbytes for p in parts) / 1e6,
+                }
+            else:
+                a = np.asarray(a)
+                self.arrays[name] = {"shape": list(a.shape), "dtype": str(a.dtype), "mb": a.nbytes / 1e6}
+
+    @property
+    def arrays_mb(self) -> float:
+        return sum(a["mb"] for a in self.arrays.values())
+
+
+class _NullStage:
+    def add_arrays(self, **arrays: object) -> None:
+        pass
+
+    def annotate(self, **notes: object) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    # Flat (non-nested) stage timer. Disabled, stage() yields a shared no-op object and records nothing.
+    def __init__(self, enabled: bool = False, trace_memory: bool = True) -> None:
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages: list[StageRecord] = []
+        self._owns_tracing = False
+        self._t0 = time.perf_counter()
+
+    def __enter__(self) -> "Profiler":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageRecord | _NullStage]:
+        if not self.enabled:
+            yield _NULL_STAGE
+            return
+        record = StageRecord(name)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_s = time.perf_counter() - wall0
+            record.cpu_s = time.process_time() - cpu0
+            if self.trace_memory:
+                record.peak_traced_mb = (tracemalloc.get_traced_memory()[1] - base) / 1e6
+            record.max_rss_mb = _max_rss_mb()
+            self.stages.append(record)
+
+    @property
+    def total_wall_s(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def table_rows(self, digits: int = 3) -> list[dict]:
+        def r(x: float | None) -> float | None:
+            return None if x is None else round(x, digits)
+
+        return [
+            {
+                "stage": s.name,
+                "wall_s": r(s.wall_s),
+                "cpu_s": r(s.cpu_s),
+                "peak_traced_mb": r(s.peak_traced_mb),
+                "max_rss_mb": r(s.max_rss_mb),
+                "arrays_mb": r(s.arrays_mb),
+                **s.notes,
+            }
+            for s in self.stages
+        ]
+
+    def report_rows(self, digits: int = 3) -> list[dict]:
+        # table_rows for the markdown report: flags as yes/no, and "–" where a stage has no such note
+        def cell(row: dict, key: str) -> object:
+            if key not in row:
+                return "–"
+            value = row[key]
+            return ("yes" if value else "no") if isinstance(value, bool) else value
+
+        rows = self.table_rows(digits)
+        columns = dict.fromkeys(k for row in rows for k in row)
+        return [{k: cell(row, k) for k in columns} for row in rows]
+
+    def write_json(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        trace = {
+            "total_wall_s": self.total_wall_s,
+            "trace_memory": self.trace_memory,
+            "stages": [asdict(s) for s in self.stages],
+        }
+        path.write_text(json.dumps(trace, indent=2) + "\n")
+        return path
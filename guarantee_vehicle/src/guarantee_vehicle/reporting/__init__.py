@@ -1,3 +1,4 @@
+from guarantee_vehicle.reporting.report_json import write_json_report
 from guarantee_vehicle.reporting.report_md import write_report
 
-__all__ = ["write_report"]
+__all__ = ["write_json_report", "write_report"]
@@ -2,11 +2,21 @@ from __future__ import annotations
 
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import numpy as np
 
+from guarantee_vehicle.stats.risk_metrics import RiskMetrics
+from guarantee_vehicle.stats.sketch import LogHistogramSketch
+
+
+def _pyplot():
+    # matplotlib is imported on first plot so headless runs never pay for it
+    import matplotlib.pyplot as plt
+
+    return plt
+
 
 def plot_leverage_vs_roe(path: Path, leverage: np.ndarray, curves: dict[str, np.ndarray]) -> None:
+    plt = _pyplot()
     plt.figure(figsize=(8, 5))
     for label, vals in curves.items():
         plt.plot(leverage, vals * 100, label=label)
@@ -21,9 +31,16 @@ def plot_leverage_vs_roe(path: Path, leverage: np.ndarray, curves: dict[str, np.
     plt.close()
 
 
-def plot_loss_exceedance(path: Path, losses: np.ndarray) -> None:
-    sorted_losses = np.sort(losses)
-    p = 1 - np.arange(1, len(sorted_losses) + 1) / len(sorted_losses)
+def plot_loss_exceedance(path: Path, losses: np.ndarray | RiskMetrics | LogHistogramSketch) -> None:
+    if isinstance(losses, LogHistogramSketch):
+        sorted_losses, p = losses.exceedance_curve()
+    elif isinstance(losses, RiskMetrics) and losses.weights is not None:
+        sorted_losses = losses.sorted
+        p = 1 - np.cumsum(losses.weights)
+    else:
+        sorted_losses = losses.sorted if isinstance(losses, RiskMetrics) else np.sort(losses)
+        p = 1 - np.arange(1, len(sorted_losses) + 1) / len(sorted_losses)
+    plt = _pyplot()
     plt.figure(figsize=(8, 5))
     plt.plot(sorted_losses, p)
     plt.xlabel("Loss")
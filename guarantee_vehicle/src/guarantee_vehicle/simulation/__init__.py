@@ -0,0 +1,32 @@
+from guarantee_vehicle.simulation.adaptive import ConvergenceSummary, run_adaptive_loss_simulation
+from guarantee_vehicle.simulation.book_engine import BookValuation, prepare_book, run_book_simulation, simulate_book_losses
+from guarantee_vehicle.simulation.loss_engine import (
+    LossSimulationResult,
+    SpotPanel,
+    build_spot_panel,
+    phase0_el_control,
+    simulate_losses,
+    simulate_scenario_losses,
+)
+from guarantee_vehicle.simulation.parallel import chunk_plan, run_loss_simulation
+from guarantee_vehicle.simulation.sweep import run_scenario_grid, scenario_grid_table, scenario_tail_metrics
+
+__all__ = [
+    "BookValuation",
+    "ConvergenceSummary",
+    "LossSimulationResult",
+    "SpotPanel",
+    "build_spot_panel",
+    "chunk_plan",
+    "phase0_el_control",
+    "prepare_book",
+    "run_adaptive_loss_simulation",
+    "run_book_simulation",
+    "run_loss_simulation",
+    "run_scenario_grid",
+    "scenario_grid_table",
+    "scenario_tail_metrics",
+    "simulate_book_losses",
+    "simulate_losses",
+    "simulate_scenario_losses",
+]
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.simulation.loss_engine import LossSimulationResult, SpotPanel
+from guarantee_vehicle.simulation.parallel import chunk_plan, iter_loss_chunks
+from guarantee_vehicle.stats.risk_metrics import RiskMetrics
+from guarantee_vehicle.stats.variance_reduction import antithetic_estimate, pair_means, plain_estimate
+
+StopReason = Literal["converged", "path_budget", "time_budget"]
+
+
+@dataclass(frozen=True)
+class ConvergenceSummary:
+    n_paths: int
+    n_batches: int
+    el: float
+    el_rel_se: float
+    capital: float
+    capital_rel_se: float
+    stop_reason: StopReason
+    elapsed_seconds: float
+
+
+class _RunningPrecision:
+    # EL standard error from running sums over replicates (lr-weighted losses, or antithetic pair means);
+    # VaR/ES standard error by batch means: the spread of per-batch estimates over sqrt(batches)
+    def __init__(self, cfg: AppConfig) -> None:
+        self.cfg = cfg
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.batch_capital: list[float] = []
+
+    def add(self, part: LossSimulationResult) -> None:
+        target = self.cfg.capital_target
+        y = part.losses if part.likelihood_ratio is None else part.losses * part.likelihood_ratio
+        if self.cfg.simulation.antithetic:
+            y = pair_means(y)
+        self.n += len(y)
+        self.total += float(y.sum())
+        self.total_sq += float(np.square(y).sum())
+        metrics = RiskMetrics(part.losses, part.likelihood_ratio)
+        self.batch_capital.append(metrics.var_or_es(target.confidence, target.method))
+
+    def relative_errors(self) -> tuple[float, float]:
+        mean = self.total / self.n
+        var = (self.total_sq - self.n * mean * mean) / (self.n - 1) if self.n > 1 else np.inf
+        el_rel_se = np.sqrt(max(var, 0.0) / self.n) / abs(mean) if mean != 0 else np.inf
+        k = len(self.batch_capital)
+        capital = float(np.mean(self.batch_capital))
+        capital_se = np.std(self.batch_capital, ddof=1) / np.sqrt(k) if k > 1 else np.inf
+        capital_rel_se = capital_se / abs(capital) if capital != 0 else np.inf
+        return float(el_rel_se), float(capital_rel_se)
+
+
+def run_adaptive_loss_simulation(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    weights: dict[str, float],
+    seed: int,
+    pd_annual: float,
+    workers: int = 1,
+    keep_paths: bool = True,
+) -> tuple[LossSimulationResult, ConvergenceSummary]:
+    # Runs simulation.chunk_paths-sized batches until the relative standard errors of EL and of the
+    # capital measure meet simulation.convergence, or a path/time budget runs out. Batch i uses the i-th
+    # chunk of chunk_plan(seed, max_paths), so the paths equal run_loss_simulation's for the final path
+    # count. Batches are checked in seed order as each completes, so the path count does not depend on
+    # the worker count unless the time budget runs out.
+    conv = cfg.simulation.convergence
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    plan = chunk_plan(seed, conv.max_paths, cfg.simulation.chunk_paths)
+
+    parts: list[LossSimulationResult] = []
+    precision = _RunningPrecision(cfg)
+    n_done = 0
+    reason: StopReason | None = None
+    start = time.perf_counter()
+    with closing(iter_loss_chunks(cfg, panel, weights, plan, pd_annual, min(workers, len(plan)), keep_paths)) as chunks:
+        for part in chunks:
+            parts.append(part)
+            precision.add(part)
+            n_done += len(part.losses)
+            el_rel_se, capital_rel_se = precision.relative_errors()
+            if (
+                n_done >= conv.min_paths
+                and len(parts) >= conv.min_batches
+                and el_rel_se <= conv.el_rel_tol
+                and capital_rel_se <= conv.capital_rel_tol
+            ):
+                reason = "converged"
+            elif n_done >= conv.max_paths:
+                reason = "path_budget"
+            elif conv.max_seconds is not None and time.perf_counter() - start >= conv.max_seconds:
+                reason = "time_budget"
+            if reason is not None:
+                break
+
+    result = LossSimulationResult.concatenate(parts)
+    target = cfg.capital_target
+    el = (antithetic_estimate if cfg.simulation.antithetic else plain_estimate)(result.losses, result.likelihood_ratio)
+    summary = ConvergenceSummary(
+        n_paths=n_done,
+        n_batches=len(parts),
+        el=el.mean,
+        el_rel_se=el_rel_se,
+        capital=RiskMetrics(result.losses, result.likelihood_ratio).var_or_es(target.confidence, target.method),
+        capital_rel_se=capital_rel_se,
+        stop_reason=reason,
+        elapsed_seconds=time.perf_counter() - start,
+    )
+    return result, summary
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+
+import numpy as np
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.credit.default_model import default_times_from_uniforms
+from guarantee_vehicle.guarantee.payout import payout_default_only_array
+from guarantee_vehicle.market.rates import DiscountGrid
+from guarantee_vehicle.portfolio.book import INSTRUMENTS, TradeBook
+from guarantee_vehicle.simulation.loss_engine import FX_PATH_BLOCK, PERIODS_PER_YEAR, SpotPanel, _fx_path_blocks
+from guarantee_vehicle.simulation.parallel import chunk_plan, worker_pool, worker_state
+from guarantee_vehicle.stats.variance_reduction import antithetic_uniforms
+
+# expected (path, obligor-currency group) valuations per default block; bounds memory for books of any size
+BOOK_BLOCK_EVENTS = 1 << 20
+
+SpotLookup = Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+
+@dataclass(frozen=True)
+class BookValuation:
+    # Per-trade pricing coefficients, computed once per (book, panel, config). With u(t) / l(t) the USD /
+    # LCY discount grids from t to the horizon (DiscountGrid.at), x = spot / start spot and the strike
+    # a fixed multiple of the start spot, mtm_ccs_lender_discounted and mtm_ndf_lender_discounted are
+    #     u(t) * (a0 - a1 * t) + l(t) * (c0 * x - (b0 - b1 * t) / x)    for t < maturity, else 0
+    # (CCS: c0 = 0; NDF: a1 = b0 = b1 = 0). That is linear in the coefficients, so a whole (obligor,
+    # currency) group is valued from the sums over its live trades: the book sorts each group by
+    # maturity, cum_coef holds running sums of (a0, a1, b0, b1, c0) over the book with a leading zero
+    # column, and the trades still alive at t in group g are those from
+    # searchsorted(keys, g * key_span + t, "right") to the group end. Trades in currencies without
+    # enough history have zero coefficients.
+    grid: DiscountGrid
+    group_column: np.ndarray
+    group_end: np.ndarray
+    cum_coef: np.ndarray
+    keys: np.ndarray
+    key_span: float
+    obligor_notional: np.ndarray
+
+
+def prepare_book(cfg: AppConfig, panel: SpotPanel, book: TradeBook) -> BookValuation:
+    tenor = cfg.portfolio.tenor_years
+    if book.tenor_years.max() > tenor:
+        raise ValueError(f"Trade book tenors must not exceed portfolio.tenor_years ({tenor}), got {book.tenor_years.max():g}")
+    missing = [c for c in book.currencies if c not in panel.currencies]
+    if missing:
+        raise ValueError(f"Trade book currencies missing from the spot panel: {missing}")
+    columns = np.array([panel.currencies.index(c) for c in book.currencies], dtype=np.int64)
+    column = columns[book.currency]
+    curves = panel.curves
+    grid = panel.discount_grid(tenor)
+
+    # strike as a multiple of the latest spot, carried to each path's start spot; NaN = at the money
+    latest = panel.values[columns, np.maximum(panel.lengths[columns] - 1, 0)][book.currency]
+    ratio = np.where(np.isnan(book.strike), 1.0, book.strike / latest)
+    tau, n = book.tenor_years, book.notional
+    usd_coupon = curves.usd.zero_rate(tau)
+    lcy_coupon = np.empty(book.n_trades)
+    for i, ccy in enumerate(book.currencies):
+        rows = book.currency == i
+        lcy_coupon[rows] = curves.for_currency(ccy).zero_rate(tau[rows])
+    usd_mat, lcy_mat = grid.at(tau, column)
+    ccs = book.instrument == INSTRUMENTS.index("CCS")
+    coef = np.vstack([
+        np.where(ccs, n * (1 + usd_coupon * tau), -n) / usd_mat,
+        np.where(ccs, n * usd_coupon / usd_mat, 0.0),
+        np.where(ccs, n * ratio * (1 + lcy_coupon * tau) / lcy_mat, 0.0),
+        np.where(ccs, n * ratio * lcy_coupon / lcy_mat, 0.0),
+        np.where(ccs, 0.0, n / (ratio * lcy_mat)),
+    ])
+    coef[:, ~panel.active[column]] = 0.0
+    key_span = float(tenor + 1)
+    return BookValuation(
+        grid=grid,
+        group_column=columns[book.group_currency],
+        group_end=book.group_offsets[1:],
+        cum_coef=np.concatenate([np.zeros((5, 1)), np.cumsum(coef, axis=1)], axis=1),
+        keys=book.trade_group * key_span + tau,
+        key_span=key_span,
+        obligor_notional=book.obligor_notional,
+    )
+
+
+def _market_blocks(
+    cfg: AppConfig, panel: SpotPanel, n_sims: int, market_rng: np.random.Generator
+) -> Iterator[tuple[np.ndarray, SpotLookup]]:
+    # (s0 of shape (paths, n_ccy), spot(path, column, step)) per block of paths: a random historical
+    # start per currency, or joint simulated monthly paths from the latest spot
+    n_ccy = len(panel.currencies)
+    if cfg.simulation.fx_model == "historical":
+        for start in range(0, n_sims, FX_PATH_BLOCK):
+            start_index = market_rng.integers(0, np.maximum(panel.lengths - 2, 1), size=(min(FX_PATH_BLOCK, n_sims - start), n_ccy))
+
+            def spot(p: np.ndarray, c: np.ndarray, step: np.ndarray, start_index: np.ndarray = start_index) -> np.ndarray:
+                return panel.values[c, np.minimum(start_index[p, c] + step, panel.lengths[c] - 1)]
+
+            yield panel.values[np.arange(n_ccy), start_index], spot
+        return
+    model, path_blocks = _fx_path_blocks(cfg, panel, n_sims, market_rng)
+    for paths in path_blocks:
+        yield np.broadcast_to(model.s0, (len(paths), n_ccy)), lambda p, c, step, paths=paths: paths[p, step, c]
+
+
+def _default_losses(
+    cfg: AppConfig,
+    book: TradeBook,
+    val: BookValuation,
+    panel: SpotPanel,
+    default_time: np.ndarray,
+    s0: np.ndarray,
+    spot: SpotLookup,
+    covs: np.ndarray,
+) -> np.ndarray:
+    # Losses (n_coverage, n_paths) for one block of obligor default times (n_paths, n_obligors). Only
+    # defaulted (path, obligor) pairs are expanded, through obligor_groups, to their (obligor, currency)
+    # groups, each valued in one step from the coefficient sums of its live trades, so spot moves and
+    # discount factors are looked up once per defaulted group. Each obligor's groups are netted before
+    # the guarantee applies to its positive MTM.
+    n_paths = default_time.shape[0]
+    p, o = np.nonzero(np.isfinite(default_time))
+    if not len(p):
+        return np.zeros((len(covs), n_paths))
+    t = default_time[p, o]
+    step = np.clip(np.rint(t * PERIODS_PER_YEAR).astype(np.int64), 1, cfg.portfolio.tenor_years * PERIODS_PER_YEAR)
+
+    counts = book.groups_per_obligor[o]
+    first = np.cumsum(counts) - counts
+    event = np.repeat(np.arange(len(p)), counts)
+    group = np.arange(len(event)) + np.repeat(book.obligor_groups[o] - first, counts)
+    pe, te, col = p[event], t[event], val.group_column[group]
+    alive = np.searchsorted(val.keys, group * val.key_span + te, side="right")
+    a0, a1, b0, b1, c0 = val.cum_coef[:, val.group_end[group]] - val.cum_coef[:, alive]
+    x = np.where(panel.active[col], spot(pe, col, step[event]) / s0[pe, col], 1.0)
+    u, l = val.grid.at(te, col)
+    mtm = u * (a0 - a1 * te) + l * (c0 * x - (b0 - b1 * te) / x)
+    netted = np.add.reduceat(mtm, first)
+    payout = payout_default_only_array(
+        netted,
+        covs[:, None],
+        cfg.guarantee.attachment_pct_notional,
+        cfg.guarantee.detachment_pct_notional,
+        val.obligor_notional[o],
+    )
+    return np.stack([np.bincount(p, weights=row, minlength=n_paths) for row in payout])
+
+
+def simulate_book_losses(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    book: TradeBook,
+    n_sims: int,
+    seed: int | np.random.SeedSequence,
+    pd_grid: np.ndarray | None = None,
+    coverage_grid: np.ndarray | None = None,
+    valuation: BookValuation | None = None,
+) -> np.ndarray:
+    # Portfolio losses (n_pd, n_coverage, n_sims) of the trade book. pd_grid=None uses each obligor's
+    # own PD (n_pd = 1); otherwise every obligor takes each grid PD in turn. All PD and coverage points
+    # see the same market paths and default uniforms (common random numbers).
+    val = valuation or prepare_book(cfg, panel, book)
+    tenor = cfg.portfolio.tenor_years
+    pd_sets = (
+        book.obligor_pd[None, :]
+        if pd_grid is None
+        else np.repeat(np.asarray(pd_grid, dtype=float)[:, None], book.n_obligors, axis=1)
+    )
+    covs = np.asarray([cfg.guarantee.coverage_pct] if coverage_grid is None else coverage_grid, dtype=float)
+    market_rng, credit_rng = (
+        np.random.default_rng(s)
+        for s in (seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)).spawn(2)
+    )
+    draw = antithetic_uniforms if cfg.simulation.antithetic else lambda g, shape: g.random(shape)
+
+    # rows of default uniforms per block, from the expected number of defaulted groups per path
+    cum_pd = 1.0 - (1.0 - pd_sets.max(axis=0)) ** tenor
+    per_path = max(book.n_obligors, float(book.groups_per_obligor @ cum_pd))
+    block_rows = max(2, int(BOOK_BLOCK_EVENTS // per_path) // 2 * 2)
+
+    losses = np.zeros((len(pd_sets), len(covs), n_sims))
+    start = 0
+    for s0, spot in _market_blocks(cfg, panel, n_sims, market_rng):
+        for r0 in range(0, len(s0), block_rows):
+            r1 = min(r0 + block_rows, len(s0))
+            u = draw(credit_rng, (r1 - r0, book.n_obligors))
+            for i, pds in enumerate(pd_sets):
+                default_time = default_times_from_uniforms(u, pds, tenor)
+                losses[i, :, start + r0 : start + r1] = _default_losses(
+                    cfg, book, val, panel, default_time, s0[r0:r1], lambda p, c, step: spot(p + r0, c, step), covs
+                )
+        start += len(s0)
+    return losses
+
+
+def _run_chunk(chunk: tuple[np.random.SeedSequence, int]) -> np.ndarray:
+    child, size = chunk
+    s = worker_state()
+    return simulate_book_losses(
+        s["cfg"], s["panel"], s["book"], size, child, s["pd_grid"], s["coverage_grid"], s["valuation"]
+    )
+
+
+def run_book_simulation(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    book: TradeBook,
+    n_paths: int,
+    seed: int,
+    pd_grid: np.ndarray | None = None,
+    coverage_grid: np.ndarray | None = None,
+    workers: int = 1,
+) -> np.ndarray:
+    # simulate_book_losses over the chunks of chunk_plan; results do not depend on the worker count
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    plan = chunk_plan(seed, n_paths, cfg.simulation.chunk_paths)
+    state = dict(
+        cfg=cfg,
+        panel=panel,
+        book=book,
+        valuation=prepare_book(cfg, panel, book),
+        pd_grid=pd_grid,
+        coverage_grid=coverage_grid,
+    )
+    with worker_pool(min(workers, len(plan)), state) as pool:
+        parts = list(pool.map(_run_chunk, plan))
+    return np.concatenate(parts, axis=-1)
@@ -0,0 +1,442 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from guarantee_vehicle.config import AppConfig, ImportanceSamplingConfig
+from guarantee_vehicle.credit.correlation import GaussianCopula, copula_for_config, norm_cdf
+from guarantee_vehicle.credit.default_model import (
+    default_time_streams,
+    default_times_from_uniforms,
+    hazard_tilt_log_weights,
+    sample_default_times,
+    tilted_pd,
+)
+from guarantee_vehicle.guarantee.payout import payout_default_only_array
+from guarantee_vehicle.instruments.ccs import CCSParams, mtm_ccs_lender_discounted
+from guarantee_vehicle.instruments.ndf import NDFParams, mtm_ndf_lender_discounted
+from guarantee_vehicle.market.bootstrap import ReturnHistory, aligned_log_returns, iter_bootstrap_fx_blocks
+from guarantee_vehicle.market.rates import DiscountGrid, RateCurves, discount_grid
+from guarantee_vehicle.market.simulation import FXModel, calibrate_fx_model, iter_correlated_fx_blocks
+from guarantee_vehicle.stats.sketch import LogHistogramSketch
+
+
+PERIODS_PER_YEAR = 12
+FX_PATH_BLOCK = 4_096
+
+
+@dataclass
+class SpotPanel:
+    currencies: list[str]
+    values: np.ndarray
+    lengths: np.ndarray
+    # annualised mean and volatility of each series' log returns
+    log_drift: np.ndarray
+    log_vol: np.ndarray
+    curves: RateCurves
+    fx_model: FXModel | None = None
+    # None when no date has returns for every currency
+    return_history: ReturnHistory | None = None
+    # discount grids built from curves, per tenor, on first use
+    _grids: dict[int, DiscountGrid] = field(default_factory=dict, init=False, repr=False)
+
+    @property
+    def active(self) -> np.ndarray:
+        return self.lengths >= 3
+
+    def discount_grid(self, tenor_years: int) -> DiscountGrid:
+        grid = self._grids.get(tenor_years)
+        if grid is None:
+            grid = self._grids[tenor_years] = discount_grid(self.curves, self.currencies, tenor_years)
+        return grid
+
+
+def build_spot_panel(fx: pd.DataFrame, currencies: list[str], curves: RateCurves, shrinkage: float = 0.0) -> SpotPanel:
+    series = [fx[ccy].dropna().astype(float).values for ccy in currencies]
+    lengths = np.array([len(s) for s in series], dtype=np.int64)
+    values = np.full((len(series), max(lengths.max(initial=0), 1)), np.nan)
+    for i, s in enumerate(series):
+        values[i, : len(s)] = s
+
+    try:
+        return_history = aligned_log_returns(fx, currencies, PERIODS_PER_YEAR)
+    except ValueError:
+        return_history = None
+
+    log_ret = np.diff(np.log(values), axis=1)
+    valid = ~np.isnan(log_ret)
+    n_ret = valid.sum(axis=1)
+    log_ret = np.where(valid, log_ret, 0.0)
+    mean = log_ret.sum(axis=1) / np.maximum(n_ret, 1)
+    var = (np.where(valid, log_ret - mean[:, None], 0.0) ** 2).sum(axis=1) / np.maximum(n_ret - 1, 1)
+    return SpotPanel(
+        currencies=list(currencies),
+        values=values,
+        lengths=lengths,
+        log_drift=mean * PERIODS_PER_YEAR,
+        log_vol=np.sqrt(var * PERIODS_PER_YEAR),
+        curves=curves,
+        fx_model=calibrate_fx_model(fx, currencies, shrinkage, PERIODS_PER_YEAR),
+        return_history=return_history,
+    )
+
+
+@dataclass
+class LossSimulationResult:
+    currencies: list[str]
+    losses: np.ndarray
+    start_index: np.ndarray | None = None
+    default_time: np.ndarray | None = None
+    spot_at_default: np.ndarray | None = None
+    mtm: np.ndarray | None = None
+    payout: np.ndarray | None = None
+    loss_sketch: LogHistogramSketch | None = None
+    # importance-sampling likelihood ratio per path; None for plain Monte Carlo
+    likelihood_ratio: np.ndarray | None = None
+
+    @property
+    def n_paths(self) -> int:
+        return self.loss_sketch.count if self.loss_sketch is not None else len(self.losses)
+
+    def without_paths(self) -> "LossSimulationResult":
+        return LossSimulationResult(
+            currencies=self.currencies,
+            losses=self.losses,
+            loss_sketch=self.loss_sketch,
+            likelihood_ratio=self.likelihood_ratio,
+        )
+
+    @classmethod
+    def concatenate(cls, parts: list["LossSimulationResult"]) -> "LossSimulationResult":
+        if not parts:
+            raise ValueError("Cannot concatenate an empty list of simulation results")
+        fields = ("start_index", "default_time", "spot_at_default", "mtm", "payout", "likelihood_ratio")
+        merged = {
+            f: np.concatenate([getattr(p, f) for p in parts]) if all(getattr(p, f) is not None for p in parts) else None
+            for f in fields
+        }
+        sketch = None
+        if all(p.loss_sketch is not None for p in parts):
+            sketch = parts[0].loss_sketch.empty_like()
+            for p in parts:
+                sketch.merge(p.loss_sketch)
+        losses = np.concatenate([p.losses for p in parts])
+        return cls(currencies=parts[0].currencies, losses=losses, loss_sketch=sketch, **merged)
+
+
+def _draw_exposure(
+    seed: int | np.random.SeedSequence,
+    n_ccy: int,
+) -> tuple[np.random.Generator, list[np.random.Generator], np.random.Generator]:
+    market_seed, credit_seed, dependence_seed = (
+        seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    ).spawn(3)
+    return (
+        np.random.default_rng(market_seed),
+        default_time_streams(credit_seed, n_ccy),
+        np.random.default_rng(dependence_seed),
+    )
+
+
+def _draw_defaults(
+    pds: np.ndarray,
+    tenor: float,
+    n_sims: int,
+    streams: list[np.random.Generator],
+    copula: GaussianCopula | None,
+    dependence_rng: np.random.Generator,
+    antithetic: bool = False,
+) -> tuple[np.ndarray, np.ndarray | None]:
+    # pds is (n_ccy,) or (n_scenarios, n_ccy); scenarios share the same uniforms
+    if copula is None:
+        return sample_default_times(streams, pds, tenor, n_sims, antithetic), None
+    z_fx, z_def = copula.draw(dependence_rng, n_sims, antithetic)
+    u = norm_cdf(z_def)
+    if pds.ndim == 2:
+        return default_times_from_uniforms(np.broadcast_to(u, (len(pds), *u.shape)), pds[:, None, :], tenor), z_fx
+    return default_times_from_uniforms(u, pds, tenor), z_fx
+
+
+def _historical_spots(
+    panel: SpotPanel,
+    market_rng: np.random.Generator,
+    default_time: np.ndarray,
+    fx_factor: np.ndarray | None,
+    tenor_years: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Start each path at a random window of each currency's history and read the spot at default from
+    # it. With a copula FX factor (n_sims, n_ccy) the window is not uniform: windows are ranked by their
+    # tenor FX move and the factor's normal quantile picks the rank, so defaults stay coupled to FX while
+    # the moves themselves remain historical.
+    n_sims, n_ccy = default_time.shape[-2:]
+    n_starts = np.maximum(panel.lengths - 2, 1)
+    if fx_factor is None:
+        start_index = market_rng.integers(0, n_starts, size=(n_sims, n_ccy))
+    else:
+        rank = np.minimum((norm_cdf(fx_factor) * n_starts).astype(np.int64), n_starts - 1)
+        start_index = np.empty((n_sims, n_ccy), dtype=np.int64)
+        for c in range(n_ccy):
+            starts = np.arange(n_starts[c])
+            ends = np.minimum(starts + tenor_years * PERIODS_PER_YEAR, max(panel.lengths[c] - 1, 0))
+            moves = np.log(panel.values[c, ends] / panel.values[c, starts])
+            start_index[:, c] = np.argsort(moves, kind="stable")[rank[:, c]]
+    ccy_idx = np.arange(n_ccy)
+    defaulted = np.isfinite(default_time)
+    s0 = panel.values[ccy_idx, start_index]
+    step = np.maximum(1, np.rint(np.where(defaulted, default_time, 0.0) * 12).astype(np.int64))
+    t_idx = np.minimum(start_index + step, panel.lengths - 1)
+    return start_index, s0, panel.values[ccy_idx, t_idx]
+
+
+def _importance_sampling(cfg: AppConfig) -> ImportanceSamplingConfig | None:
+    tilt = cfg.simulation.importance_sampling
+    if not tilt.enabled:
+        return None
+    if cfg.credit.fx_default_dependence.enabled:
+        raise ValueError("Importance sampling is not supported together with credit.fx_default_dependence")
+    if tilt.fx_shift_sd != 0 and cfg.simulation.fx_model != "correlated_gbm":
+        raise ValueError("importance_sampling.fx_shift_sd requires simulation.fx_model: correlated_gbm")
+    return tilt
+
+
+def _fx_shift(model: FXModel, tilt: ImportanceSamplingConfig | None) -> np.ndarray | None:
+    # unit mean shift of every simulated currency's standardised cumulative shock; None if untilted
+    if tilt is None or tilt.fx_shift_sd == 0:
+        return None
+    return (model.vol > 0).astype(float)
+
+
+def _fx_path_blocks(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    n_sims: int,
+    market_rng: np.random.Generator,
+    fx_shift: np.ndarray | None = None,
+) -> tuple[FXModel | ReturnHistory, Iterator[np.ndarray]]:
+    n_steps = cfg.portfolio.tenor_years * PERIODS_PER_YEAR
+    if cfg.simulation.fx_model == "correlated_gbm":
+        model = panel.fx_model
+        step_shift = None
+        if fx_shift is not None:
+            step_shift = fx_shift * cfg.simulation.importance_sampling.fx_shift_sd / np.sqrt(n_steps)
+        return model, iter_correlated_fx_blocks(
+            model,
+            1 / PERIODS_PER_YEAR,
+            n_steps,
+            n_sims,
+            market_rng,
+            FX_PATH_BLOCK,
+            shift=step_shift,
+            antithetic=cfg.simulation.antithetic,
+        )
+    if panel.return_history is None:
+        raise ValueError("block_bootstrap needs at least two dates on which every currency has an FX return")
+    history = panel.return_history
+    return history, iter_bootstrap_fx_blocks(
+        history,
+        n_steps,
+        n_sims,
+        market_rng,
+        cfg.simulation.bootstrap_block_months,
+        cfg.simulation.bootstrap_method,
+        FX_PATH_BLOCK,
+    )
+
+
+def _simulated_spots(
+    cfg: AppConfig,
+    model: FXModel | ReturnHistory,
+    path_blocks: Iterator[np.ndarray],
+    pds: np.ndarray,
+    sample_pds: np.ndarray,
+    n_sims: int,
+    streams: list[np.random.Generator],
+    dependence_rng: np.random.Generator,
+    fx_shift: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Joint monthly paths for all currencies from the latest spot, consumed block by block so only
+    # FX_PATH_BLOCK paths are held at once. Under the copula, defaults are conditioned on each path's
+    # cumulative FX shock over the tenor, standardised with the model's moments, so they inherit the
+    # cross-currency dependence of the paths. Returns the FX log likelihood ratio per path as well
+    # (zero unless the paths were drawn with an fx_shift).
+    tenor = cfg.portfolio.tenor_years
+    n_steps = tenor * PERIODS_PER_YEAR
+    n_ccy = len(model.currencies)
+    copula = copula_for_config(cfg.credit.fx_default_dependence, n_ccy, model.corr)
+    shape = (*pds.shape[:-1], n_sims, n_ccy)
+    antithetic = cfg.simulation.antithetic
+    if copula is not None:
+        default_time = np.empty(shape)
+    else:
+        default_time = sample_default_times(streams, sample_pds, tenor, n_sims, antithetic)
+    spot_at_default = np.empty(shape)
+    fx_log_lr = np.zeros(n_sims)
+    shock_mean = model.log_drift * tenor
+    shock_sd = model.vol * np.sqrt(tenor)
+    ccy_idx = np.arange(n_ccy)
+    if fx_shift is not None:
+        # Z ~ N(k a, R) under the sampling measure vs N(0, R): log LR = -k a'R^-1 Z + k^2 a'R^-1 a / 2
+        k = cfg.simulation.importance_sampling.fx_shift_sd
+        r_inv_a = np.linalg.solve(model.corr, fx_shift)
+        fx_lr_const = 0.5 * k * k * float(fx_shift @ r_inv_a)
+
+    start = 0
+    for paths in path_blocks:
+        rows = slice(start, start + len(paths))
+        if copula is not None or fx_shift is not None:
+            z_fx = np.divide(
+                np.log(paths[:, -1] / model.s0) - shock_mean,
+                shock_sd,
+                out=np.zeros((len(paths), n_ccy)),
+                where=shock_sd > 0,
+            )
+        if copula is not None:
+            u = norm_cdf(copula.default_normals(z_fx, dependence_rng, antithetic))
+            default_time[..., rows, :] = default_times_from_uniforms(u, pds[..., None, :], tenor)
+        if fx_shift is not None:
+            fx_log_lr[rows] = fx_lr_const - k * (z_fx @ r_inv_a)
+        t = default_time[..., rows, :]
+        step = np.clip(np.rint(np.where(np.isfinite(t), t, 0.0) * PERIODS_PER_YEAR).astype(np.int64), 1, n_steps)
+        spot_at_default[..., rows, :] = paths[np.arange(len(paths))[:, None], step, ccy_idx]
+        start += len(paths)
+    return default_time, np.broadcast_to(model.s0, (n_sims, n_ccy)), spot_at_default, fx_log_lr
+
+
+def _defaults_and_spots(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    pds: np.ndarray,
+    n_sims: int,
+    seed: int | np.random.SeedSequence,
+) -> tuple[np.ndarray | None, np.ndarray, np.ndarray, np.ndarray, np.ndarray | None]:
+    # Returns (start_index, default_time, s0, spot_at_default, likelihood_ratio); default_time,
+    # spot_at_default and likelihood_ratio carry the leading scenario axis of pds. start_index is None
+    # when FX is simulated rather than replayed, likelihood_ratio when importance sampling is off.
+    market_rng, streams, dependence_rng = _draw_exposure(seed, len(panel.currencies))
+    tenor = cfg.portfolio.tenor_years
+    tilt = _importance_sampling(cfg)
+    sample_pds = pds if tilt is None else tilted_pd(pds, tilt.hazard_multiplier)
+
+    if cfg.simulation.fx_model != "historical":
+        fx_shift = _fx_shift(panel.fx_model, tilt) if cfg.simulation.fx_model == "correlated_gbm" else None
+        model, path_blocks = _fx_path_blocks(cfg, panel, n_sims, market_rng, fx_shift)
+        default_time, s0, spot_at_default, log_lr = _simulated_spots(
+            cfg, model, path_blocks, pds, sample_pds, n_sims, streams, dependence_rng, fx_shift
+        )
+        start_index = None
+    else:
+        copula = copula_for_config(cfg.credit.fx_default_dependence, len(panel.currencies))
+        default_time, fx_factor = _draw_defaults(
+            sample_pds, tenor, n_sims, streams, copula, dependence_rng, cfg.simulation.antithetic
+        )
+        log_lr = 0.0
+    likelihood_ratio = None
+    if tilt is not None:
+        # before masking inactive currencies, so every obligor's draw is weighted against its own density
+        hazard_log_lr = hazard_tilt_log_weights(default_time, pds[..., None, :], tilt.hazard_multiplier, tenor)
+        likelihood_ratio = np.exp(log_lr + hazard_log_lr)
+    default_time[..., ~panel.active] = np.inf
+    if cfg.simulation.fx_model == "historical":
+        start_index, s0, spot_at_default = _historical_spots(panel, market_rng, default_time, fx_factor, tenor)
+    return start_index, default_time, s0, spot_at_default, likelihood_ratio
+
+
+def _value_at_default(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    weights: dict[str, float],
+    s0: np.ndarray,
+    spot_at_default: np.ndarray,
+    default_time: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    tenor = cfg.portfolio.tenor_years
+    defaulted = np.isfinite(default_time)
+    notional = cfg.portfolio.notional_usd_total * np.array([weights[ccy] for ccy in panel.currencies])
+    grid = panel.discount_grid(tenor)
+    t_eff = np.where(defaulted, default_time, float(tenor))
+    usd_df, lcy_df = grid.to_maturity(t_eff)
+    rem = np.maximum(tenor - t_eff, 0.0)
+
+    ccs = CCSParams(notional, s0, grid.usd_fixed_rate, grid.lcy_fixed_rate, tenor)
+    ndf = NDFParams(notional, s0, tenor)
+    mtm = (
+        cfg.portfolio.mix.CCS * mtm_ccs_lender_discounted(ccs, spot_at_default, rem, usd_df, lcy_df)
+        + cfg.portfolio.mix.NDF * mtm_ndf_lender_discounted(ndf, spot_at_default, rem, usd_df, lcy_df)
+    )
+    return np.where(defaulted, mtm, 0.0), notional
+
+
+def phase0_el_control(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    weights: dict[str, float],
+    default_time: np.ndarray,
+    mean_mtm: np.ndarray,
+    pd_annual: float,
+) -> tuple[np.ndarray, float]:
+    # Path-wise analogue of the phase-0 EL: sum_j notional_j * mean phase-0 MTM+_j * 1{obligor j defaults
+    # within the tenor}. Its expectation is known exactly from the cumulative PD, so it serves as a
+    # control variate for the simulated loss. mean_mtm is per unit notional, in panel currency order.
+    exposure = cfg.portfolio.notional_usd_total * np.array([weights[c] for c in panel.currencies])
+    exposure = np.where(panel.active, exposure * np.asarray(mean_mtm, dtype=float), 0.0)
+    control = np.isfinite(default_time) @ exposure
+    cumulative_pd = 1.0 - (1.0 - pd_annual) ** cfg.portfolio.tenor_years
+    return control, float(exposure.sum() * cumulative_pd)
+
+
+def simulate_losses(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    weights: dict[str, float],
+    n_sims: int,
+    seed: int | np.random.SeedSequence,
+    pd_annual: float,
+) -> LossSimulationResult:
+    pds = np.full(len(panel.currencies), pd_annual)
+    start_index, default_time, s0, spot_at_default, likelihood_ratio = _defaults_and_spots(cfg, panel, pds, n_sims, seed)
+    mtm, notional = _value_at_default(cfg, panel, weights, s0, spot_at_default, default_time)
+    payout = payout_default_only_array(
+        mtm,
+        cfg.guarantee.coverage_pct,
+        cfg.guarantee.attachment_pct_notional,
+        cfg.guarantee.detachment_pct_notional,
+        notional,
+    )
+    return LossSimulationResult(
+        currencies=panel.currencies,
+        losses=payout.sum(axis=1),
+        start_index=start_index,
+        default_time=default_time,
+        spot_at_default=spot_at_default,
+        mtm=mtm,
+        payout=payout,
+        likelihood_ratio=likelihood_ratio,
+    )
+
+
+def simulate_scenario_losses(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    weights: dict[str, float],
+    n_sims: int,
+    seed: int | np.random.SeedSequence,
+    pd_grid: np.ndarray,
+    coverage_grid: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray | None]:
+    # Portfolio losses of shape (n_pd, n_coverage, n_sims) and importance-sampling likelihood ratios of
+    # shape (n_pd, n_sims) (None without importance sampling). Every grid point sees the same start
+    # indices and default uniforms as simulate_losses with the same seed (common random numbers).
+    pds = np.repeat(np.asarray(pd_grid, dtype=float)[:, None], len(panel.currencies), axis=1)
+    _, default_time, s0, spot_at_default, likelihood_ratio = _defaults_and_spots(cfg, panel, pds, n_sims, seed)
+    mtm, notional = _value_at_default(cfg, panel, weights, s0, spot_at_default, default_time)
+    payout = payout_default_only_array(
+        mtm[:, None],
+        np.asarray(coverage_grid, dtype=float)[None, :, None, None],
+        cfg.guarantee.attachment_pct_notional,
+        cfg.guarantee.detachment_pct_notional,
+        notional,
+    )
+    return payout.sum(axis=-1), likelihood_ratio
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+import numpy as np
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.simulation.loss_engine import LossSimulationResult, SpotPanel, simulate_losses
+from guarantee_vehicle.stats.sketch import LogHistogramSketch
+
+# Worker-side state: set once per process by a worker_pool initializer, or for the duration of a
+# serial worker_pool in this process. Tasks read it through worker_state().
+_worker_state: dict[str, object] = {}
+
+
+def worker_state() -> dict[str, object]:
+    return _worker_state
+
+
+def _set_worker_state(state: dict[str, object]) -> None:
+    global _worker_state
+    _worker_state = state
+
+
+class _SerialExecutor(Executor):
+    # runs each task in this process when it is submitted (for map, when its result is reached), with
+    # worker_state() set to the pool's state for the duration of the task only
+    def __init__(self, state: dict[str, object]) -> None:
+        self.state = state
+
+    def _call(self, fn: Callable, *args: object, **kwargs: object) -> object:
+        previous = _worker_state
+        _set_worker_state(self.state)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _set_worker_state(previous)
+
+    def submit(self, fn: Callable, /, *args: object, **kwargs: object) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(self._call(fn, *args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def map(self, fn: Callable, *iterables: Iterable, timeout: float | None = None, chunksize: int = 1) -> Iterator:
+        return (self._call(fn, *args) for args in zip(*iterables))
+
+
+@contextmanager
+def worker_pool(workers: int, state: dict[str, object]) -> Iterator[Executor]:
+    # Executor whose tasks see `state` as worker_state(): a process pool that ships it to each worker
+    # once, or for workers == 1 a serial executor, so pools nest (a batch run's simulations inside a
+    # batch worker). Pending tasks are cancelled on early exit.
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    if workers == 1:
+        yield _SerialExecutor(state)
+        return
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_set_worker_state, initargs=(state,))
+    try:
+        yield pool
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def chunk_plan(seed: int, n_paths: int, chunk_paths: int) -> list[tuple[np.random.SeedSequence, int]]:
+    # Chunk boundaries and seeds depend only on (seed, n_paths, chunk_paths), never on the worker count.
+    n_chunks = -(-n_paths // chunk_paths)
+    children = np.random.SeedSequence(seed).spawn(n_chunks)
+    sizes = [min(chunk_paths, n_paths - i * chunk_paths) for i in range(n_chunks)]
+    return list(zip(children, sizes))
+
+
+def _loss_state(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    weights: dict[str, float],
+    pd_annual: float,
+    keep_paths: bool,
+    keep_losses: bool,
+    sketch: LogHistogramSketch | None,
+) -> dict[str, object]:
+    return dict(
+        cfg=cfg,
+        panel=panel,
+        weights=weights,
+        pd_annual=pd_annual,
+        keep_paths=keep_paths,
+        keep_losses=keep_losses,
+        sketch=sketch,
+    )
+
+
+def _run_chunk(chunk: tuple[np.random.SeedSequence, int]) -> LossSimulationResult:
+    child, size = chunk
+    s = worker_state()
+    result = simulate_losses(s["cfg"], s["panel"], s["weights"], size, child, s["pd_annual"])
+    if s["sketch"] is not None:
+        result.loss_sketch = s["sketch"].empty_like().update(result.losses)
+    if not s["keep_paths"]:
+        result = result.without_paths()
+    if not s["keep_losses"]:
+        result.losses = np.empty(0)
+    return result
+
+
+def iter_loss_chunks(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    weights: dict[str, float],
+    plan: Iterable[tuple[np.random.SeedSequence, int]],
+    pd_annual: float,
+    workers: int = 1,
+    keep_paths: bool = True,
+    keep_losses: bool = True,
+    sketch: LogHistogramSketch | None = None,
+) -> Iterator[LossSimulationResult]:
+    # simulate_losses for each (seed, size) chunk of plan, yielded in plan order with at most `workers`
+    # chunks in flight; closing the iterator early cancels the chunks not yet started
+    state = _loss_state(cfg, panel, weights, pd_annual, keep_paths, keep_losses, sketch)
+    chunks = iter(plan)
+    with worker_pool(workers, state) as pool:
+        pending = deque(pool.submit(_run_chunk, chunk) for chunk in islice(chunks, workers))
+        while pending:
+            yield pending.popleft().result()
+            pending.extend(pool.submit(_run_chunk, chunk) for chunk in islice(chunks, 1))
+
+
+def run_loss_simulation(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    weights: dict[str, float],
+    n_paths: int,
+    seed: int,
+    pd_annual: float,
+    workers: int = 1,
+    chunk_paths: int | None = None,
+    keep_paths: bool = True,
+    keep_losses: bool = True,
+    sketch: LogHistogramSketch | None = None,
+) -> LossSimulationResult:
+    # sketch: empty template fed with every chunk's losses; with keep_losses=False it is the only loss output
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    if not keep_losses and sketch is None:
+        raise ValueError("keep_losses=False requires a sketch to collect the loss distribution")
+    if sketch is not None and cfg.simulation.importance_sampling.enabled:
+        raise ValueError("The loss sketch does not support importance-sampling weights")
+    plan = chunk_plan(seed, n_paths, chunk_paths or cfg.simulation.chunk_paths)
+    workers = min(workers, len(plan))
+    chunks = iter_loss_chunks(cfg, panel, weights, plan, pd_annual, workers, keep_paths, keep_losses, sketch)
+    return LossSimulationResult.concatenate(list(chunks))
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from guarantee_vehicle.capital.returns import break_even_fee_bps, compile_stack, returns_for_leverage
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.portfolio.book import TradeBook
+from guarantee_vehicle.simulation.book_engine import prepare_book, simulate_book_losses
+from guarantee_vehicle.simulation.loss_engine import LossSimulationResult, SpotPanel, simulate_scenario_losses
+from guarantee_vehicle.simulation.parallel import chunk_plan, worker_pool, worker_state
+
+
+def _tail_capital(
+    losses: np.ndarray, confidence: float, method: str, weights: np.ndarray | None = None
+) -> np.ndarray:
+    # var_or_es along the last axis for every grid point at once; weights (broadcastable to losses)
+    # give the same self-normalised estimators as RiskMetrics(losses, weights)
+    if weights is None:
+        var = np.quantile(losses, confidence, axis=-1)
+        if method == "VaR":
+            return var
+        in_tail = losses >= var[..., None]
+        return np.where(in_tail, losses, 0.0).sum(axis=-1) / np.maximum(in_tail.sum(axis=-1), 1)
+
+    weights = np.broadcast_to(weights, losses.shape)
+    order = np.argsort(losses, axis=-1, kind="stable")
+    sorted_losses = np.take_along_axis(losses, order, axis=-1)
+    w = np.take_along_axis(weights, order, axis=-1)
+    cdf = np.cumsum(w, axis=-1) / w.sum(axis=-1, keepdims=True)
+    idx = np.minimum((cdf < confidence).sum(axis=-1, keepdims=True), losses.shape[-1] - 1)
+    var = np.take_along_axis(sorted_losses, idx, axis=-1)[..., 0]
+    if method == "VaR":
+        return var
+    w_tail = np.where(losses >= var[..., None], weights, 0.0)
+    return np.divide((w_tail * losses).sum(axis=-1), w_tail.sum(axis=-1), out=var.copy(), where=w_tail.sum(axis=-1) > 0)
+
+
+@dataclass
+class _GridTails:
+    # Per-chunk (or merged) sufficient statistics of the scenario grid: path count, loss sums
+    # (likelihood-ratio weighted with importance sampling, so loss_sum / n is plain_estimate's mean)
+    # and, per flattened grid point, a multiset of
+    # losses (values, weights). Without importance sampling the weights are counts and the multiset holds
+    # every loss >= its smallest value and at least `keep` losses in all, enough for the quantile
+    # and the tail mean. With it the weights are likelihood ratios and only zero losses are pooled.
+    n: int
+    loss_sum: np.ndarray
+    tails: list[tuple[np.ndarray, np.ndarray]]
+
+
+def _pool_ties(values: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # values in descending order with equal values merged into one weighted entry
+    if not len(values):
+        return values, weights
+    order = np.argsort(-values, kind="stable")
+    values, weights = values[order], weights[order]
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    return values[starts], np.add.reduceat(weights, starts)
+
+
+def _top(values: np.ndarray, weights: np.ndarray, keep: int) -> tuple[np.ndarray, np.ndarray]:
+    # the entries holding the `keep` largest losses, with all ties of the smallest one
+    values, weights = _pool_ties(values, weights)
+    end = np.searchsorted(np.cumsum(weights), keep) + 1
+    return values[:end], weights[:end]
+
+
+def _chunk_tails(losses: np.ndarray, lr: np.ndarray | None, keep: int | None) -> _GridTails:
+    # losses (n_pd, n_cov, n); lr (n_pd, n) or None
+    n_pd, n_cov, n = losses.shape
+    flat = losses.reshape(n_pd * n_cov, n)
+    if lr is None:
+        tails = []
+        for x in flat:
+            if n > keep:
+                # partition first, so only the tail is sorted
+                x = x[x >= np.partition(x, n - keep)[n - keep]]
+            tails.append(_top(x, np.ones(len(x)), keep))
+        return _GridTails(n, losses.sum(axis=-1), tails)
+    tails = []
+    for x, w in zip(flat, np.repeat(lr, n_cov, axis=0)):
+        zero = x == 0
+        tails.append((np.r_[x[~zero], 0.0], np.r_[w[~zero], w[zero].sum()]))
+    return _GridTails(n, (losses * lr[:, None, :]).sum(axis=-1), tails)
+
+
+def _merge_tails(a: _GridTails, b: _GridTails, keep: int | None) -> _GridTails:
+    if keep is not None:
+        tails = [_top(np.r_[va, vb], np.r_[wa, wb], keep) for (va, wa), (vb, wb) in zip(a.tails, b.tails)]
+    else:
+        tails = [(np.r_[va, vb], np.r_[wa, wb]) for (va, wa), (vb, wb) in zip(a.tails, b.tails)]
+    return _GridTails(a.n + b.n, a.loss_sum + b.loss_sum, tails)
+
+
+def _lerp(a: float, b: float, t: float) -> float:
+    # numpy's quantile interpolation, so results match np.quantile bit for bit
+    diff = b - a
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+
+def _multiset_capital(values: np.ndarray, counts: np.ndarray, n: int, confidence: float, method: str) -> float:
+    # _tail_capital of n unweighted losses from the multiset holding their largest ones (descending)
+    h = (n - 1) * confidence
+    lo = int(np.floor(h))
+    cum = np.cumsum(counts)
+    # ascending positions lo and lo + 1 are descending positions n - 1 - lo and n - 2 - lo
+    x_lo = values[np.searchsorted(cum, n - 1 - lo, side="right")]
+    x_hi = values[np.searchsorted(cum, max(n - 2 - lo, 0), side="right")]
+    var = _lerp(x_lo, x_hi, h - lo)
+    if method == "VaR":
+        return var
+    in_tail = values >= var
+    return float((values[in_tail] * counts[in_tail]).sum() / max(counts[in_tail].sum(), 1))
+
+
+def _scenario_chunk(chunk: tuple[np.random.SeedSequence, int]) -> _GridTails:
+    child, size = chunk
+    s = worker_state()
+    if s["book"] is None:
+        losses, lr = simulate_scenario_losses(s["cfg"], s["panel"], s["weights"], size, child, s["pds"], s["covs"])
+    else:
+        book, valuation = s["book"], s["valuation"]
+        losses = simulate_book_losses(s["cfg"], s["panel"], book, size, child, s["pds"], s["covs"], valuation)
+        lr = None
+    return _chunk_tails(losses, lr, s["keep"])
+
+
+def scenario_tail_metrics(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    weights: dict[str, float],
+    n_paths: int,
+    seed: int,
+    pd_grid: list[float] | np.ndarray | None = None,
+    coverage_grid: list[float] | np.ndarray | None = None,
+    book: TradeBook | None = None,
+    workers: int = 1,
+    base: LossSimulationResult | None = None,
+    base_el: float | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # The simulated half of the scenario grid: (pds, coverages, EL amount, capital % notional), the last
+    # two of shape (n_pd, n_coverage). Independent of economics, capital_stack and the fee/leverage axes.
+    # With a trade book, each grid PD applies to every counterparty of the book. Chunks follow
+    # chunk_plan over `workers` processes and are reduced to _GridTails as they complete, so the full
+    # loss cube is never held. base: run_loss_simulation's result for the same seed and path count,
+    # reused for the (pd_scenarios_annual[1], guarantee.coverage_pct) point instead of re-simulated.
+    # base_el: the phase-2 EL estimate (e.g. with a control variate) for that point. EL is the mean of
+    # lr * loss with the raw likelihood ratios, as in plain_estimate, so it matches the reported EL.
+    pds = np.asarray(pd_grid if pd_grid is not None else cfg.credit.pd_scenarios_annual, dtype=float)
+    covs = np.asarray(
+        coverage_grid if coverage_grid is not None else cfg.sweep.coverage_pct or [cfg.guarantee.coverage_pct],
+        dtype=float,
+    )
+    notional = cfg.portfolio.notional_usd_total
+    target = cfg.capital_target
+    el_amount = np.empty((len(pds), len(covs)))
+    capital = np.empty((len(pds), len(covs)))
+
+    # same chunk seeds as run_loss_simulation, so the base grid point reproduces the phase-2 losses
+    base_pd = np.flatnonzero(pds == cfg.credit.pd_scenarios_annual[1])[:1]
+    base_cov = np.flatnonzero(covs == cfg.guarantee.coverage_pct)[:1]
+    if book is not None or base is None or len(base.losses) != n_paths or not (len(base_pd) and len(base_cov)):
+        base_pd = base_cov = np.empty(0, dtype=np.int64)
+    # the base PD row is only re-simulated for coverages other than the base one
+    sim_rows = np.arange(len(pds))
+    if np.all(covs == cfg.guarantee.coverage_pct):
+        sim_rows = np.setdiff1d(sim_rows, base_pd)
+
+    if len(sim_rows):
+        is_weighted = book is None and cfg.simulation.importance_sampling.enabled
+        keep = None if is_weighted else n_paths - int(np.floor((n_paths - 1) * target.confidence))
+        state = dict(
+            cfg=cfg,
+            panel=panel,
+            weights=weights,
+            book=book,
+            valuation=None if book is None else prepare_book(cfg, panel, book),
+            pds=pds[sim_rows],
+            covs=covs,
+            keep=keep,
+        )
+        plan = chunk_plan(seed, n_paths, cfg.simulation.chunk_paths)
+        total: _GridTails | None = None
+        with worker_pool(min(workers, len(plan)), state) as pool:
+            for part in pool.map(_scenario_chunk, plan):
+                total = part if total is None else _merge_tails(total, part, keep)
+        el_amount[sim_rows] = total.loss_sum / total.n
+        if keep is None:
+            capital[sim_rows] = np.reshape(
+                [_tail_capital(v, target.confidence, target.method, w) for v, w in total.tails], total.loss_sum.shape
+            )
+        else:
+            capital[sim_rows] = np.reshape(
+                [_multiset_capital(v, c, total.n, target.confidence, target.method) for v, c in total.tails],
+                total.loss_sum.shape,
+            )
+    if len(base_pd):
+        losses, lr = base.losses, base.likelihood_ratio
+        if base_el is not None:
+            el_amount[base_pd, base_cov] = base_el
+        else:
+            el_amount[base_pd, base_cov] = losses.mean() if lr is None else (losses * lr).mean()
+        capital[base_pd, base_cov] = _tail_capital(losses, target.confidence, target.method, lr)
+    capital_pct = capital / notional * (1 + target.addon_pct)
+    return pds, covs, el_amount, capital_pct
+
+
+def scenario_grid_table(
+    cfg: AppConfig,
+    pds: np.ndarray,
+    covs: np.ndarray,
+    el_amount: np.ndarray,
+    capital_pct: np.ndarray,
+    leverage_grid: list[float] | np.ndarray | None = None,
+    fee_grid_bps: list[float] | np.ndarray | None = None,
+    target_roe: float = 0.15,
+) -> pd.DataFrame:
+    # The economic half: returns over the fee x leverage axes for scenario_tail_metrics' output
+    sweep = cfg.sweep
+    levs = np.asarray(leverage_grid if leverage_grid is not None else sweep.leverage or np.arange(5, 31), dtype=float)
+    fees = np.asarray(
+        fee_grid_bps if fee_grid_bps is not None else sweep.client_fee_bps_pa or [cfg.economics.client_fee_bps_pa],
+        dtype=float,
+    )
+    notional = cfg.portfolio.notional_usd_total
+    max_leverage = np.divide(1.0, capital_pct, out=np.full_like(capital_pct, np.inf), where=capital_pct > 0)
+
+    # grid axes: (pd, coverage, fee, leverage)
+    el_rate = (el_amount / notional)[:, :, None, None]
+    lev_g = levs[None, None, None, :]
+    stack = compile_stack(cfg.capital_stack)
+    levered = returns_for_leverage(cfg, lev_g, el_rate, client_fee_bps=fees[None, None, :, None], stack=stack)
+    break_even_fee = break_even_fee_bps(target_roe, 1.0 / lev_g, levered["fixed_costs_rate"], 1.0)
+    el_bps = el_amount / notional * 10000.0
+
+    shape = (len(pds), len(covs), len(fees), len(levs))
+    ip, ic, i_f, il = (a.ravel() for a in np.indices(shape))
+    return pd.DataFrame(
+        {
+            "pd": pds[ip],
+            "coverage_pct": covs[ic],
+            "client_fee_bps": fees[i_f],
+            "leverage": levs[il],
+            "el_amount": el_amount[ip, ic],
+            "el_bps": el_bps[ip, ic],
+            "capital_pct": capital_pct[ip, ic],
+            "max_leverage": max_leverage[ip, ic],
+            "within_capital": levs[il] <= max_leverage[ip, ic],
+            "net_margin_bps": np.broadcast_to(levered["net_margin_bps"], shape).ravel(),
+            "equity_roe": np.broadcast_to(levered["equity_roe"], shape).ravel(),
+            f"break_even_fee_bps_for_{int(round(target_roe * 100))}pct_roe": np.broadcast_to(break_even_fee, shape).ravel(),
+        }
+    )
+
+
+def run_scenario_grid(
+    cfg: AppConfig,
+    panel: SpotPanel,
+    weights: dict[str, float],
+    n_paths: int,
+    seed: int,
+    pd_grid: list[float] | np.ndarray | None = None,
+    leverage_grid: list[float] | np.ndarray | None = None,
+    fee_grid_bps: list[float] | np.ndarray | None = None,
+    coverage_grid: list[float] | np.ndarray | None = None,
+    target_roe: float = 0.15,
+    workers: int = 1,
+) -> pd.DataFrame:
+    pds, covs, el_amount, capital_pct = scenario_tail_metrics(
+        cfg, panel, weights, n_paths, seed, pd_grid, coverage_grid, workers=workers
+    )
+    return scenario_grid_table(cfg, pds, covs, el_amount, capital_pct, leverage_grid, fee_grid_bps, target_roe)
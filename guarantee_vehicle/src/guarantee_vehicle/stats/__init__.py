@@ -0,0 +1,24 @@
+from guarantee_vehicle.stats.risk_metrics import RiskMetrics, effective_sample_size
+from guarantee_vehicle.stats.sketch import LogHistogramSketch
+from guarantee_vehicle.stats.variance_reduction import (
+    MeanEstimate,
+    antithetic_estimate,
+    antithetic_normals,
+    antithetic_uniforms,
+    control_variate_estimate,
+    pair_means,
+    plain_estimate,
+)
+
+__all__ = [
+    "LogHistogramSketch",
+    "MeanEstimate",
+    "RiskMetrics",
+    "antithetic_estimate",
+    "antithetic_normals",
+    "antithetic_uniforms",
+    "control_variate_estimate",
+    "effective_sample_size",
+    "pair_means",
+    "plain_estimate",
+]
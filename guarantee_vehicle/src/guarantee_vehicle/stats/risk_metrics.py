@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def effective_sample_size(weights: np.ndarray) -> float:
+    # Kish effective sample size of importance weights; equals len(weights) when they are all equal
+    w = np.asarray(weights, dtype=float)
+    return float(w.sum() ** 2 / np.square(w).sum())
+
+
+class RiskMetrics:
+    # Sorts a sample once; quantile/VaR are O(1), ES and exceedance probabilities O(log n).
+    # Optional importance weights (likelihood ratios) give self-normalised weighted estimators.
+    def __init__(self, samples: np.ndarray, weights: np.ndarray | None = None) -> None:
+        samples = np.asarray(samples, dtype=float)
+        self.n = len(samples)
+        if self.n == 0:
+            raise ValueError("RiskMetrics needs at least one sample")
+        if weights is None:
+            self.weights = None
+            self.effective_sample_size = float(self.n)
+            self.mean = float(samples.mean())
+            self.p_positive = float((samples > 0).mean())
+            self.sorted = np.sort(samples)
+            # tail_sums[i] = sum(sorted[i:])
+            self._tail_sums = np.concatenate([np.cumsum(self.sorted[::-1])[::-1], [0.0]])
+        else:
+            weights = np.asarray(weights, dtype=float)
+            if weights.shape != samples.shape or np.any(weights < 0) or not weights.sum() > 0:
+                raise ValueError("weights must be non-negative, match the samples and not all be zero")
+            self.effective_sample_size = effective_sample_size(weights)
+            order = np.argsort(samples, kind="stable")
+            self.sorted = samples[order]
+            self.weights = weights[order] / weights.sum()
+            self.weights.flags.writeable = False
+            self.mean = float(self.weights @ self.sorted)
+            self.p_positive = float(self.weights[self.sorted > 0].sum())
+            self._cdf = np.cumsum(self.weights)
+            # tail_weights[i] = sum(weights[i:]), tail_sums[i] = sum(weights[i:] * sorted[i:])
+            self._tail_weights = np.concatenate([np.cumsum(self.weights[::-1])[::-1], [0.0]])
+            self._tail_sums = np.concatenate([np.cumsum((self.weights * self.sorted)[::-1])[::-1], [0.0]])
+        self.sorted.flags.writeable = False
+
+    def __len__(self) -> int:
+        return self.n
+
+    def quantile(self, q: float | np.ndarray) -> float | np.ndarray:
+        # unweighted: matches np.quantile(samples, q) (method="linear") bit for bit; weighted: the
+        # smallest sample whose weighted CDF reaches q
+        q = np.asarray(q, dtype=float)
+        if self.weights is not None:
+            idx = np.minimum(np.searchsorted(self._cdf, q, side="left"), self.n - 1)
+            out = self.sorted[idx]
+            return float(out) if out.ndim == 0 else out
+        virtual = (self.n - 1) * q
+        lo = np.clip(np.floor(virtual), 0, self.n - 1).astype(np.int64)
+        hi = np.minimum(lo + 1, self.n - 1)
+        gamma = virtual - np.floor(virtual)
+        a = self.sorted[lo]
+        b = self.sorted[hi]
+        diff = b - a
+        out = np.where(gamma >= 0.5, b - diff * (1 - gamma), a + diff * gamma)
+        return float(out) if out.ndim == 0 else out
+
+    def var(self, confidence: float) -> float:
+        return float(self.quantile(confidence))
+
+    def tail_mean(self, threshold: float) -> float:
+        i = int(np.searchsorted(self.sorted, threshold, side="left"))
+        if i >= self.n:
+            return threshold
+        if self.weights is not None:
+            return float(self._tail_sums[i] / self._tail_weights[i]) if self._tail_weights[i] > 0 else threshold
+        return float(self._tail_sums[i] / (self.n - i))
+
+    def es(self, confidence: float) -> float:
+        return self.tail_mean(self.var(confidence))
+
+    def var_or_es(self, confidence: float, method: str) -> float:
+        return self.var(confidence) if method == "VaR" else self.es(confidence)
+
+    def exceedance_probability(self, x: float | np.ndarray) -> float | np.ndarray:
+        i = np.searchsorted(self.sorted, x, side="right")
+        p = self._tail_weights[i] if self.weights is not None else (self.n - i) / self.n
+        return float(p) if np.ndim(p) == 0 else p
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+@dataclass
+class LogHistogramSketch:
+    # Mergeable quantile sketch for non-negative samples: values in [min_value, max_value] land in
+    # log-spaced bins of ratio (1 + a) / (1 - a), a = relative_accuracy, so quantiles are within
+    # a * q + min_value of the exact ones. Values below min_value count as zeros. Count, mean, variance,
+    # min, max and the share of positive samples are exact; memory is fixed by the bin grid.
+
+    relative_accuracy: float = 0.005
+    min_value: float = 1e-9
+    max_value: float = 1e15
+    counts: np.ndarray = field(init=False, repr=False)
+    zero_count: int = field(default=0, init=False)
+    count: int = field(default=0, init=False)
+    total: float = field(default=0.0, init=False)
+    total_sq: float = field(default=0.0, init=False)
+    n_positive: int = field(default=0, init=False)
+    min: float = field(default=np.inf, init=False)
+    max: float = field(default=-np.inf, init=False)
+
+    def __post_init__(self) -> None:
+        if not 0 < self.relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be in (0, 1), got {self.relative_accuracy}")
+        if not 0 < self.min_value < self.max_value:
+            raise ValueError("LogHistogramSketch requires 0 < min_value < max_value")
+        self._log_gamma = float(np.log1p(self.relative_accuracy) - np.log1p(-self.relative_accuracy))
+        n_bins = int(np.ceil(np.log(self.max_value / self.min_value) / self._log_gamma)) + 1
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+
+    @classmethod
+    def from_samples(cls, samples: np.ndarray | Iterable[np.ndarray], **kwargs: float) -> "LogHistogramSketch":
+        sketch = cls(**kwargs)
+        chunks = [samples] if isinstance(samples, np.ndarray) else samples
+        for chunk in chunks:
+            sketch.update(chunk)
+        return sketch
+
+    def empty_like(self) -> "LogHistogramSketch":
+        return LogHistogramSketch(self.relative_accuracy, self.min_value, self.max_value)
+
+    def update(self, values: np.ndarray) -> "LogHistogramSketch":
+        v = np.asarray(values, dtype=float).ravel()
+        if v.size == 0:
+            return self
+        if np.isnan(v).any() or (v < 0).any():
+            raise ValueError("LogHistogramSketch only accepts non-negative, non-NaN samples")
+        small = v < self.min_value
+        big = v[~small]
+        if big.size:
+            idx = np.ceil(np.log(big / self.min_value) / self._log_gamma).astype(np.int64)
+            np.minimum(idx, len(self.counts) - 1, out=idx)
+            self.counts += np.bincount(idx, minlength=len(self.counts))
+        self.zero_count += int(small.sum())
+        self.count += v.size
+        self.total += float(v.sum())
+        self.total_sq += float(v @ v)
+        self.n_positive += int((v > 0).sum())
+        self.min = min(self.min, float(v.min()))
+        self.max = max(self.max, float(v.max()))
+        return self
+
+    def merge(self, other: "LogHistogramSketch") -> "LogHistogramSketch":
+        if (self.relative_accuracy, self.min_value, self.max_value) != (
+            other.relative_accuracy,
+            other.min_value,
+            other.max_value,
+        ):
+            raise ValueError("Cannot merge sketches with different bin grids")
+        self.counts += other.counts
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.n_positive += other.n_positive
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def n(self) -> int:
+        return self.count
+
+    @property
+    def effective_sample_size(self) -> float:
+        # unweighted samples, as RiskMetrics without importance weights
+        return float(self.count)
+
+    @property
+    def variance(self) -> float:
+        # sample variance (ddof=1), for the standard error of the mean
+        if self.count < 2:
+            return 0.0
+        return max(self.total_sq - self.total * self.mean, 0.0) / (self.count - 1)
+
+    @property
+    def p_positive(self) -> float:
+        return self.n_positive / self.count if self.count else 0.0
+
+    def _bin_values(self) -> np.ndarray:
+        gamma = np.exp(self._log_gamma)
+        upper = self.min_value * np.exp(self._log_gamma * np.arange(len(self.counts)))
+        return np.clip(upper * 2.0 / (gamma + 1.0), self.min, self.max)
+
+    def _value_at_rank(self, rank: np.ndarray) -> np.ndarray:
+        cum = self.zero_count + np.cumsum(self.counts)
+        idx = np.minimum(np.searchsorted(cum, rank, side="right"), len(self.counts) - 1)
+        return np.where(rank < self.zero_count, 0.0, self._bin_values()[idx])
+
+    def quantile(self, q: float | np.ndarray) -> float | np.ndarray:
+        if self.count == 0:
+            raise ValueError("Cannot take a quantile of an empty sketch")
+        # same linear interpolation between order statistics as np.quantile's default
+        pos = np.asarray(q, dtype=float) * (self.count - 1)
+        lo = np.floor(pos)
+        frac = pos - lo
+        a = self._value_at_rank(lo)
+        b = self._value_at_rank(np.minimum(lo + 1, self.count - 1))
+        out = a + (b - a) * frac
+        return float(out) if out.ndim == 0 else out
+
+    def tail_mean(self, threshold: float) -> float:
+        # approximate mean of samples >= threshold, at bin resolution
+        values = self._bin_values()
+        in_tail = values >= threshold * (1 - self.relative_accuracy)
+        n = int(self.counts[in_tail].sum()) + (self.zero_count if threshold <= 0 else 0)
+        if n == 0:
+            return threshold
+        return float((self.counts[in_tail] * values[in_tail]).sum() / n)
+
+    def var(self, confidence: float) -> float:
+        return float(self.quantile(confidence))
+
+    def es(self, confidence: float) -> float:
+        return self.tail_mean(self.var(confidence))
+
+    def var_or_es(self, confidence: float, method: str) -> float:
+        return self.var(confidence) if method == "VaR" else self.es(confidence)
+
+    def exceedance_curve(self) -> tuple[np.ndarray, np.ndarray]:
+        # (value, share of samples above it) at each occupied bin, zeros first
+        occupied = self.counts > 0
+        values = np.concatenate([[0.0], self._bin_values()[occupied]])
+        below = np.cumsum(np.concatenate([[self.zero_count], self.counts[occupied]]))
+        return values, 1 - below / max(self.count, 1)
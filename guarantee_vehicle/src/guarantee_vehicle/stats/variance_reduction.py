@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+# Antithetic samples are interleaved along the first axis: rows 2j and 2j + 1 are mirror images, so a
+# block of even length keeps its pairs whatever block it is cut from. An odd trailing row is unpaired.
+
+
+def antithetic_uniforms(rng: np.random.Generator, shape: int | tuple[int, ...]) -> np.ndarray:
+    shape = (shape,) if isinstance(shape, int) else tuple(shape)
+    n = shape[0]
+    half = rng.random((-(-n // 2), *shape[1:]))
+    u = np.empty(shape)
+    u[0::2] = half
+    u[1::2] = 1.0 - half[: n // 2]
+    return u
+
+
+def antithetic_normals(
+    rng: np.random.Generator, shape: int | tuple[int, ...], out: np.ndarray | None = None
+) -> np.ndarray:
+    shape = (shape,) if isinstance(shape, int) else tuple(shape)
+    n = shape[0]
+    z = np.empty(shape) if out is None else out
+    half = rng.standard_normal((-(-n // 2), *shape[1:]), dtype=z.dtype)
+    z[0::2] = half
+    np.negative(half[: n // 2], out=z[1::2])
+    return z
+
+
+@dataclass(frozen=True)
+class MeanEstimate:
+    # variance_reduction: variance of the plain estimator over that of this one, at the same path count
+    mean: float
+    std_error: float
+    n_paths: int
+    variance_reduction: float = 1.0
+    beta: float | None = None
+
+    def confidence_interval(self, z: float = 1.96) -> tuple[float, float]:
+        return self.mean - z * self.std_error, self.mean + z * self.std_error
+
+
+def _weighted(y: np.ndarray, weights: np.ndarray | None) -> np.ndarray:
+    # importance-sampling estimators average lr * y with the raw likelihood ratios (E[lr] = 1)
+    y = np.asarray(y, dtype=float)
+    return y if weights is None else y * np.asarray(weights, dtype=float)
+
+
+def pair_means(y: np.ndarray) -> np.ndarray:
+    # means of interleaved antithetic pairs (rows 2j, 2j + 1); an odd last row is kept as is
+    n = len(y) // 2 * 2
+    pairs = 0.5 * (y[0:n:2] + y[1:n:2])
+    return pairs if n == len(y) else np.append(pairs, y[-1])
+
+
+def plain_estimate(y: np.ndarray, weights: np.ndarray | None = None) -> MeanEstimate:
+    y = _weighted(y, weights)
+    return MeanEstimate(mean=float(y.mean()), std_error=float(y.std(ddof=1) / np.sqrt(len(y))), n_paths=len(y))
+
+
+def antithetic_estimate(y: np.ndarray, weights: np.ndarray | None = None) -> MeanEstimate:
+    # y from interleaved antithetic draws; pair means are the independent replicates
+    y = _weighted(y, weights)
+    pairs = pair_means(y)
+    var_plain = y.var(ddof=1) / len(y)
+    var_pairs = pairs.var(ddof=1) / len(pairs)
+    return MeanEstimate(
+        mean=float(y.mean()),
+        std_error=float(np.sqrt(var_pairs)),
+        n_paths=len(y),
+        variance_reduction=float(var_plain / var_pairs) if var_pairs > 0 else np.inf,
+    )
+
+
+def control_variate_estimate(
+    y: np.ndarray,
+    control: np.ndarray,
+    control_mean: float,
+    weights: np.ndarray | None = None,
+    antithetic: bool = False,
+) -> MeanEstimate:
+    # y - beta (control - E[control]) with the variance-minimising beta, fitted on the replicates
+    # (antithetic pair means when antithetic=True). variance_reduction is against plain Monte Carlo.
+    y = _weighted(y, weights)
+    control = _weighted(control, weights)
+    rep_y = pair_means(y) if antithetic else y
+    rep_c = pair_means(control) if antithetic else control
+    var_c = rep_c.var(ddof=1)
+    beta = float(np.cov(rep_y, rep_c, ddof=1)[0, 1] / var_c) if var_c > 0 else 0.0
+    adjusted = rep_y - beta * (rep_c - control_mean)
+    var_adj = adjusted.var(ddof=1) / len(adjusted)
+    var_plain = y.var(ddof=1) / len(y)
+    return MeanEstimate(
+        mean=float(adjusted.mean()),
+        std_error=float(np.sqrt(var_adj)),
+        n_paths=len(y),
+        variance_reduction=float(var_plain / var_adj) if var_adj > 0 else np.inf,
+        beta=beta,
+    )
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.market.rates import build_rate_curves
+from guarantee_vehicle.simulation.loss_engine import SpotPanel, build_spot_panel
+
+EXAMPLE_CONFIG = Path(__file__).resolve().parents[1] / "examples" / "config_example.yaml"
+
+
+def example_config(**simulation: object) -> AppConfig:
+    # the example config with its rates sheet disabled (flat fallback curves) and simulation overrides
+    raw = yaml.safe_load(EXAMPLE_CONFIG.read_text())
+    raw["data"]["rates"]["enabled"] = False
+    raw["simulation"].update(simulation)
+    return AppConfig.model_validate(raw)
+
+
+def synthetic_fx(currencies: list[str], n_months: int = 180, seed: int = 0) -> pd.DataFrame:
+    # monthly GBM spot histories, one column per currency, with a few leading gaps
+    rng = np.random.default_rng(seed)
+    log_ret = rng.normal(0.004, 0.03, (n_months, len(currencies)))
+    values = 100.0 * np.exp(np.cumsum(log_ret, axis=0))
+    for i in range(len(currencies)):
+        values[: 3 * i, i] = np.nan
+    return pd.DataFrame(values, index=pd.date_range("2005-01-01", periods=n_months, freq="MS"), columns=currencies)
+
+
+def equal_weights(cfg: AppConfig) -> dict[str, float]:
+    return {c: 1 / len(cfg.universe.currencies) for c in cfg.universe.currencies}
+
+
+@pytest.fixture(scope="session")
+def cfg() -> AppConfig:
+    return example_config(n_paths=4_000, chunk_paths=1_000)
+
+
+@pytest.fixture(scope="session")
+def panel(cfg: AppConfig) -> SpotPanel:
+    curves = build_rate_curves({}, cfg.data.rates)
+    return build_spot_panel(synthetic_fx(cfg.universe.currencies), cfg.universe.currencies, curves)
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from conftest import equal_weights
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.simulation.adaptive import run_adaptive_loss_simulation
+from guarantee_vehicle.simulation.loss_engine import SpotPanel
+from guarantee_vehicle.simulation.parallel import run_loss_simulation
+from guarantee_vehicle.stats.risk_metrics import RiskMetrics
+from guarantee_vehicle.stats.variance_reduction import antithetic_estimate, plain_estimate
+
+PD, CHUNK = 0.04, 500
+LOOSE = {"el_rel_tol": 0.5, "capital_rel_tol": 0.5}
+TIGHT = {"el_rel_tol": 1e-6, "capital_rel_tol": 1e-6}
+
+
+def with_convergence(cfg: AppConfig, antithetic: bool = False, **convergence: float) -> AppConfig:
+    settings = {"enabled": True, "min_paths": CHUNK, "min_batches": 2, "max_paths": 20_000, **convergence}
+    simulation = cfg.simulation.model_copy(
+        update={
+            "chunk_paths": CHUNK,
+            "antithetic": antithetic,
+            "convergence": cfg.simulation.convergence.model_copy(update=settings),
+        }
+    )
+    return cfg.model_copy(update={"simulation": simulation})
+
+
+def run(cfg: AppConfig, panel: SpotPanel, workers: int = 1, **kwargs):
+    return run_adaptive_loss_simulation(cfg, panel, equal_weights(cfg), cfg.run.seed, PD, workers=workers, **kwargs)
+
+
+@pytest.mark.parametrize("min_paths, min_batches, batches", [(3_000, 2, 6), (1_000, 8, 8)])
+def test_converged_run_respects_the_minimums(
+    cfg: AppConfig, panel: SpotPanel, min_paths: int, min_batches: int, batches: int
+) -> None:
+    sim, conv = run(with_convergence(cfg, min_paths=min_paths, min_batches=min_batches, **LOOSE), panel)
+    assert conv.stop_reason == "converged"
+    assert (conv.n_batches, conv.n_paths) == (batches, batches * CHUNK)
+    # the batches are the first chunks of the fixed-count run with the same seed
+    fixed = run_loss_simulation(cfg, panel, equal_weights(cfg), conv.n_paths, cfg.run.seed, PD, chunk_paths=CHUNK)
+    np.testing.assert_array_equal(sim.losses, fixed.losses)
+
+
+def test_path_budget_stops_an_unconverged_run(cfg: AppConfig, panel: SpotPanel) -> None:
+    sim, conv = run(with_convergence(cfg, max_paths=2_500, **TIGHT), panel)
+    assert (conv.stop_reason, conv.n_paths, conv.n_batches) == ("path_budget", 2_500, 5)
+    assert len(sim.losses) == 2_500
+
+
+def test_time_budget_stops_after_the_first_batch(cfg: AppConfig, panel: SpotPanel) -> None:
+    _, conv = run(with_convergence(cfg, max_seconds=1e-9, **TIGHT), panel)
+    assert (conv.stop_reason, conv.n_batches, conv.n_paths) == ("time_budget", 1, CHUNK)
+
+
+@pytest.mark.parametrize("antithetic", [False, True])
+def test_reported_precision_matches_the_kept_losses(cfg: AppConfig, panel: SpotPanel, antithetic: bool) -> None:
+    adaptive_cfg = with_convergence(cfg, antithetic, max_paths=4_000, **TIGHT)
+    sim, conv = run(adaptive_cfg, panel)
+    el = (antithetic_estimate if antithetic else plain_estimate)(sim.losses)
+    assert conv.el == pytest.approx(el.mean, rel=1e-12)
+    assert conv.el_rel_se == pytest.approx(el.std_error / el.mean, rel=1e-9)
+    # batch means: the spread of the per-batch capital over sqrt(batches)
+    target = cfg.capital_target
+    batch_capital = [
+        RiskMetrics(batch).var_or_es(target.confidence, target.method) for batch in np.split(sim.losses, conv.n_batches)
+    ]
+    capital_se = np.std(batch_capital, ddof=1) / np.sqrt(conv.n_batches)
+    assert conv.capital_rel_se == pytest.approx(capital_se / np.mean(batch_capital), rel=1e-9)
+    assert conv.capital == pytest.approx(RiskMetrics(sim.losses).var_or_es(target.confidence, target.method))
+
+
+def test_worker_count_does_not_change_the_stop(cfg: AppConfig, panel: SpotPanel) -> None:
+    adaptive_cfg = with_convergence(cfg, min_paths=2_000, el_rel_tol=0.015, capital_rel_tol=0.3)
+    serial, serial_conv = run(adaptive_cfg, panel)
+    pooled, pooled_conv = run(adaptive_cfg, panel, workers=2)
+    # stops on the EL tolerance, past min_paths
+    assert serial_conv.stop_reason == "converged" and serial_conv.n_paths > 2_000
+    np.testing.assert_array_equal(pooled.losses, serial.losses)
+    assert (pooled_conv.stop_reason, pooled_conv.n_paths, pooled_conv.el_rel_se) == (
+        serial_conv.stop_reason,
+        serial_conv.n_paths,
+        serial_conv.el_rel_se,
+    )
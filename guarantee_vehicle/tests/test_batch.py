@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import yaml
+
+from benchmarks.synthetic_workbook import synthetic_config, write_synthetic_workbook
+from guarantee_vehicle.batch import load_batch_runs, run_batch
+
+
+def test_batch_reports_invalid_overrides_next_to_the_runs(tmp_path: Path) -> None:
+    cfg = synthetic_config(3, n_paths=2_000)
+    excel = write_synthetic_workbook(tmp_path / "book.xlsx", cfg, 120)
+    base = tmp_path / "base.yaml"
+    base.write_text(yaml.safe_dump(cfg.model_dump(mode="json")))
+    overrides = tmp_path / "overrides"
+    overrides.mkdir()
+    (overrides / "a_base.yaml").write_text("{}")
+    (overrides / "b_fee.yaml").write_text(yaml.safe_dump({"economics": {"client_fee_bps_pa": 400.0}}))
+    (overrides / "c_bad.yaml").write_text(yaml.safe_dump({"simulation": {"fx_model": "nonsense"}}))
+
+    runs = load_batch_runs([str(overrides)], base=base)
+    table = run_batch(runs, excel, tmp_path / "out", charts=False, output_format="json")
+
+    assert table["run"].tolist() == ["a_base", "b_fee", "c_bad"]
+    assert table["status"].tolist() == ["ok", "ok", "error"]
+    assert table.loc[2, "error"].startswith("ValidationError: simulation.fx_model:")
+    ok = table.iloc[:2]
+    # the fee only moves the returns; EL and capital come from the same paths
+    assert ok["el_bps"].nunique() == 1 and ok["simulated_capital_pct"].nunique() == 1
+    assert ok.loc[1, "equity_roe"] > ok.loc[0, "equity_roe"]
+    assert (ok["paths"] == 2_000).all()
+    for run in ("a_base", "b_fee"):
+        assert (tmp_path / "out" / run / "report.json").exists()
+    assert (tmp_path / "out" / "comparison.csv").exists()
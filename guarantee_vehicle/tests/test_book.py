@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from guarantee_vehicle.config import ConcentrationLimitsConfig
+from guarantee_vehicle.portfolio import TradeBook
+
+LIMITS = ConcentrationLimitsConfig(max_currency_weight=0.6, max_single_counterparty_weight=0.5)
+
+
+def book(notionals: list[float]) -> TradeBook:
+    # one NDF per counterparty, alternating KES / INR
+    return TradeBook.from_frame(
+        pd.DataFrame(
+            {
+                "counterparty": [f"CP{i}" for i in range(len(notionals))],
+                "currency": ["KES", "INR"] * (len(notionals) // 2) + ["KES"] * (len(notionals) % 2),
+                "instrument": "NDF",
+                "notional_usd": notionals,
+                "tenor_years": 1.0,
+                "pd_annual": 0.02,
+            }
+        ),
+        ["KES", "INR"],
+    )
+
+
+def test_concentration_within_limits_passes() -> None:
+    checks = book([1.0, 1.0, 1.0, 1.0]).concentration_checks(LIMITS)
+    assert checks == [
+        "Largest counterparty weight 25.00% (CP0) within 50.00% limit",
+        "Largest currency weight 50.00% (KES) within 60.00% limit",
+    ]
+
+
+def test_concentration_breach_fails_validation() -> None:
+    with pytest.raises(ValueError, match=r"counterparty CP0 at 70\.00% .*currency KES at 80\.00%"):
+        book([7.0, 2.0, 1.0]).concentration_checks(LIMITS)
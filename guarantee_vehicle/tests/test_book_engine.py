@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from conftest import equal_weights
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.guarantee.payout import payout_default_only_array
+from guarantee_vehicle.instruments import CCSParams, NDFParams, mtm_ccs_lender_discounted, mtm_ndf_lender_discounted
+from guarantee_vehicle.pipeline import apply_trade_book
+from guarantee_vehicle.portfolio import INSTRUMENTS, TradeBook
+from guarantee_vehicle.simulation.book_engine import _default_losses, prepare_book, run_book_simulation
+from guarantee_vehicle.simulation.loss_engine import PERIODS_PER_YEAR, SpotPanel
+from guarantee_vehicle.simulation.parallel import run_loss_simulation
+from guarantee_vehicle.stats.variance_reduction import plain_estimate
+
+
+def currency_book(cfg: AppConfig, pd_annual: float) -> TradeBook:
+    # the currency engine's portfolio as a book: one counterparty per currency holding its CCS / NDF mix
+    weights = equal_weights(cfg)
+    rows = [
+        {
+            "counterparty": f"CP_{ccy}",
+            "currency": ccy,
+            "instrument": inst,
+            "notional_usd": cfg.portfolio.notional_usd_total * weights[ccy] * getattr(cfg.portfolio.mix, inst),
+            "tenor_years": cfg.portfolio.tenor_years,
+            "pd_annual": pd_annual,
+        }
+        for ccy in cfg.universe.currencies
+        for inst in INSTRUMENTS
+    ]
+    return TradeBook.from_frame(pd.DataFrame(rows), cfg.universe.currencies)
+
+
+def random_book(cfg: AppConfig, n_trades: int, n_counterparties: int, seed: int) -> TradeBook:
+    rng = np.random.default_rng(seed)
+    currencies = np.array(cfg.universe.currencies[:3])
+    df = pd.DataFrame(
+        {
+            "counterparty": rng.integers(0, n_counterparties, n_trades).astype(str),
+            "currency": rng.choice(currencies, n_trades),
+            "instrument": rng.choice(INSTRUMENTS, n_trades),
+            "notional_usd": rng.uniform(1e5, 1e6, n_trades),
+            "strike": np.nan,
+            "tenor_years": rng.integers(1, cfg.portfolio.tenor_years + 1, n_trades),
+            "pd_annual": 0.03,
+        }
+    )
+    return TradeBook.from_frame(df, cfg.universe.currencies)
+
+
+def brute_force_losses(
+    cfg: AppConfig, panel: SpotPanel, book: TradeBook, default_time: np.ndarray, s0: np.ndarray, spots: np.ndarray
+) -> np.ndarray:
+    # trade by trade with the instrument pricers, netted per counterparty, on the flat fallback curves
+    curves, losses = panel.curves, np.zeros(len(default_time))
+    for p, o in zip(*np.nonzero(np.isfinite(default_time))):
+        t = default_time[p, o]
+        netted = 0.0
+        for i in range(book.obligor_offsets[o], book.obligor_offsets[o + 1]):
+            ccy = book.currencies[book.currency[i]]
+            c, tau, n = panel.currencies.index(ccy), book.tenor_years[i], book.notional[i]
+            usd, lcy = curves.usd, curves.for_currency(ccy)
+            usd_df = usd.discount_factor(tau) / usd.discount_factor(t)
+            lcy_df = lcy.discount_factor(tau) / lcy.discount_factor(t)
+            spot, rem = spots[p, c, int(round(t * PERIODS_PER_YEAR))], tau - t
+            if INSTRUMENTS[book.instrument[i]] == "CCS":
+                params = CCSParams(n, s0[p, c], float(usd.zero_rate(tau)), float(lcy.zero_rate(tau)), tau)
+                netted += float(mtm_ccs_lender_discounted(params, spot, rem, usd_df, lcy_df))
+            else:
+                netted += float(mtm_ndf_lender_discounted(NDFParams(n, s0[p, c], tau), spot, rem, usd_df, lcy_df))
+        guarantee = cfg.guarantee
+        losses[p] += float(
+            payout_default_only_array(
+                netted,
+                guarantee.coverage_pct,
+                guarantee.attachment_pct_notional,
+                guarantee.detachment_pct_notional,
+                book.obligor_notional[o],
+            )
+        )
+    return losses
+
+
+def test_grouped_valuation_matches_trade_by_trade(cfg: AppConfig, panel: SpotPanel) -> None:
+    book = random_book(cfg, n_trades=300, n_counterparties=40, seed=0)
+    cfg = apply_trade_book(cfg, book)
+    rng = np.random.default_rng(1)
+    n_paths, n_steps = 50, cfg.portfolio.tenor_years * PERIODS_PER_YEAR
+    # default times on the monthly schedule, so the discount grid is exact; about half the obligors default
+    months = rng.integers(1, n_steps + 1, (n_paths, book.n_obligors))
+    default_time = np.where(rng.random(months.shape) < 0.5, months / PERIODS_PER_YEAR, np.inf)
+    s0 = rng.uniform(50, 150, (n_paths, len(panel.currencies)))
+    spots = s0[:, :, None] * np.exp(rng.normal(0, 0.2, (n_paths, len(panel.currencies), n_steps + 1)))
+    losses = _default_losses(
+        cfg,
+        book,
+        prepare_book(cfg, panel, book),
+        panel,
+        default_time,
+        s0,
+        lambda p, c, step: spots[p, c, step],
+        np.array([cfg.guarantee.coverage_pct]),
+    )[0]
+    np.testing.assert_allclose(losses, brute_force_losses(cfg, panel, book, default_time, s0, spots), rtol=1e-9)
+    assert (losses > 0).sum() > n_paths // 2
+
+
+def test_book_engine_matches_the_currency_engine(cfg: AppConfig, panel: SpotPanel) -> None:
+    # independent streams, so the two EL estimates agree within their standard errors
+    pd_annual, n_paths = 0.04, 20_000
+    book = currency_book(cfg, pd_annual)
+    book_cfg = apply_trade_book(cfg, book)
+    book_el = plain_estimate(run_book_simulation(book_cfg, panel, book, n_paths, cfg.run.seed)[0, 0])
+    ccy_el = plain_estimate(
+        run_loss_simulation(cfg, panel, equal_weights(cfg), n_paths, cfg.run.seed + 1, pd_annual).losses
+    )
+    assert abs(book_el.mean - ccy_el.mean) < 4 * np.hypot(book_el.std_error, ccy_el.std_error)
+    assert book_el.std_error < 0.05 * book_el.mean
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_workbook import synthetic_config, write_synthetic_workbook
+from guarantee_vehicle.io import load_data, load_data_cached
+from guarantee_vehicle.io.cache import DataCache, data_cache_key, evict_lru
+
+
+def assert_same_data(cached, loaded) -> None:
+    pd.testing.assert_frame_equal(cached.fx, loaded.fx)
+    assert cached.fx.index.freq == loaded.fx.index.freq
+    assert list(cached.rates) == list(loaded.rates)
+    for ccy, series in loaded.rates.items():
+        pd.testing.assert_series_equal(cached.rates[ccy], series)
+
+
+@pytest.mark.parametrize("freq, n_periods", [("MS", 180), ("B", 700)])
+def test_cached_data_roundtrips(tmp_path: Path, freq: str, n_periods: int) -> None:
+    cfg = synthetic_config(3)
+    path = write_synthetic_workbook(tmp_path / "book.xlsx", cfg, n_periods, freq=freq)
+    cache = DataCache(tmp_path / "cache")
+    loaded = load_data(path, cfg)
+    assert_same_data(load_data_cached(path, cfg, cache), loaded)
+    entry = cache.directory / f"{data_cache_key(path, cfg)}.npz"
+    assert entry.exists()
+    assert_same_data(cache.get(entry.stem), loaded)
+    assert_same_data(load_data_cached(path, cfg, cache), loaded)
+
+
+def test_key_follows_the_workbook_bytes_and_the_data_config(tmp_path: Path) -> None:
+    cfg = synthetic_config(3)
+    path = write_synthetic_workbook(tmp_path / "book.xlsx", cfg, 60)
+    key = data_cache_key(path, cfg)
+    with open(path, "rb") as f:
+        assert data_cache_key(f, cfg) == key
+    assert data_cache_key(path, synthetic_config(2)) != key
+    write_synthetic_workbook(path, cfg, 60, seed=1)
+    assert data_cache_key(path, cfg) != key
+
+
+@pytest.mark.parametrize("corrupt", [b"not an npz", "truncated"])
+def test_corrupt_entry_is_dropped(tmp_path: Path, corrupt: bytes | str) -> None:
+    cfg = synthetic_config(2)
+    path = write_synthetic_workbook(tmp_path / "book.xlsx", cfg, 60)
+    cache = DataCache(tmp_path / "cache")
+    loaded = load_data_cached(path, cfg, cache)
+    entry = cache.directory / f"{data_cache_key(path, cfg)}.npz"
+    entry.write_bytes(entry.read_bytes()[:200] if corrupt == "truncated" else corrupt)
+    assert cache.get(entry.stem) is None
+    assert not entry.exists()
+    assert_same_data(load_data_cached(path, cfg, cache), loaded)
+    assert entry.exists()
+
+
+def _entries(directory: Path, ages_days: list[float], size: int = 100) -> list[Path]:
+    directory.mkdir()
+    now = time.time()
+    entries = []
+    for i, age in enumerate(ages_days):
+        entry = directory / f"{i}.npz"
+        entry.write_bytes(b"x" * size)
+        os.utime(entry, (now - age * 86400, now - age * 86400))
+        entries.append(entry)
+    return entries
+
+
+def test_eviction_drops_least_recently_used_first(tmp_path: Path) -> None:
+    entries = _entries(tmp_path / "cache", [3.0, 1.0, 2.0, 0.0])
+    evict_lru(tmp_path / "cache", "*.npz", max_bytes=250, max_age_days=None)
+    assert [e.exists() for e in entries] == [False, True, False, True]
+    # the newest entry stays even when it alone exceeds the budget
+    evict_lru(tmp_path / "cache", "*.npz", max_bytes=50, max_age_days=None)
+    assert [e.exists() for e in entries] == [False, False, False, True]
+
+
+def test_eviction_drops_entries_past_the_age_limit(tmp_path: Path) -> None:
+    entries = _entries(tmp_path / "cache", [40.0, 10.0, 31.0, 0.0])
+    evict_lru(tmp_path / "cache", "*.npz", max_bytes=None, max_age_days=30.0)
+    assert [e.exists() for e in entries] == [False, True, False, True]
+
+
+def test_reading_an_entry_marks_it_recently_used(tmp_path: Path) -> None:
+    cfg = synthetic_config(2)
+    cache = DataCache(tmp_path / "cache", max_bytes=None)
+    keys = []
+    for seed in range(3):
+        path = write_synthetic_workbook(tmp_path / f"book{seed}.xlsx", cfg, 60, seed=seed)
+        load_data_cached(path, cfg, cache)
+        keys.append(data_cache_key(path, cfg))
+        entry = cache.directory / f"{keys[-1]}.npz"
+        os.utime(entry, (time.time() - 3 - seed, time.time() - 3 + seed))
+    assert cache.get(keys[0]) is not None
+    sizes = {k: (cache.directory / f"{k}.npz").stat().st_size for k in keys}
+    cache.max_bytes = sizes[keys[0]] + sizes[keys[2]]
+    cache.evict()
+    assert sorted(p.stem for p in cache.directory.glob("*.npz")) == sorted([keys[0], keys[2]])
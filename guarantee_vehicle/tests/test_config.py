@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+import yaml
+from pydantic import ValidationError
+
+from guarantee_vehicle.batch import load_batch_runs
+from guarantee_vehicle.config import AppConfig, load_config
+
+EXAMPLE_CONFIG = Path(__file__).resolve().parents[1] / "examples" / "config_example.yaml"
+
+
+def example_raw(**simulation: object) -> dict:
+    raw = yaml.safe_load(EXAMPLE_CONFIG.read_text())
+    raw.setdefault("simulation", {}).update(simulation)
+    return raw
+
+
+def test_antithetic_rounds_path_counts_up_to_even() -> None:
+    cfg = AppConfig.model_validate(
+        example_raw(antithetic=True, n_paths=1001, chunk_paths=100, convergence={"max_paths": 5001})
+    )
+    assert cfg.simulation.n_paths == 1002
+    assert cfg.simulation.convergence.max_paths == 5002
+
+
+def test_antithetic_rejects_odd_chunks() -> None:
+    with pytest.raises(ValidationError, match="chunk_paths must be even"):
+        AppConfig.model_validate(example_raw(antithetic=True, chunk_paths=101))
+
+
+def test_odd_counts_are_kept_without_antithetic() -> None:
+    cfg = AppConfig.model_validate(example_raw(n_paths=1001, chunk_paths=101))
+    assert cfg.simulation.n_paths == 1001
+
+
+def test_trade_book_is_relative_to_the_config_file(tmp_path: Path) -> None:
+    (tmp_path / "runs").mkdir()
+    raw = example_raw()
+    raw["portfolio"]["trade_book"] = "books/trades.csv"
+    (tmp_path / "base.yaml").write_text(yaml.safe_dump(raw))
+    (tmp_path / "runs" / "own.yaml").write_text(yaml.safe_dump({"portfolio": {"trade_book": "../other.csv"}}))
+    (tmp_path / "runs" / "inherit.yaml").write_text(yaml.safe_dump({"run": {"seed": 7}}))
+    assert load_config(tmp_path / "base.yaml").portfolio.trade_book == str(tmp_path / "books" / "trades.csv")
+    runs = {r.name: r.cfg for r in load_batch_runs([str(tmp_path / "runs")], base=tmp_path / "base.yaml")}
+    assert runs["own"].portfolio.trade_book == str(tmp_path / "other.csv")
+    assert runs["inherit"].portfolio.trade_book == str(tmp_path / "books" / "trades.csv")
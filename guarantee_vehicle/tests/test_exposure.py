@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import warnings
+
+import numpy as np
+import pytest
+from conftest import synthetic_fx
+
+from guarantee_vehicle.market.exposure import (
+    currency_exposure_profile,
+    mtm_positive_matrix,
+    peak_mtm_positive,
+    profile_from_matrix,
+    sliding_window_min,
+)
+from guarantee_vehicle.market.fx import phase0_mtm_positive
+
+
+@pytest.mark.parametrize("n", [1, 7, 12, 13, 25])
+@pytest.mark.parametrize("window", [1, 3, 5, 12, "n", "n+1"])
+def test_sliding_window_min_matches_brute_force(n: int, window: int | str) -> None:
+    w = {"n": n, "n+1": n + 1}.get(window, window)
+    x = np.random.default_rng(n).normal(size=n)
+    expected = np.array([x[i : i + w].min() for i in range(n - w + 1)]) if w <= n else np.empty(0)
+    np.testing.assert_array_equal(sliding_window_min(x, w), expected)
+
+
+@pytest.mark.parametrize("tenor_months", [1, 6, 12, 40])
+def test_peak_mtm_positive_matches_brute_force(tenor_months: int) -> None:
+    s = synthetic_fx(["KES"], n_months=30, seed=tenor_months)["KES"].to_numpy()
+    expected = [max(s[t0] / s[t0 + 1 : t0 + 1 + tenor_months].min() - 1, 0.0) for t0 in range(len(s) - 1)]
+    np.testing.assert_allclose(peak_mtm_positive(s, tenor_months), expected, rtol=1e-15)
+    # and the row maxima of the (start, horizon) matrix
+    np.testing.assert_allclose(peak_mtm_positive(s, tenor_months), np.nanmax(mtm_positive_matrix(s, tenor_months), axis=1))
+
+
+def test_profile_matches_per_bucket_nan_statistics() -> None:
+    rng = np.random.default_rng(0)
+    n_starts, tenor_months, bucket_months, quantiles = 40, 14, 4, [0.5, 0.95]
+    mtm = np.maximum(rng.normal(0.02, 0.05, (n_starts, tenor_months)), 0.0)
+    mtm[rng.random(mtm.shape) < 0.3] = np.nan
+    # a whole bucket unobserved, and a start date with no observation at all
+    mtm[:, 4:8] = np.nan
+    mtm[3] = np.nan
+    profile = profile_from_matrix("x", mtm, quantiles, bucket_months)
+
+    buckets = [mtm[:, b : b + bucket_months].ravel() for b in range(0, tenor_months, bucket_months)]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # nanmean / nanquantile of the empty bucket
+        ee = [np.nanmean(c) for c in buckets]
+        pfe = np.array([np.nanquantile(c, quantiles) for c in buckets]).T
+    np.testing.assert_array_equal(profile.bucket_end_months, [4, 8, 12, 14])
+    np.testing.assert_array_equal(profile.n_obs, [np.isfinite(c).sum() for c in buckets])
+    np.testing.assert_allclose(profile.ee, ee, rtol=1e-12)
+    np.testing.assert_allclose(profile.pfe, pfe, rtol=1e-12)
+    assert np.isnan(profile.ee[1]) and np.isnan(profile.pfe[:, 1]).all()
+    np.testing.assert_array_equal(profile.peak, np.nanmax(np.delete(mtm, 3, axis=0), axis=1))
+
+
+def test_currency_profile_splits_the_phase0_samples_by_horizon() -> None:
+    fx = synthetic_fx(["KES"], n_months=90)["KES"]
+    samples = phase0_mtm_positive(fx, tenor_months=24)
+    profile = currency_exposure_profile(fx, 24, [0.99], bucket_months=5)
+    assert profile.n_obs.sum() == len(samples)
+    assert (profile.ee * profile.n_obs).sum() == pytest.approx(samples.sum(), rel=1e-12)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from guarantee_vehicle.market.fx import iter_phase0_mtm_chunks, phase0_mtm_positive
+
+
+def reference_mtm_positive(fx_series: pd.Series, tenor_months: int = 60) -> np.ndarray:
+    # the original per-t0 loop that phase0_mtm_positive replaced
+    s = fx_series.dropna().astype(float).values
+    mtm_pos: list[float] = []
+    for t0 in range(len(s) - 1):
+        end = min(len(s), t0 + tenor_months + 1)
+        for t in range(t0 + 1, end):
+            mtm_pos.append(max((s[t0] / s[t]) - 1.0, 0.0))
+    return np.array(mtm_pos, dtype=float)
+
+
+def fx_series(n: int, seed: int = 0, missing: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    values = 100.0 * np.exp(np.cumsum(rng.normal(0.002, 0.03, n)))
+    values[:missing] = np.nan
+    return pd.Series(values, index=pd.date_range("2000-01-01", periods=n, freq="MS"), name="TST")
+
+
+@pytest.mark.parametrize("n, tenor_months", [(150, 60), (61, 60), (240, 12), (2, 60)])
+def test_matches_reference_loop_float64(n: int, tenor_months: int) -> None:
+    s = fx_series(n, missing=3 if n > 10 else 0)
+    expected = reference_mtm_positive(s, tenor_months)
+    got = phase0_mtm_positive(s, tenor_months)
+    assert got.dtype == np.float64
+    assert got.shape == expected.shape
+    np.testing.assert_array_equal(got, expected)
+
+
+def test_matches_reference_loop_float32() -> None:
+    s = fx_series(150)
+    expected = reference_mtm_positive(s, 60)
+    got = phase0_mtm_positive(s, 60, dtype=np.float32)
+    assert got.dtype == np.float32
+    assert got.shape == expected.shape
+    np.testing.assert_allclose(got, expected, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 10, 59])
+def test_series_shorter_than_tenor(n: int) -> None:
+    s = fx_series(n)
+    expected = reference_mtm_positive(s, 60)
+    got = phase0_mtm_positive(s, 60)
+    assert len(got) == max(n * (n - 1) // 2, 0)
+    np.testing.assert_array_equal(got, expected)
+
+
+def test_chunks_concatenate_to_samples() -> None:
+    s = fx_series(130, missing=5)
+    chunks = list(iter_phase0_mtm_chunks(s, 60, chunk_size=1000))
+    assert all(len(c) == 1000 for c in chunks[:-1])
+    np.testing.assert_array_equal(np.concatenate(chunks), phase0_mtm_positive(s, 60))
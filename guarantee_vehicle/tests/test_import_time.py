@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from benchmarks.import_time import LAZY_MODULES, loaded_lazy_modules
+
+CLI = "guarantee_vehicle.cli"
+
+
+def test_cli_import_skips_heavy_modules() -> None:
+    # runs in a fresh interpreter, so modules this test session imported do not count; the wall-clock
+    # budget is left to `python -m benchmarks.import_time`, as timings on shared runners are noisy
+    assert loaded_lazy_modules(CLI) == [], f"{CLI} must import {', '.join(LAZY_MODULES)} lazily"
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from conftest import equal_weights
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.credit.default_model import hazard_tilt_log_weights, sample_default_times, tilted_pd
+from guarantee_vehicle.simulation.loss_engine import SpotPanel
+from guarantee_vehicle.simulation.parallel import run_loss_simulation
+from guarantee_vehicle.stats.risk_metrics import RiskMetrics
+from guarantee_vehicle.stats.variance_reduction import plain_estimate
+
+PD, TENOR = 0.04, 5
+
+
+def with_tilt(cfg: AppConfig, fx_model: str = "historical", **tilt: float) -> AppConfig:
+    simulation = cfg.simulation.model_copy(
+        update={
+            "fx_model": fx_model,
+            "importance_sampling": cfg.simulation.importance_sampling.model_copy(update={"enabled": True, **tilt}),
+        }
+    )
+    return cfg.model_copy(update={"simulation": simulation})
+
+
+def assert_mean_near(values: np.ndarray, expected: float) -> None:
+    est = plain_estimate(values)
+    assert abs(est.mean - expected) < 4 * est.std_error, (est.mean, expected, est.std_error)
+
+
+def test_hazard_tilt_reweights_to_the_original_measure() -> None:
+    rng = np.random.default_rng(0)
+    pds = np.array([0.01, 0.04, 0.1])
+    default_time = sample_default_times(rng, tilted_pd(pds, 2.5), TENOR, 200_000)
+    lr = np.exp(hazard_tilt_log_weights(default_time, pds, 2.5, TENOR))
+    assert_mean_near(lr, 1.0)
+    # E_q[lr * 1{default}] is each obligor's cumulative PD under the original hazard
+    cumulative_pd = 1 - (1 - pds) ** TENOR
+    one = np.exp(hazard_tilt_log_weights(default_time[:, :1], pds[:1], 2.5, TENOR))
+    assert_mean_near(one * np.isfinite(default_time[:, 0]), cumulative_pd[0])
+
+
+@pytest.mark.parametrize(
+    "fx_model, tilt",
+    [
+        ("historical", {"hazard_multiplier": 2.0}),
+        ("correlated_gbm", {"fx_shift_sd": 0.5}),
+        ("correlated_gbm", {"hazard_multiplier": 1.5, "fx_shift_sd": 0.25}),
+    ],
+)
+def test_simulated_likelihood_ratios_average_to_one(
+    cfg: AppConfig, panel: SpotPanel, fx_model: str, tilt: dict
+) -> None:
+    tilted = with_tilt(cfg, fx_model, **tilt)
+    sim = run_loss_simulation(tilted, panel, equal_weights(cfg), 40_000, cfg.run.seed, PD)
+    assert_mean_near(sim.likelihood_ratio, 1.0)
+
+
+@pytest.mark.parametrize(
+    "fx_model, tilt",
+    [("historical", {"hazard_multiplier": 2.0}), ("correlated_gbm", {"hazard_multiplier": 1.5, "fx_shift_sd": 0.25})],
+)
+def test_importance_sampling_matches_plain_monte_carlo(
+    cfg: AppConfig, panel: SpotPanel, fx_model: str, tilt: dict
+) -> None:
+    weights, n_paths, q = equal_weights(cfg), 40_000, 0.995
+    plain_cfg = cfg.model_copy(update={"simulation": cfg.simulation.model_copy(update={"fx_model": fx_model})})
+    plain = run_loss_simulation(plain_cfg, panel, weights, n_paths, cfg.run.seed, PD).losses
+    sim = run_loss_simulation(with_tilt(cfg, fx_model, **tilt), panel, weights, n_paths, cfg.run.seed + 1, PD)
+    plain_el, is_el = plain_estimate(plain), plain_estimate(sim.losses, sim.likelihood_ratio)
+    assert abs(is_el.mean - plain_el.mean) < 4 * np.hypot(is_el.std_error, plain_el.std_error)
+    # the IS VaR within a 4-sigma order-statistic band of the plain sample's quantile
+    band = 4 * np.sqrt(n_paths * q * (1 - q))
+    ordered = np.sort(plain)
+    lo, hi = ordered[int(n_paths * q - band)], ordered[int(n_paths * q + band)]
+    assert lo <= RiskMetrics(sim.losses, sim.likelihood_ratio).var(q) <= hi
+
+
+def weighted_reference(x: np.ndarray, w: np.ndarray, q: float) -> tuple[float, float]:
+    # smallest sample whose weighted CDF reaches q, and the weighted mean of the samples at or above it
+    order = np.argsort(x, kind="stable")
+    xs, ws = x[order], w[order] / w.sum()
+    cdf = np.cumsum(ws)
+    var = next(v for v, c in zip(xs, cdf) if c >= q)
+    tail = xs >= var
+    return float(var), float((ws[tail] * xs[tail]).sum() / ws[tail].sum())
+
+
+@pytest.mark.parametrize("q", [0.5, 0.9, 0.99, 0.999])
+def test_weighted_risk_metrics_match_the_weighted_cdf(q: float) -> None:
+    rng = np.random.default_rng(4)
+    # rounded so the sample has ties, and a point mass at zero like a loss distribution
+    x = np.round(np.where(rng.random(5_000) < 0.7, 0.0, rng.lognormal(0, 1, 5_000)), 2)
+    w = rng.lognormal(0, 0.7, x.size)
+    metrics = RiskMetrics(x, w)
+    var, es = weighted_reference(x, w, q)
+    assert metrics.var(q) == pytest.approx(var, rel=1e-12)
+    assert metrics.es(q) == pytest.approx(es, rel=1e-12)
+    assert metrics.mean == pytest.approx(np.average(x, weights=w), rel=1e-12)
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_workbook import synthetic_config, write_synthetic_workbook
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.io import load_data
+
+
+def with_backend(cfg: AppConfig, backend: str) -> AppConfig:
+    return cfg.model_copy(update={"data": cfg.data.model_copy(update={"backend": backend})})
+
+
+@pytest.mark.parametrize("freq, n_periods", [("MS", 180), ("B", 700)])
+def test_streaming_backend_matches_pandas(tmp_path: Path, freq: str, n_periods: int) -> None:
+    cfg = synthetic_config(4)
+    path = write_synthetic_workbook(tmp_path / "book.xlsx", cfg, n_periods, freq=freq, missing_share=0.2)
+    frame = load_data(path, with_backend(cfg, "pandas"))
+    streamed = load_data(path, with_backend(cfg, "streaming"))
+    pd.testing.assert_frame_equal(streamed.fx, frame.fx)
+    assert list(streamed.rates) == list(frame.rates) == list(cfg.data.rates.mapping)
+    for ccy, series in frame.rates.items():
+        pd.testing.assert_series_equal(streamed.rates[ccy], series)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import numpy as np
+from conftest import equal_weights
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.credit import copula_for_config
+from guarantee_vehicle.simulation.loss_engine import SpotPanel
+from guarantee_vehicle.simulation.parallel import run_loss_simulation
+
+
+def with_dependence(cfg: AppConfig, strength: float) -> AppConfig:
+    dependence = cfg.credit.fx_default_dependence.model_copy(update={"enabled": True, "strength": strength})
+    return cfg.model_copy(update={"credit": cfg.credit.model_copy(update={"fx_default_dependence": dependence})})
+
+
+def test_historical_windows_follow_the_copula_fx_factor(cfg: AppConfig, panel: SpotPanel) -> None:
+    # historical mode keeps replaying history under the copula: the factor only picks the window
+    n_paths, pd_annual = 20_000, 0.04
+    el = {}
+    for strength in (-0.6, 0.6):
+        dep_cfg = with_dependence(cfg, strength)
+        sim = run_loss_simulation(dep_cfg, panel, equal_weights(cfg), n_paths, cfg.run.seed, pd_annual)
+        el[strength] = sim.losses.mean()
+        defaulted = np.isfinite(sim.default_time)
+        assert np.isin(sim.spot_at_default[defaulted], panel.values).all()
+    assert el[0.6] > 1.2 * el[-0.6]
+
+
+def test_correlated_copula_is_built_once_per_correlation(cfg: AppConfig, panel: SpotPanel) -> None:
+    dependence = with_dependence(cfg, 0.4).credit.fx_default_dependence
+    corr = panel.fx_model.corr
+    first = copula_for_config(dependence, len(corr), corr)
+    assert copula_for_config(dependence, len(corr), corr.copy()) is first
+    np.testing.assert_array_equal(first.fx_correlation, corr)
+    assert copula_for_config(with_dependence(cfg, -0.4).credit.fx_default_dependence, len(corr), corr) is not first
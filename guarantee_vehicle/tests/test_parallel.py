@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import numpy as np
+from conftest import equal_weights
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.simulation.loss_engine import SpotPanel
+from guarantee_vehicle.simulation.parallel import chunk_plan, iter_loss_chunks, run_loss_simulation
+
+
+def test_chunk_plan_covers_the_paths_with_independent_seeds(cfg: AppConfig) -> None:
+    plan = chunk_plan(cfg.run.seed, 3_500, 1_000)
+    assert [size for _, size in plan] == [1_000, 1_000, 1_000, 500]
+    assert len({child.generate_state(1)[0] for child, _ in plan}) == len(plan)
+    # the same seed always gives the same children
+    again = chunk_plan(cfg.run.seed, 3_500, 1_000)
+    assert [c.generate_state(4).tolist() for c, _ in plan] == [c.generate_state(4).tolist() for c, _ in again]
+
+
+def test_worker_count_does_not_change_the_losses(cfg: AppConfig, panel: SpotPanel) -> None:
+    weights, n_paths = equal_weights(cfg), 3_500
+    serial = run_loss_simulation(cfg, panel, weights, n_paths, cfg.run.seed, 0.04)
+    for workers in (2, 3):
+        pooled = run_loss_simulation(cfg, panel, weights, n_paths, cfg.run.seed, 0.04, workers=workers)
+        np.testing.assert_array_equal(pooled.losses, serial.losses)
+        np.testing.assert_array_equal(pooled.default_time, serial.default_time)
+        np.testing.assert_array_equal(pooled.spot_at_default, serial.spot_at_default)
+
+
+def test_chunks_arrive_in_plan_order(cfg: AppConfig, panel: SpotPanel) -> None:
+    weights = equal_weights(cfg)
+    plan = chunk_plan(cfg.run.seed, 3_500, cfg.simulation.chunk_paths)
+    serial = run_loss_simulation(cfg, panel, weights, 3_500, cfg.run.seed, 0.04)
+    chunks = list(iter_loss_chunks(cfg, panel, weights, plan, 0.04, workers=2))
+    assert [c.n_paths for c in chunks] == [size for _, size in plan]
+    np.testing.assert_array_equal(np.concatenate([c.losses for c in chunks]), serial.losses)
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from guarantee_vehicle.profiling import Profiler
+
+
+def test_report_rows_render_flags_as_text() -> None:
+    with Profiler(enabled=True, trace_memory=False) as prof:
+        with prof.stage("load_data"):
+            pass
+        with prof.stage("validate") as st:
+            st.annotate(cached=True)
+        with prof.stage("exposure") as st:
+            st.annotate(cached=False)
+    assert [row["cached"] for row in prof.report_rows()] == ["–", "yes", "no"]
+    assert "cached" not in prof.table_rows()[0]
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from guarantee_vehicle.market.rates import curve_from_series
+
+
+def test_history_row_is_flat_at_latest_observation() -> None:
+    # newest first, like the FX sheet
+    curve = curve_from_series(pd.Series([0.051, 0.049, 0.047, 0.040]))
+    np.testing.assert_allclose(curve.zero_rate(np.array([0.1, 1.0, 5.0])), 0.051)
+
+
+def test_term_structure_row_uses_configured_pillars() -> None:
+    curve = curve_from_series(pd.Series([0.02, 0.03, 0.05]), pillar_years=[1.0, 2.0, 5.0])
+    np.testing.assert_allclose(curve.zero_rate(np.array([0.5, 1.5, 5.0, 10.0])), [0.02, 0.025, 0.05, 0.05])
+
+
+def test_pillar_count_must_match_columns() -> None:
+    with pytest.raises(ValueError, match="pillar_years"):
+        curve_from_series(pd.Series([0.02, 0.03, 0.05]), pillar_years=[1.0, 2.0])
+
+
+def test_empty_row_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        curve_from_series(pd.Series([], dtype=float))
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+import yaml
+from conftest import EXAMPLE_CONFIG
+
+from guarantee_vehicle.capital.returns import compile_stack, returns_for_leverage, stack_returns
+from guarantee_vehicle.config import AppConfig, load_config
+
+NOTIONAL = 100_000_000.0
+EL_RATE = 0.0008
+
+# the example stack before compile_stack: 1% equity, 1% mezz at 6%, 12% counter-guarantee at 25 bps
+BASELINE = {
+    "gross_premium": 300_000.0,
+    "opex": 100_000.0,
+    "ndf_addon": 0.0,
+    "reserve": 0.0,
+    "expected_loss": 80_000.0,
+    "mezz_coupon_amount": 60_000.0,
+    "counter_guarantee_fee_amount": 30_000.0,
+    "equity_residual": 30_000.0,
+    "equity_amount": 1_000_000.0,
+    "equity_roe": 0.03,
+    "mezz_return": 0.06,
+    "guarantor_return_on_guaranteed_amount": 0.0025,
+    "guarantor_roe": 0.025,
+}
+
+
+@pytest.fixture(scope="module")
+def example() -> AppConfig:
+    return load_config(EXAMPLE_CONFIG)
+
+
+def test_stack_returns_match_the_baseline(example: AppConfig) -> None:
+    out = stack_returns(example, NOTIONAL, EL_RATE * NOTIONAL)
+    assert out.keys() == BASELINE.keys()
+    for key, expected in BASELINE.items():
+        assert out[key] == pytest.approx(expected, rel=1e-12, abs=1e-9), key
+
+
+def test_stack_returns_broadcast_over_el(example: AppConfig) -> None:
+    el = np.array([0.0, EL_RATE, 0.002]) * NOTIONAL
+    roe = stack_returns(example, NOTIONAL, el)["equity_roe"]
+    np.testing.assert_allclose(roe, [stack_returns(example, NOTIONAL, x)["equity_roe"] for x in el], rtol=1e-12)
+
+
+def test_returns_for_leverage_at_the_stack_leverage(example: AppConfig) -> None:
+    stack = compile_stack(example.capital_stack)
+    leverage = 1.0 / stack.equity_pct
+    out = returns_for_leverage(example, leverage, EL_RATE)
+    assert out["equity_roe"] == pytest.approx(stack_returns(example, NOTIONAL, EL_RATE * NOTIONAL)["equity_roe"], rel=1e-12)
+    assert out["equity_pct"] == pytest.approx(stack.equity_pct)
+    assert out["net_margin_bps"] == pytest.approx(3.0)
+    grid = returns_for_leverage(example, np.array([[leverage], [2 * leverage]]), np.array([0.0, EL_RATE]))
+    assert grid["equity_roe"].shape == (2, 2)
+    assert grid["equity_roe"][1, 1] == pytest.approx(2 * out["equity_roe"], rel=1e-12)
+
+
+def test_leverage_below_the_stack_minimum_is_rejected(example: AppConfig) -> None:
+    # the mezz and counter-guarantee layers take 13% of notional, so equity can be at most 87%
+    min_leverage = compile_stack(example.capital_stack).min_leverage
+    assert min_leverage == pytest.approx(1 / 0.87)
+    returns_for_leverage(example, min_leverage, EL_RATE)
+    with pytest.raises(ValueError, match="Leverage must be at least 1.149x"):
+        returns_for_leverage(example, np.array([1.1, 10.0]), EL_RATE)
+
+
+def test_mezz_return_is_thickness_weighted() -> None:
+    raw = yaml.safe_load(EXAMPLE_CONFIG.read_text())
+    mezz = raw["capital_stack"][1]
+    raw["capital_stack"][1:2] = [
+        {**mezz, "name": "Mezz A", "detach_pct": 0.0125, "coupon_pct": 0.10},
+        {**mezz, "name": "Mezz B", "attach_pct": 0.0125, "coupon_pct": 0.04},
+    ]
+    stack = compile_stack(AppConfig.model_validate(raw).capital_stack)
+    assert stack.mezz_pct == pytest.approx(0.01)
+    assert stack.mezz_return == pytest.approx(0.25 * 0.10 + 0.75 * 0.04)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import pytest
+import yaml
+from conftest import EXAMPLE_CONFIG, equal_weights, synthetic_fx
+from pydantic import ValidationError
+
+from guarantee_vehicle.capital.aggregation import weighted_portfolio_samples, weighted_portfolio_sketch
+from guarantee_vehicle.capital.rating_capital import severity_capital, var_or_es
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.market.fx import iter_phase0_mtm_chunks, phase0_mtm_positive
+from guarantee_vehicle.simulation.loss_engine import SpotPanel
+from guarantee_vehicle.simulation.parallel import run_loss_simulation
+from guarantee_vehicle.stats.risk_metrics import RiskMetrics
+from guarantee_vehicle.stats.sketch import LogHistogramSketch
+
+ACCURACY = 0.005
+
+
+def test_loss_sketch_matches_the_exact_losses(cfg: AppConfig, panel: SpotPanel) -> None:
+    weights, pd_annual = equal_weights(cfg), 0.04
+    exact = run_loss_simulation(cfg, panel, weights, 6_000, cfg.run.seed, pd_annual).losses
+    sketch = run_loss_simulation(
+        cfg, panel, weights, 6_000, cfg.run.seed, pd_annual, keep_paths=False, keep_losses=False,
+        sketch=LogHistogramSketch(ACCURACY),
+    ).loss_sketch
+    metrics = RiskMetrics(exact)
+    assert sketch.n == len(exact)
+    assert sketch.mean == pytest.approx(exact.mean(), rel=1e-12)
+    assert sketch.variance == pytest.approx(exact.var(ddof=1), rel=1e-9)
+    for method in ("VaR", "ES"):
+        assert var_or_es(sketch, 0.99, method) == pytest.approx(metrics.var_or_es(0.99, method), rel=2 * ACCURACY)
+
+
+def test_portfolio_sketch_streams_the_phase0_samples() -> None:
+    currencies = ["KES", "INR", "VND"]
+    fx = synthetic_fx(currencies)
+    weights = {"KES": 0.5, "INR": 0.3, "VND": 0.2}
+    exact = weighted_portfolio_samples({c: phase0_mtm_positive(fx[c], 60) for c in currencies}, weights)
+    chunks = {c: iter_phase0_mtm_chunks(fx[c], 60, chunk_size=500) for c in currencies}
+    sketch = weighted_portfolio_sketch(chunks, weights, LogHistogramSketch(ACCURACY))
+    assert sketch.n == len(exact)
+    assert sketch.mean == pytest.approx(exact.mean(), rel=1e-12)
+    assert severity_capital(sketch, 0.995, 0.1) == pytest.approx(severity_capital(exact, 0.995, 0.1), rel=ACCURACY)
+
+
+@pytest.mark.parametrize("simulation", [{"antithetic": True}, {"control_variate": True}])
+def test_sketch_rejects_path_estimators(simulation: dict) -> None:
+    raw = yaml.safe_load(EXAMPLE_CONFIG.read_text())
+    raw["simulation"].update(simulation)
+    raw["sketch"] = {"enabled": True}
+    with pytest.raises(ValidationError, match="sketch does not support"):
+        AppConfig.model_validate(raw)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from conftest import equal_weights
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.simulation.loss_engine import SpotPanel, simulate_scenario_losses
+from guarantee_vehicle.simulation.parallel import chunk_plan, run_loss_simulation
+from guarantee_vehicle.simulation.sweep import _tail_capital, scenario_tail_metrics
+
+# includes a PD low enough that most paths lose nothing, so the tail is full of ties at zero
+PDS = np.array([0.0005, 0.02, 0.08])
+COVS = np.array([0.5, 1.0])
+
+
+def full_cube_metrics(cfg: AppConfig, panel: SpotPanel, n_paths: int) -> tuple[np.ndarray, np.ndarray]:
+    # the grid from every path's losses at once, as scenario_tail_metrics computed it before chunk reduction
+    parts = [
+        simulate_scenario_losses(cfg, panel, equal_weights(cfg), size, child, PDS, COVS)
+        for child, size in chunk_plan(cfg.run.seed, n_paths, cfg.simulation.chunk_paths)
+    ]
+    losses = np.concatenate([p[0] for p in parts], axis=-1)
+    target = cfg.capital_target
+    capital = _tail_capital(losses, target.confidence, target.method)
+    return losses.mean(axis=-1), capital / cfg.portfolio.notional_usd_total * (1 + target.addon_pct)
+
+
+@pytest.mark.parametrize("method", ["VaR", "ES"])
+def test_chunk_reduction_matches_full_cube(cfg: AppConfig, panel: SpotPanel, method: str) -> None:
+    cfg = cfg.model_copy(update={"capital_target": cfg.capital_target.model_copy(update={"method": method})})
+    n_paths = 3_501
+    el, capital = full_cube_metrics(cfg, panel, n_paths)
+    _, _, el_amount, capital_pct = scenario_tail_metrics(cfg, panel, equal_weights(cfg), n_paths, cfg.run.seed, PDS, COVS)
+    np.testing.assert_allclose(el_amount, el, rtol=1e-12)
+    np.testing.assert_allclose(capital_pct, capital, rtol=1e-12)
+
+
+def test_worker_count_and_base_reuse_do_not_change_the_grid(cfg: AppConfig, panel: SpotPanel) -> None:
+    weights = equal_weights(cfg)
+    n_paths = cfg.simulation.n_paths
+    serial = scenario_tail_metrics(cfg, panel, weights, n_paths, cfg.run.seed, PDS, COVS)
+    pooled = scenario_tail_metrics(cfg, panel, weights, n_paths, cfg.run.seed, PDS, COVS, workers=2)
+    base = run_loss_simulation(cfg, panel, weights, n_paths, cfg.run.seed, cfg.credit.pd_scenarios_annual[1])
+    pd_grid = [*PDS, cfg.credit.pd_scenarios_annual[1]]
+    reused = scenario_tail_metrics(cfg, panel, weights, n_paths, cfg.run.seed, pd_grid, [1.0], base=base)
+    for a, b in zip(serial, pooled):
+        np.testing.assert_array_equal(a, b)
+    np.testing.assert_allclose(reused[2][:-1], serial[2][:, 1:], rtol=1e-12)
+    np.testing.assert_allclose(reused[3][:-1], serial[3][:, 1:], rtol=1e-12)
+    # the base PD row is not re-simulated; its point comes from the phase-2 losses
+    target = cfg.capital_target
+    base_capital = _tail_capital(base.losses, target.confidence, target.method) / cfg.portfolio.notional_usd_total
+    np.testing.assert_allclose(reused[2][-1], base.losses.mean(), rtol=1e-12)
+    np.testing.assert_allclose(reused[3][-1], base_capital * (1 + target.addon_pct), rtol=1e-12)
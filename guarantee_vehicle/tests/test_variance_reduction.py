@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from conftest import equal_weights
+
+from guarantee_vehicle.config import AppConfig
+from guarantee_vehicle.simulation.loss_engine import SpotPanel
+from guarantee_vehicle.simulation.parallel import run_loss_simulation
+from guarantee_vehicle.stats.variance_reduction import (
+    antithetic_estimate,
+    antithetic_normals,
+    antithetic_uniforms,
+    control_variate_estimate,
+    pair_means,
+    plain_estimate,
+)
+
+
+def test_antithetic_draws_are_interleaved_mirrors() -> None:
+    u = antithetic_uniforms(np.random.default_rng(0), (7, 3))
+    z = antithetic_normals(np.random.default_rng(0), (7, 3))
+    np.testing.assert_array_equal(u[1::2], 1.0 - u[0:6:2])
+    np.testing.assert_array_equal(z[1::2], -z[0:6:2])
+    # the odd last row is a fresh draw, not a mirror
+    assert not np.allclose(u[6], 1.0 - u[5])
+    np.testing.assert_array_equal(pair_means(np.arange(5.0)), [0.5, 2.5, 4.0])
+
+
+def test_plain_estimate_weights_by_likelihood_ratio() -> None:
+    rng = np.random.default_rng(1)
+    y, lr = rng.exponential(size=10_000), rng.uniform(0.5, 1.5, 10_000)
+    est = plain_estimate(y, lr)
+    assert est.mean == pytest.approx(np.mean(y * lr))
+    assert est.std_error == pytest.approx(np.std(y * lr, ddof=1) / 100)
+    assert est.variance_reduction == 1.0
+
+
+def test_antithetic_estimate_on_a_monotone_payoff() -> None:
+    # E[u^2] = 1/3; mirroring a monotone function of u gives negatively correlated pairs
+    u = antithetic_uniforms(np.random.default_rng(2), 20_000)
+    est = antithetic_estimate(u**2)
+    assert abs(est.mean - 1 / 3) < 4 * est.std_error
+    assert est.std_error == pytest.approx(np.std(pair_means(u**2), ddof=1) / np.sqrt(10_000))
+    assert est.variance_reduction > 5
+
+
+def test_control_variate_recovers_the_mean_with_less_variance() -> None:
+    rng = np.random.default_rng(3)
+    x = rng.exponential(size=20_000)
+    y = 2.0 * x + rng.normal(0, 0.5, x.size)
+    est = control_variate_estimate(y, x, control_mean=1.0)
+    assert est.beta == pytest.approx(2.0, abs=0.02)
+    assert abs(est.mean - 2.0) < 4 * est.std_error
+    assert est.variance_reduction > 10
+
+
+def test_antithetic_simulation_matches_plain_el(cfg: AppConfig, panel: SpotPanel) -> None:
+    weights, n_paths = equal_weights(cfg), 20_000
+    plain = plain_estimate(run_loss_simulation(cfg, panel, weights, n_paths, cfg.run.seed, 0.04).losses)
+    anti_cfg = cfg.model_copy(update={"simulation": cfg.simulation.model_copy(update={"antithetic": True})})
+    anti = antithetic_estimate(run_loss_simulation(anti_cfg, panel, weights, n_paths, cfg.run.seed + 1, 0.04).losses)
+    assert abs(anti.mean - plain.mean) < 4 * np.hypot(anti.std_error, plain.std_error)
+    assert anti.variance_reduction > 1